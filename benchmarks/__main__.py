@@ -0,0 +1,152 @@
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+
+# Has to be set before Qt is loaded
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5 import QtCore
+from PyQt5 import QtWidgets
+
+from .suite import BenchmarkSuite
+from .synthetic_repo import SyntheticRepo
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    args = parse_args(sys.argv)
+    logging.basicConfig(
+        stream=sys.stderr,
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='[{name}] [{levelname}]: {message}',
+        style='{',
+    )
+
+    app = QtWidgets.QApplication(sys.argv[:1])
+
+    with tempfile.TemporaryDirectory(prefix='annex-benchmark-') as tmp:
+        params = {}
+        path = args.repo
+        if path is None:
+            synthetic = SyntheticRepo(
+                os.path.join(tmp, 'repo'),
+                keys=args.keys,
+                fields=args.fields,
+                fields_per_key=args.fields_per_key,
+                values_per_field=args.values,
+                depth=args.depth,
+                fanout=args.fanout,
+                present=args.present,
+                history=args.history,
+                seed=args.seed,
+            )
+            path = synthetic.generate(init=not args.no_init)
+            params = synthetic.params()
+
+        # Each edit leaves commits on the git-annex branch, only the
+        # throwaway repository gets them unless asked for
+        edits = args.edits
+        if args.repo is not None and not args.edit_repo:
+            edits = 0
+
+        suite = BenchmarkSuite(
+            path, repeat=args.repeat, edits=edits,
+        )
+        results = suite.run()
+
+    report = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'qt': QtCore.QT_VERSION_STR,
+        'pyqt': QtCore.PYQT_VERSION_STR,
+        'platform': platform.platform(),
+        'repo': args.repo,
+        'params': params,
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+            output.write('\n')
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="python3 -m benchmarks",
+        description="Time model operations on a synthetic repository.",
+    )
+
+    parser.add_argument(
+        "--repo",
+        metavar='path',
+        help="benchmark an existing repository instead",
+    )
+    parser.add_argument(
+        "-o", "--output",
+        metavar='path',
+        help="write the JSON report here instead of stdout",
+    )
+    parser.add_argument(
+        "-v", "--verbose",
+        action='store_true',
+        help="log each result as it is measured",
+    )
+
+    parser.add_argument("--keys", type=int, default=10000)
+    parser.add_argument("--fields", type=int, default=20)
+    parser.add_argument("--fields-per-key", type=int, default=4)
+    parser.add_argument("--values", type=int, default=100)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--fanout", type=int, default=8)
+    parser.add_argument("--present", type=float, default=0.5)
+    parser.add_argument("--history", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--no-init",
+        action='store_true',
+        help="don't run git annex init on the synthetic repository",
+    )
+
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--edits",
+        type=int, default=10,
+        help="metadata edit round trips to time, 0 to skip",
+    )
+    parser.add_argument(
+        "--edit-repo",
+        action='store_true',
+        help="time edits on --repo too, committing to its git-annex branch",
+    )
+
+    return parser.parse_args(argv[1:])
+
+
+if __name__ == "__main__":
+    main()
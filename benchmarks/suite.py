@@ -0,0 +1,222 @@
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import logging
+import statistics
+import time
+
+from PyQt5 import QtCore
+
+from git_annex_adapter.repo import GitAnnexRepo
+
+from git_annex_metadata_gui.file_metadata_model import AnnexedFileMetadataModel
+from git_annex_metadata_gui.key_metadata_model import AnnexedKeyMetadataModel
+from git_annex_metadata_gui.scheduler import default_scheduler
+from git_annex_metadata_gui.utils import StandardItemProxyModel
+
+logger = logging.getLogger(__name__)
+
+
+def run_until_done(*tasks):
+    # Waits in an event loop, so the tasks get their scheduler slices
+    loop = QtCore.QEventLoop()
+
+    def on_task_finished():
+        if not any(task.running() for task in tasks):
+            loop.quit()
+
+    # Queued, so the tasks have seen they're finished before we look
+    scheduler = default_scheduler()
+    scheduler.task_finished.connect(
+        on_task_finished, QtCore.Qt.QueuedConnection,
+    )
+    try:
+        if any(task.running() for task in tasks):
+            loop.exec_()
+    finally:
+        scheduler.task_finished.disconnect(on_task_finished)
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+class BenchmarkSuite:
+    def __init__(self, path, repeat=3, edits=10):
+        self.path = path
+        self.repeat = repeat
+        self.edits = edits
+        self.results = collections.OrderedDict()
+
+        self.model_keys = None
+        self.model_head = None
+
+    def run(self):
+        # Loading runs to completion instead of in latency sized slices
+        default_scheduler().target_latency = float('inf')
+
+        self.bench_key_load()
+        self.bench_tree_build()
+        self.bench_column_insertion()
+        self.bench_sort()
+        self.bench_filter()
+        self.bench_edit()
+        return self.results
+
+    def record(self, name, durations, **extra):
+        if not isinstance(durations, list):
+            durations = [durations]
+
+        result = collections.OrderedDict()
+        result['min'] = min(durations)
+        result['median'] = statistics.median(durations)
+        result['max'] = max(durations)
+        result['runs'] = len(durations)
+        result.update(extra)
+        self.results[name] = result
+
+        fmt = "{}: {:.4f}s (median of {})"
+        msg = fmt.format(name, result['median'], len(durations))
+        logger.info(msg)
+
+    def bench_key_load(self):
+        repo = GitAnnexRepo(self.path)
+        self.model_keys = AnnexedKeyMetadataModel()
+
+        def load():
+            self.model_keys.setRepo(repo)
+            run_until_done(self.model_keys._populate)
+
+        duration, _ = timed(load)
+        self.record(
+            'key_load', duration,
+            keys=self.model_keys.rowCount(),
+            columns=self.model_keys.columnCount(),
+        )
+
+    def bench_tree_build(self):
+        self.model_head = AnnexedFileMetadataModel()
+
+        def build():
+            self.model_head.setSourceModel(self.model_keys)
+            run_until_done(self.model_head._build_tree)
+
+        duration, _ = timed(build)
+        self.record(
+            'tree_build', duration,
+            files=len(self.model_head._file_items),
+        )
+
+    def bench_column_insertion(self):
+        # Goes through both models, the tree adds directory cells too
+        durations = []
+        for i in range(self.repeat):
+            field = 'zz-benchmark-{}'.format(i)
+            duration, _ = timed(self.model_keys.insert_field, field)
+            durations.append(duration)
+        self.record('column_insertion', durations)
+
+    def _proxy(self, model):
+        proxy = StandardItemProxyModel()
+        proxy.setSourceModel(model)
+        return proxy
+
+    def bench_sort(self):
+        for name, model, column in (
+            ('sort_keys_by_key', self.model_keys, 0),
+            ('sort_keys_by_field', self.model_keys, 1),
+            ('sort_tree_by_name', self.model_head, 0),
+            ('sort_tree_by_field', self.model_head, 1),
+        ):
+            if column >= model.columnCount():
+                continue
+
+            durations = []
+            for _ in range(self.repeat):
+                proxy = self._proxy(model)
+                duration, _ = timed(
+                    proxy.sort, column, QtCore.Qt.AscendingOrder,
+                )
+                durations.append(duration)
+            self.record(name, durations)
+
+    def bench_filter(self):
+        proxy = self._proxy(self.model_keys)
+        proxy.setFilterKeyColumn(0)
+
+        for name, function, args in (
+            ('filter_fixed', proxy.setFilterFixedString, ('ab',)),
+            ('filter_regex', proxy.setFilterRegExp, ('^SHA256E-s1',)),
+            ('filter_wildcard', proxy.setFilterWildcard, ('*.jpg',)),
+            ('filter_content', proxy.setContentFilter, (True,)),
+        ):
+            # Proxies only filter once someone asks for their rows
+            def apply():
+                function(*args)
+                return proxy.rowCount()
+
+            durations = []
+            for _ in range(self.repeat):
+                proxy.setFilterFixedString('')
+                proxy.setContentFilter(None)
+                proxy.rowCount()
+                duration, rows = timed(apply)
+                durations.append(duration)
+            self.record(name, durations, rows=rows)
+
+        proxy.setFilterFixedString('')
+        proxy.setContentFilter(None)
+
+    def bench_edit(self):
+        # Writes a value through the model, reads it back from git-annex
+        # and puts the old value back
+        if self.model_keys.columnCount() < 2 or not self.edits:
+            return
+
+        field = self.model_keys.fields[1]
+        rows = min(self.edits, self.model_keys.rowCount())
+
+        durations = []
+        for row in range(rows):
+            index = self.model_keys.index(row, 1)
+            item = self.model_keys.itemFromIndex(index)
+            old_value = item.metadata
+
+            def round_trip():
+                item.metadata = {'benchmark'}
+                key_obj = self.model_keys.repo.annex[item.key]
+                return key_obj.metadata.get(field, set())
+
+            duration, value = timed(round_trip)
+            if value != {'benchmark'}:
+                fmt = "Edit of '{}' read back as {!r}."
+                msg = fmt.format(item.key, value)
+                logger.warning(msg)
+
+            item.metadata = old_value
+            durations.append(duration)
+
+        self.record('edit_round_trip', durations)
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args=self.path,
+        )
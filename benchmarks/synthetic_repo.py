@@ -0,0 +1,213 @@
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import base64
+import hashlib
+import logging
+import os
+import random
+import subprocess
+import uuid
+
+import pygit2
+
+from git_annex_metadata_gui.content_index import hash_dir_mixed
+from git_annex_metadata_gui.metadata_log import hash_dir_lower
+
+logger = logging.getLogger(__name__)
+
+_EXTENSIONS = ('jpg', 'png', 'mp3', 'flac', 'pdf', 'txt', 'mkv', '')
+_WORDS = (
+    'alpha', 'bravo', 'charlie', 'delta', 'echo', 'foxtrot', 'golf',
+    'hotel', 'india', 'juliet', 'kilo', 'lima', 'mike', 'november',
+    'oscar', 'papa', 'quebec', 'romeo', 'sierra', 'tango', 'uniform',
+)
+
+
+class SyntheticRepo:
+    def __init__(
+        self, path, keys=1000, fields=10, fields_per_key=3,
+        values_per_field=50, depth=2, fanout=10, present=0.5,
+        history=2, seed=0,
+    ):
+        self.path = path
+        self.keys = keys
+        self.fields = fields
+        self.fields_per_key = min(fields_per_key, fields)
+        self.values_per_field = values_per_field
+        self.depth = depth
+        self.fanout = fanout
+        self.present = present
+        self.history = history
+        self.seed = seed
+
+        self._random = random.Random(seed)
+        self._uuid = str(uuid.UUID(int=self._random.getrandbits(128)))
+        self._timestamp = 1500000000
+        self._repo = None
+
+    def params(self):
+        return {
+            'keys': self.keys,
+            'fields': self.fields,
+            'fields_per_key': self.fields_per_key,
+            'values_per_field': self.values_per_field,
+            'depth': self.depth,
+            'fanout': self.fanout,
+            'present': self.present,
+            'history': self.history,
+            'seed': self.seed,
+        }
+
+    def generate(self, init=True):
+        self._repo = pygit2.init_repository(self.path)
+        field_names = ['field{:02}'.format(i) for i in range(self.fields)]
+
+        branch, head = {}, {}
+        for i in range(self.keys):
+            key = self._make_key(i)
+
+            aaa, bbb = hash_dir_lower(key)
+            logs = branch.setdefault(aaa, {}).setdefault(bbb, {})
+            logs[key + '.log'] = self._location_log()
+            if self.fields_per_key:
+                fields = self._random.sample(field_names, self.fields_per_key)
+                logs[key + '.log.met'] = self._metadata_log(fields)
+
+            directory = head
+            for part in self._tree_path(i):
+                directory = directory.setdefault(part, {})
+
+            name = 'file{:06}'.format(i)
+            _, _, ext = key.partition('--')[2].partition('.')
+            if ext:
+                name = '{}.{}'.format(name, ext)
+            target = '../' * self.depth + '.git/annex/objects/{}/{}/{}/{}'
+            target = target.format(*hash_dir_mixed(key), key, key)
+            directory[name] = (target.encode(), pygit2.GIT_FILEMODE_LINK)
+
+            if self._random.random() < self.present:
+                self._write_content(key, i)
+
+        branch['uuid.log'] = '{} synthetic\n'.format(self._uuid).encode()
+        sig = pygit2.Signature(
+            'benchmark', 'benchmark@localhost', self._timestamp, 0,
+        )
+
+        commit = self._repo.create_commit(
+            None, sig, sig, 'synthetic git-annex branch',
+            self._write_tree(branch), [],
+        )
+        self._repo.create_branch('git-annex', self._repo[commit])
+        self._repo.create_commit(
+            'HEAD', sig, sig, 'synthetic tree',
+            self._write_tree(head), [],
+        )
+
+        fmt = "Generated {} keys with {} fields in '{}'."
+        msg = fmt.format(self.keys, self.fields, self.path)
+        logger.info(msg)
+
+        # Lets git-annex adopt the branch, metadata edits need it
+        if init:
+            subprocess.run(
+                ['git', 'annex', 'init', 'synthetic'],
+                cwd=self.path, check=False,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+
+        return self.path
+
+    def _make_key(self, i):
+        digest = hashlib.sha256(
+            '{}:{}'.format(self.seed, i).encode()
+        ).hexdigest()
+        ext = _EXTENSIONS[i % len(_EXTENSIONS)]
+        size = self._random.randrange(1, 1 << 30)
+        key = 'SHA256E-s{}--{}'.format(size, digest)
+        if ext:
+            key = '{}.{}'.format(key, ext)
+        return key
+
+    def _tree_path(self, i):
+        # Files are dealt round-robin into fanout ** depth directories
+        parts = []
+        for _ in range(self.depth):
+            i, digit = divmod(i, self.fanout)
+            parts.append('dir{:03}'.format(digit))
+        return parts
+
+    def _location_log(self):
+        line = '{}.0s 1 {}\n'.format(self._timestamp, self._uuid)
+        return line.encode()
+
+    def _value(self):
+        n = self._random.randrange(self.values_per_field)
+        word = _WORDS[n % len(_WORDS)]
+        value = '{} {}'.format(word, n) if n % 3 == 0 else word + str(n)
+
+        # Values with spaces are stored base64 encoded, like git-annex
+        if ' ' in value:
+            return '+!' + base64.b64encode(value.encode()).decode()
+        return '+' + value
+
+    def _metadata_log(self, fields):
+        # Older lines set values that later lines partly take back
+        lines, previous = [], {}
+        timestamp = self._timestamp
+        for n in range(self.history):
+            tokens = ['{}.{}s'.format(timestamp, n)]
+            for field in fields:
+                tokens.append(field)
+                if field in previous and self._random.random() < 0.3:
+                    tokens.append('-' + previous[field][1:])
+                previous[field] = self._value()
+                tokens.append(previous[field])
+            tokens.append('lastchanged')
+            tokens.append('+{}'.format(timestamp))
+            lines.append(' '.join(tokens))
+            timestamp += self._random.randrange(1, 86400)
+        return ('\n'.join(lines) + '\n').encode()
+
+    def _write_content(self, key, i):
+        path = os.path.join(
+            self.path, '.git', 'annex', 'objects',
+            *hash_dir_mixed(key), key,
+        )
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, key), 'wb') as f:
+            f.write('synthetic content {}\n'.format(i).encode())
+
+    def _write_tree(self, entries):
+        builder = self._repo.TreeBuilder()
+        for name, value in sorted(entries.items()):
+            if isinstance(value, dict):
+                oid = self._write_tree(value)
+                builder.insert(name, oid, pygit2.GIT_FILEMODE_TREE)
+            elif isinstance(value, tuple):
+                data, mode = value
+                builder.insert(name, self._repo.create_blob(data), mode)
+            else:
+                oid = self._repo.create_blob(value)
+                builder.insert(name, oid, pygit2.GIT_FILEMODE_BLOB)
+        return builder.write()
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args=self.path,
+        )
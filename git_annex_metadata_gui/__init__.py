@@ -17,17 +17,24 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 import argparse
+import os
 import sys
 import logging
+import time
+import tracemalloc
+
+# Startup timings are measured from here, before Qt is even loaded
+started = time.monotonic()
 
-from PyQt5 import Qt
-from PyQt5 import QtCore
-from PyQt5 import QtGui
 from PyQt5 import QtWidgets
 
-from .utils import AutoConsumed
+from .profiling import start_profiler
+from .profiling import stop_profiler
+from .scheduler import default_scheduler
+from .stall_watchdog import StallWatchdog
+from .tracing import start_tracer
+from .tracing import stop_tracer
 from .utils import StatusBarLogHandler
-from .main_window import MainWindow
 
 app = None
 
@@ -35,24 +42,67 @@ logger = logging.getLogger(__name__)
 
 def main():
     global app
+
+    # The platform has to be picked before the application exists,
+    # while the rest of the arguments are parsed after Qt's own
+    if '--headless-benchmark' in sys.argv[1:]:
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+    # As early as possible, allocations from before aren't traced
+    if '--trace-memory' in sys.argv[1:]:
+        tracemalloc.start()
+
     app = QtWidgets.QApplication(sys.argv)
     my_args = parse_args(app.arguments())
 
+    if my_args.profile:
+        start_profiler(my_args.profile, origin=started)
+    if my_args.trace:
+        start_tracer(my_args.trace)
+
+    if my_args.full_load:
+        default_scheduler().target_latency = float('inf')
+
+    if my_args.headless_benchmark:
+        setup_logger(None, debug=my_args.debug)
+        if not my_args.repo_path:
+            logger.error("No repository given to benchmark.")
+            return 2
+
+        # Only needed here, it imports the repository libraries
+        from .headless import run_headless_benchmark
+        try:
+            report = run_headless_benchmark(my_args.repo_path)
+        finally:
+            stop_tracer()
+            stop_profiler()
+
+        if report is None or not report['complete']:
+            return 1
+        return 0
+
+    # Pulls in every widget and model module, only done once the
+    # window is about to be shown
+    from .main_window import MainWindow
     main_window = MainWindow()
     setup_logger(main_window, debug=my_args.debug)
 
-    if my_args.full_load:
-        AutoConsumed._timeout = float('inf')
+    watchdog = None
+    if my_args.watchdog:
+        watchdog = StallWatchdog(threshold=my_args.watchdog_ms / 1000)
+        watchdog.start()
 
     if my_args.repo_path:
-        QtCore.QMetaObject.invokeMethod(
-            main_window, 'open_repo',
-            Qt.Qt.QueuedConnection,
-            QtCore.Q_ARG(str, my_args.repo_path),
-        )
+        main_window.open_repo_when_shown(my_args.repo_path)
 
     main_window.show()
-    return app.exec_()
+    try:
+        return app.exec_()
+    finally:
+        if watchdog is not None:
+            watchdog.stop()
+        stop_tracer()
+        stop_profiler()
 
 
 def setup_logger(main_window, debug=False):
@@ -65,19 +115,20 @@ def setup_logger(main_window, debug=False):
     )
     stderr_handler.setFormatter(stderr_formatter)
 
-    statusbar_handler = StatusBarLogHandler(main_window.statusBar())
-    statusbar_handler.setLevel(logging.INFO)
-    statusbar_formatter = logging.Formatter(
-        fmt='{message}',
-        style='{',
-    )
-    statusbar_handler.setFormatter(statusbar_formatter)
-
     root_logger = logging.getLogger()
     root_logger.addHandler(stderr_handler)
-    root_logger.addHandler(statusbar_handler)
     root_logger.setLevel(logging.INFO)
 
+    if main_window is not None:
+        statusbar_handler = StatusBarLogHandler(main_window.statusBar())
+        statusbar_handler.setLevel(logging.INFO)
+        statusbar_formatter = logging.Formatter(
+            fmt='{message}',
+            style='{',
+        )
+        statusbar_handler.setFormatter(statusbar_formatter)
+        root_logger.addHandler(statusbar_handler)
+
     if debug:
         stderr_handler.setLevel(logging.DEBUG)
         root_logger.setLevel(logging.DEBUG)
@@ -123,6 +174,44 @@ def parse_args(argv):
         help="don't load models incrementially",
     )
 
+    parser.add_argument(
+        "--headless-benchmark",
+        action='store_true',
+        help="load repo-path without a window, print timings and exit",
+    )
+
+    parser.add_argument(
+        "--trace",
+        metavar='path',
+        help="write a Chrome trace of loading and UI work to path",
+    )
+
+    parser.add_argument(
+        "--trace-memory",
+        action='store_true',
+        help="trace allocations to show where memory goes",
+    )
+
+    parser.add_argument(
+        "--profile",
+        metavar='path',
+        help="write a cProfile dump and phase timings to path",
+    )
+
+    parser.add_argument(
+        "--watchdog",
+        action='store_true',
+        help="log where the GUI thread is when it stalls",
+    )
+
+    parser.add_argument(
+        "--watchdog-ms",
+        metavar='ms',
+        type=int,
+        default=200,
+        help="how long a stall has to be for --watchdog (default: 200)",
+    )
+
     return parser.parse_args(argv[1:])
 
 
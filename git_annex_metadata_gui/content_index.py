@@ -0,0 +1,332 @@
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import hashlib
+import logging
+import os
+import sys
+import time
+
+from PyQt5 import QtCore
+
+from .metadata_log import hash_dir_lower
+from .utils import AutoConsumed
+
+logger = logging.getLogger(__name__)
+
+_MIXED_ALPHABET = '0123456789zqjxkmvwgpfZQJXKMVWGPF'
+
+
+def hash_dir_mixed(key):
+    # Where git-annex puts a key's content in non-bare repositories,
+    # five bits of the key's md5 per letter, as Xx/Yy
+    digest = hashlib.md5(key.encode('utf-8')).digest()
+    word = int.from_bytes(digest[:4], 'little')
+    chars = [_MIXED_ALPHABET[(word >> (6 * i)) & 31] for i in range(4)]
+    return chars[1] + chars[0], chars[3] + chars[2]
+
+
+def scan_directory(path):
+    try:
+        with os.scandir(path) as entries:
+            return [
+                entry for entry in entries
+                if entry.is_dir(follow_symlinks=False)
+            ]
+    except OSError:
+        return []
+
+
+def modified_since(entry, since):
+    try:
+        return entry.stat(follow_symlinks=False).st_mtime >= since
+    except OSError:
+        return True
+
+
+class ContentIndex(QtCore.QObject):
+    content_changed = QtCore.pyqtSignal(list)
+
+    # git-annex creates the key directory before moving content in
+    _rescan_delay = 200
+
+    # Keys found while scanning are announced in batches
+    _batch_size = 1000
+
+    # Directories inotify ran out of watches for are checked this often
+    _poll_interval = 5000
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._root = None
+        self._locations = {}
+        self._tops = {}
+        self._scanned_at = {}
+        self._scanned_tops = set()
+        self._dirty = set()
+        self._watched = set()
+        self._unwatched = set()
+
+        self._watcher = QtCore.QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._on_directory_changed)
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self._rescan_delay)
+        self._timer.timeout.connect(self._rescan)
+
+        self._poll_timer = QtCore.QTimer(self)
+        self._poll_timer.setInterval(self._poll_interval)
+        self._poll_timer.timeout.connect(self._poll)
+
+    def setRepo(self, repo):
+        self._scan.stop()
+        self._timer.stop()
+        self._poll_timer.stop()
+        if self._watched:
+            self._watcher.removePaths(list(self._watched))
+            self._watched = set()
+        self._unwatched = set()
+
+        self._root = os.path.join(repo.path, 'annex', 'objects')
+        self._locations = {}
+        self._tops = {}
+        self._scanned_at = {}
+        self._scanned_tops = set()
+        self._dirty = set()
+        self._scan.start()
+
+    def contentlocation(self, key):
+        location = self._locations.get(key)
+        if location is None and self._scan.running():
+            return self._find_unscanned(key)
+        return location
+
+    def _find_unscanned(self, key):
+        # Until the scan reaches a key's directory only a stat can
+        # tell, the first scan of a large annex takes a while
+        for aa, bb in (hash_dir_mixed(key), hash_dir_lower(key)):
+            top = os.path.join(self._root, aa)
+            if top in self._scanned_tops:
+                continue
+            content = os.path.join(top, bb, key, key)
+            if os.path.isfile(content):
+                return content
+
+    def _depth(self, path):
+        rel = os.path.relpath(path, self._root)
+        return 0 if rel == '.' else rel.count(os.sep) + 1
+
+    def _watch(self, *paths):
+        paths = [
+            path for path in paths
+            if path not in self._watched and path not in self._unwatched
+        ]
+        if not paths:
+            return
+
+        failed = self._watcher.addPaths(paths)
+        self._watched.update(set(paths) - set(failed))
+        if failed:
+            fmt = "Can't watch {} annex object directories, polling them."
+            msg = fmt.format(len(failed))
+            logger.debug(msg)
+            self._unwatched.update(failed)
+            if not self._poll_timer.isActive():
+                self._poll_timer.start()
+
+    def _unwatch(self, path):
+        self._unwatched.discard(path)
+        if path in self._watched:
+            self._watcher.removePath(path)
+            self._watched.discard(path)
+
+    def _poll(self):
+        if not self._unwatched:
+            self._poll_timer.stop()
+            return
+
+        # Checking aa finds which of its aa/bb directories changed
+        for path in self._unwatched:
+            if self._depth(path) == 2:
+                self._dirty.add(os.path.dirname(path))
+            else:
+                self._dirty.add(path)
+        self._rescan()
+
+    @AutoConsumed
+    def _scan(self):
+        if not os.path.isdir(self._root):
+            return
+
+        # Directories down to aa/bb are watched, as far as inotify
+        # allows, the rest are polled
+        self._watch(self._root)
+        tops = scan_directory(self._root)
+        changed = []
+
+        for done, top in enumerate(tops, 1):
+            for keys in self._scan_top(top.path):
+                changed.extend(keys)
+                if len(changed) >= self._batch_size:
+                    self.content_changed.emit(changed)
+                    changed = []
+                yield done, len(tops)
+            self._scanned_tops.add(top.path)
+
+        if changed:
+            self.content_changed.emit(changed)
+
+        fmt = "Indexed {} present keys in '{}'."
+        msg = fmt.format(len(self._locations), self._root)
+        logger.info(msg)
+
+    def _scan_top(self, path):
+        # Yields the changed keys of each aa/bb directory in aa that
+        # is new or was modified since the last scan of aa. Content
+        # coming or going mostly creates or removes aa/bb, as there
+        # are few keys in each of them.
+        since = self._scanned_at.get(path)
+        # File systems keep coarser time than the clock, a change
+        # right after this scan could otherwise look older than it
+        self._scanned_at[path] = time.time() - 1
+        hash_dirs = self._tops.setdefault(path, {})
+        self._watch(path)
+
+        present = set()
+        entries = scan_directory(path)
+        self._watch(*(entry.path for entry in entries))
+        for entry in entries:
+            present.add(entry.name)
+            if since is None or modified_since(entry, since):
+                yield self._scan_hash_dir(path, entry.name)
+
+        for name in set(hash_dirs) - present:
+            self._unwatch(os.path.join(path, name))
+            keys = hash_dirs.pop(name)
+            for key in keys:
+                self._locations.pop(key, None)
+            yield list(keys)
+
+    def _scan_hash_dir(self, top, name):
+        hash_dirs = self._tops[top]
+        path = os.path.join(top, name)
+        old_keys = hash_dirs.get(name, frozenset())
+        new_keys = set()
+        waiting = []
+
+        # objects/aa/bb/KEY/KEY
+        for entry in scan_directory(path):
+            content = os.path.join(entry.path, entry.name)
+            if os.path.isfile(content):
+                new_keys.add(entry.name)
+                self._locations[entry.name] = content
+            else:
+                waiting.append(entry.path)
+
+        for key in old_keys - new_keys:
+            self._locations.pop(key, None)
+
+        if new_keys:
+            hash_dirs[name] = new_keys
+        else:
+            hash_dirs.pop(name, None)
+
+        # Only while their content is being moved in
+        self._watch(*waiting)
+        return list(old_keys ^ new_keys)
+
+    def _on_directory_changed(self, path):
+        self._dirty.add(path)
+        self._timer.start()
+
+    def _rescan(self):
+        if self._scan.running():
+            # Picked up by the scan, or retried once it's done
+            self._timer.start()
+            return
+
+        dirty, self._dirty = self._dirty, set()
+        changed = []
+
+        for path in dirty:
+            depth = self._depth(path)
+
+            if depth == 0:
+                changed.extend(self._rescan_root())
+            elif depth == 1:
+                for keys in self._scan_top(path):
+                    changed.extend(keys)
+            elif depth == 2:
+                if not os.path.isdir(path):
+                    self._unwatch(path)
+                top, name = os.path.split(path)
+                if top in self._tops:
+                    changed.extend(self._scan_hash_dir(top, name))
+            elif depth == 3:
+                self._unwatch(path)
+                top, name = os.path.split(os.path.dirname(path))
+                if top in self._tops:
+                    changed.extend(self._scan_hash_dir(top, name))
+
+        if changed:
+            fmt = "Content presence changed for {} keys."
+            msg = fmt.format(len(changed))
+            logger.debug(msg)
+            self.content_changed.emit(changed)
+
+    def _rescan_root(self):
+        changed = []
+        present = set()
+        for top in scan_directory(self._root):
+            present.add(top.path)
+            if top.path not in self._tops:
+                for keys in self._scan_top(top.path):
+                    changed.extend(keys)
+
+        for path in set(self._tops) - present:
+            self._unwatch(path)
+            self._scanned_at.pop(path, None)
+            for name in self._tops[path]:
+                self._unwatch(os.path.join(path, name))
+            for keys in self._tops.pop(path).values():
+                for key in keys:
+                    self._locations.pop(key, None)
+                changed.extend(keys)
+
+        return changed
+
+    def memory_usage(self):
+        size = sys.getsizeof(self._locations)
+        size += sum(sys.getsizeof(path) for path in self._locations.values())
+        size += sys.getsizeof(self._tops)
+        for hash_dirs in self._tops.values():
+            size += sys.getsizeof(hash_dirs)
+            size += sum(sys.getsizeof(keys) for keys in hash_dirs.values())
+        return size
+
+    def __contains__(self, key):
+        return key in self._locations
+
+    def __len__(self):
+        return len(self._locations)
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args=self._root,
+        )
@@ -16,14 +16,15 @@
 
 import logging
 
-from PyQt5 import Qt
 from PyQt5 import QtCore
 from PyQt5 import QtWidgets
 
 try:
     from .auto_size_line_edit import AutoSizeLineEdit
+    from .field_value_list import FieldValueList
 except ImportError:
     from auto_size_line_edit import AutoSizeLineEdit
+    from field_value_list import FieldValueList
 
 logger = logging.getLogger(__name__)
 
@@ -31,30 +32,59 @@ logger = logging.getLogger(__name__)
 class FieldItemEdit(QtWidgets.QWidget):
     cleared = QtCore.pyqtSignal()
 
+    # Fields with more values than this are edited in a list view
+    _list_threshold = 8
+
     def __init__(self, item, parent=None):
         super().__init__(parent)
-        self._item = item
+        self._item = None
+        self._model = None
         self._values = []
+        self._value_list = None
 
         layout = QtWidgets.QHBoxLayout(self)
         layout.setContentsMargins(0, 0, 0, 0)
         self.setLayout(layout)
 
-        model = self._item.model()
-        model.dataChanged.connect(self._on_data_changed)
-
         append_button = QtWidgets.QPushButton()
         append_button.setText('+')
         append_button.setMaximumWidth(32)
         append_button.clicked.connect(self._on_append_button_clicked)
         self.layout().addWidget(append_button)
 
+        completer = QtWidgets.QCompleter(self)
+        completer.setModel(QtCore.QStringListModel(completer))
+        completer.setCompletionMode(completer.UnfilteredPopupCompletion)
+        self._completer = completer
+
+        self.set_item(item)
+
+    def set_item(self, item):
+        model = item.model() if item is not None else None
+
+        if model is not self._model:
+            if self._model is not None:
+                try:
+                    self._model.dataChanged.disconnect(self._on_data_changed)
+                except (TypeError, RuntimeError):
+                    pass
+            if model is not None:
+                model.dataChanged.connect(self._on_data_changed)
+            self._model = model
+
+        self._item = item
+        self._values = []
         self.update_widgets()
 
     def widget_count(self):
-        return self.layout().count() - 1
+        if self._value_list is None:
+            return self.layout().count() - 1
+        return self.layout().count() - 2
 
     def _on_data_changed(self, topLeft, bottomRight, roles):
+        if self._item is None:
+            return
+
         rows = range(topLeft.row(), bottomRight.row() + 1)
         columns = range(topLeft.column(), bottomRight.column() + 1)
 
@@ -65,17 +95,55 @@ class FieldItemEdit(QtWidgets.QWidget):
         widget = AutoSizeLineEdit()
         widget.editingFinished.connect(self._on_editing_finished)
         widget.setClearButtonEnabled(True)
-        widget.setAlignment(Qt.Qt.AlignCenter)
+        widget.setAlignment(QtCore.Qt.AlignCenter)
+        widget.setCompleter(self._completer)
+        widget.textEdited.connect(self._update_completions)
         return widget
 
-    def update_widgets(self):
-        values = self._item.data(Qt.Qt.UserRole)
+    def _update_completions(self, text):
+        value_index = getattr(self._model, 'value_index', None)
+        field = getattr(self._item, 'field', None)
+        if value_index is None or field is None or not text:
+            return
 
-        for v in set(self._values) - values:
-            self._values.remove(v)
+        values = value_index.complete(field, text)
+        self._completer.model().setStringList(values)
 
-        new_values = sorted(values - set(self._values))
-        self._values.extend(new_values)
+    def update_widgets(self):
+        if self._item is not None:
+            values = self._item.data(QtCore.Qt.UserRole)
+        else:
+            values = set()
+
+        if len(values) > self._list_threshold:
+            self._update_line_edits(set())
+            self._show_value_list(values)
+        else:
+            self._hide_value_list()
+            self._update_line_edits(values)
+
+    def _show_value_list(self, values):
+        if self._value_list is None:
+            value_list = FieldValueList()
+            value_list.values_edited.connect(self._on_values_edited)
+            value_list.text_edited.connect(self._update_completions)
+            value_list.set_completer(self._completer)
+            self.layout().insertWidget(self.widget_count(), value_list)
+            self._value_list = value_list
+
+        self._value_list.set_values(values)
+        self._value_list.show()
+
+    def _hide_value_list(self):
+        if self._value_list is not None:
+            self._value_list.set_values(set())
+            self._value_list.hide()
+
+    def _update_line_edits(self, values):
+        removed = set(self._values) - values
+        if removed:
+            self._values = [v for v in self._values if v not in removed]
+        self._values.extend(sorted(values.difference(self._values)))
 
         while self.widget_count() > len(self._values):
             child = self.layout().takeAt(self.widget_count() - 1)
@@ -102,6 +170,9 @@ class FieldItemEdit(QtWidgets.QWidget):
             self.setTabOrder(left, right)
 
     def _on_editing_finished(self):
+        if self._item is None:
+            return
+
         values = []
         for idx in range(self.widget_count()):
             value = self.layout().itemAt(idx).widget().text()
@@ -110,9 +181,23 @@ class FieldItemEdit(QtWidgets.QWidget):
             if idx < len(self._values) and value != self._values[idx]:
                 self._values[idx] = value
 
-        self._item.setData(set(values), role=Qt.Qt.UserRole)
+        self._item.setData(set(values), role=QtCore.Qt.UserRole)
+
+    def _on_values_edited(self):
+        if self._item is None:
+            return
+
+        values = self._value_list.values()
+        self._item.setData(values, role=QtCore.Qt.UserRole)
 
     def _on_append_button_clicked(self):
+        self.edit_new_value()
+
+    def edit_new_value(self):
+        if self._value_list is not None and self._value_list.isVisible():
+            self._value_list.edit_new_value()
+            return
+
         button_idx = self.widget_count()
         if button_idx == 0:
             create = True
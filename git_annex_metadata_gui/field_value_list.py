@@ -0,0 +1,188 @@
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import bisect
+import logging
+
+from PyQt5 import QtCore
+from PyQt5 import QtGui
+from PyQt5 import QtWidgets
+
+logger = logging.getLogger(__name__)
+
+
+class FieldValueModel(QtCore.QAbstractListModel):
+    values_edited = QtCore.pyqtSignal()
+
+    # Past this many changed rows, a reset is cheaper than row updates
+    _reset_threshold = 64
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._values = []
+        self._value_set = set()
+
+    def values(self):
+        return set(self._value_set)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._values)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        roles = (
+            QtCore.Qt.DisplayRole, QtCore.Qt.EditRole, QtCore.Qt.ToolTipRole,
+        )
+        if role in roles:
+            return self._values[index.row()]
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid():
+            flags |= QtCore.Qt.ItemIsEditable | QtCore.Qt.ItemNeverHasChildren
+        return flags
+
+    def setData(self, index, value, role=QtCore.Qt.EditRole):
+        if role != QtCore.Qt.EditRole or not index.isValid():
+            return False
+
+        old_value = self._values[index.row()]
+        if value == old_value:
+            return False
+
+        added = {value} if value else set()
+        self.apply_delta(added, {old_value})
+        self.values_edited.emit()
+        return True
+
+    def set_values(self, values):
+        added = values - self._value_set
+        removed = self._value_set - values
+        self.apply_delta(added, removed)
+
+    def apply_delta(self, added, removed):
+        added = added - self._value_set
+        removed = removed & self._value_set
+        if not added and not removed:
+            return
+
+        if len(added) + len(removed) > self._reset_threshold:
+            self.beginResetModel()
+            self._value_set = (self._value_set - removed) | added
+            self._values = sorted(self._value_set)
+            self.endResetModel()
+            return
+
+        for value in removed:
+            row = bisect.bisect_left(self._values, value)
+            self.beginRemoveRows(QtCore.QModelIndex(), row, row)
+            del self._values[row]
+            self._value_set.remove(value)
+            self.endRemoveRows()
+
+        for value in added:
+            row = bisect.bisect_left(self._values, value)
+            self.beginInsertRows(QtCore.QModelIndex(), row, row)
+            self._values.insert(row, value)
+            self._value_set.add(value)
+            self.endInsertRows()
+
+    def add_value(self, value):
+        if value and value not in self._value_set:
+            self.apply_delta({value}, set())
+            self.values_edited.emit()
+
+    def remove_rows(self, rows):
+        removed = {self._values[row] for row in rows}
+        if removed:
+            self.apply_delta(set(), removed)
+            self.values_edited.emit()
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args=len(self._values),
+        )
+
+
+class FieldValueList(QtWidgets.QWidget):
+    values_edited = QtCore.pyqtSignal()
+    text_edited = QtCore.pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+
+        self._model = FieldValueModel(self)
+        self._model.values_edited.connect(self.values_edited)
+
+        view = QtWidgets.QListView()
+        view.setModel(self._model)
+        view.setFlow(QtWidgets.QListView.LeftToRight)
+        view.setWrapping(True)
+        view.setResizeMode(QtWidgets.QListView.Adjust)
+        view.setLayoutMode(QtWidgets.QListView.Batched)
+        view.setSpacing(2)
+        view.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+        layout.addWidget(view)
+        self._view = view
+
+        shortcut = QtWidgets.QShortcut(QtGui.QKeySequence.Delete, view)
+        shortcut.setContext(QtCore.Qt.WidgetShortcut)
+        shortcut.activated.connect(self._remove_selected)
+
+        line_edit = QtWidgets.QLineEdit()
+        line_edit.setPlaceholderText('Add value...')
+        line_edit.returnPressed.connect(self._add_value)
+        line_edit.textEdited.connect(self.text_edited)
+        layout.addWidget(line_edit)
+        self._add_edit = line_edit
+
+    def values(self):
+        return self._model.values()
+
+    def set_values(self, values):
+        self._model.set_values(values)
+
+    def set_completer(self, completer):
+        self._add_edit.setCompleter(completer)
+
+    def edit_new_value(self):
+        self._add_edit.setFocus()
+
+    def _add_value(self):
+        value = self._add_edit.text()
+        self._add_edit.clear()
+        self._model.add_value(value)
+
+    def _remove_selected(self):
+        indexes = self._view.selectionModel().selectedIndexes()
+        self._model.remove_rows(index.row() for index in indexes)
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args=self._model,
+        )
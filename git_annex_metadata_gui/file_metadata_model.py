@@ -17,54 +17,78 @@
 import collections
 import logging
 import random
-import pygit2
+import time
 
-from PyQt5 import Qt
 from PyQt5 import QtCore
 from PyQt5 import QtGui
 from PyQt5 import QtWidgets
 
-from git_annex_adapter.repo import AnnexedFile
-from git_annex_adapter.repo import AnnexedFileTree
-
+from .profiling import record_phase
+from .progress import estimate_total
+from .tracing import trace_span
+from .tree_walker import TreeWalker
 from .utils import AutoConsumed
+from .utils import ContentPresentRole
 from .utils import DataProxyItem
+from .utils import file_icon
+from .utils import set_header_labels
 
 logger = logging.getLogger(__name__)
 
 
 class AnnexedFileItem(DataProxyItem):
-    def __init__(self, key_item, filename):
-        super().__init__(key_item)
+    def __init__(self, key, filename):
+        super().__init__()
+        self._key = key
         self._name = filename
 
         self.setSelectable(True)
         self.setEditable(False)
         self.setEnabled(True)
-        self.setFlags(self.flags() | Qt.Qt.ItemNeverHasChildren)
+        self.setFlags(self.flags() | QtCore.Qt.ItemNeverHasChildren)
+
+    def source(self):
+        # Files are shown before their keys load, as placeholders
+        if self._item is None:
+            model = self.model()
+            if model is not None:
+                self._item = model.key_item(self._key)
+        return self._item
 
     @property
     def key(self):
-        return self._item.key
+        return self._key
 
     @property
     def name(self):
         return self._name
 
+    @property
+    def metadata(self):
+        source = self.source()
+        if source is None:
+            return None
+        return source.metadata
+
     @property
     def contentlocation(self):
-        return self._item.contentlocation
+        source = self.source()
+        if source is None:
+            return self.model().contentlocation(self._key)
+        return source.contentlocation
 
     def type(self):
         return QtGui.QStandardItem.UserType + 4
 
-    def data(self, role=Qt.Qt.DisplayRole):
-        if role == Qt.Qt.DisplayRole:
+    def data(self, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole:
             return self._name
-        if role == Qt.Qt.ToolTipRole:
+        if role == QtCore.Qt.ToolTipRole:
             return self._name
-        if role == Qt.Qt.FontRole:
+        if role == QtCore.Qt.FontRole:
             return QtGui.QStandardItem.data(self, role=role)
+        if role == ContentPresentRole and self.source() is None:
+            return self.contentlocation is not None
         else:
             return super().data(role=role)
 
@@ -86,36 +110,53 @@ class AnnexedFileItem(DataProxyItem):
             name=__name__,
             cls=self.__class__.__name__,
             args={
-                'item': self._item,
+                'key': self._key,
                 'name': self._name,
             },
         )
 
 
 class AnnexedFileFieldItem(DataProxyItem):
-    def __init__(self, field_item, filename):
-        super().__init__(field_item)
-        self._name = filename
+    # Only created from the model's item prototype, when a file's
+    # field cell is asked for as an item rather than just its data
+    @property
+    def file_item(self):
+        return self.model().itemFromIndex(self.index().sibling(self.row(), 0))
+
+    def source(self):
+        if self._item is None:
+            model = self.model()
+            key_index = model.key_index(self.index())
+            if key_index is not None:
+                self._item = key_index.model().itemFromIndex(key_index)
+        return self._item
 
     @property
     def key(self):
-        return self._item.key
+        return self.file_item.key
 
     @property
     def name(self):
-        return self._name
+        return self.file_item.name
+
+    @property
+    def field(self):
+        return self.source().field
 
     @property
     def contentlocation(self):
-        return self._item.contentlocation
+        return self.file_item.contentlocation
+
+    def clone(self):
+        return self.__class__()
 
     def __lt__(self, other):
         if other is None:
             return True
 
         elif isinstance(other, AnnexedFileFieldItem):
-            lhs = self.data(role=Qt.Qt.UserRole)
-            rhs = other.data(role=Qt.Qt.UserRole)
+            lhs = self.data(role=QtCore.Qt.UserRole)
+            rhs = other.data(role=QtCore.Qt.UserRole)
             if len(lhs) == 0:
                 return False
             elif len(rhs) == 0:
@@ -144,9 +185,7 @@ class AnnexedDirectoryItem(QtGui.QStandardItem):
         self.setText(self._name)
         self.setToolTip(self._name)
 
-        icon = QtWidgets.QFileIconProvider.Folder
-        icon = QtWidgets.QFileIconProvider().icon(icon)
-        self.setIcon(icon)
+        self.setIcon(file_icon(QtWidgets.QFileIconProvider.Folder))
 
         self.setSelectable(True)
         self.setEditable(False)
@@ -180,60 +219,41 @@ class AnnexedDirectoryFieldItem(QtGui.QStandardItem):
     def __init__(self, dir_item):
         super().__init__()
         self._item = dir_item
-        self._connected = False
         self._column_data_cache = {}
 
         self.setSelectable(True)
         self.setEditable(False)
         self.setEnabled(True)
-        self.setFlags(self.flags() | Qt.Qt.ItemNeverHasChildren)
-
-        if self._item.model():
-            self._connect()
-
-    def _connect(self):
-        if self._connected:
-            return
-
-        model = self._item.model()
-        model.dataChanged.connect(self._propagate_changes)
-        model.layoutChanged.connect(self._emit_data_changed)
-        model.modelReset.connect(self._emit_data_changed)
-        model.rowsInserted.connect(self._on_rows_inserted)
-        model.rowsMoved.connect(self._on_rows_moved)
-        model.rowsRemoved.connect(self._on_rows_removed)
-        model.columnsInserted.connect(self._on_columns_inserted)
-        model.columnsMoved.connect(self._on_columns_moved)
-        model.columnsRemoved.connect(self._on_columns_removed)
-
-        self._connected = True
+        self.setFlags(self.flags() | QtCore.Qt.ItemNeverHasChildren)
 
     def type(self):
         return QtGui.QStandardItem.UserType + 7
 
-    def data(self, role=Qt.Qt.DisplayRole):
-        if role == Qt.Qt.DisplayRole:
+    def data(self, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole:
             return self._column_data(role=role)
 
-        elif role == Qt.Qt.ToolTipRole:
+        elif role == QtCore.Qt.ToolTipRole:
             return self._column_data(role=role)
 
         else:
             return super().data(role=role)
 
-    def _column_data(self, role=Qt.Qt.DisplayRole):
+    def _column_data(self, role=QtCore.Qt.DisplayRole):
         if role in self._column_data_cache:
             return self._column_data_cache[role]
 
+        # File cells are mostly empty, ask the model instead of items
+        model = self._item.model()
+        parent = self._item.index()
         children = (
-            self._item.child(row, self.column())
+            model.index(row, self.column(), parent)
             for row in range(self._item.rowCount())
         )
 
         responses = set()
         for child in children:
-            if child:
-                responses.add(child.data(role=role))
+            responses.add(child.data(role))
             if len(responses) > 1:
                 responses.clear()
                 break
@@ -246,53 +266,10 @@ class AnnexedDirectoryFieldItem(QtGui.QStandardItem):
         self._column_data_cache[role] = data
         return data
 
-    def _propagate_changes(self, topLeft, bottomRight, roles):
-        rows = range(topLeft.row(), bottomRight.row() + 1)
-        columns = range(topLeft.column(), bottomRight.column() + 1)
-
-        parent = topLeft.parent()
-        if parent != bottomRight.parent():
-            self._emit_data_changed()
-            return
-
-        if parent != self._item.index():
-            return
-
-        if self.column() in columns:
-            self._emit_data_changed()
-
     def _emit_data_changed(self):
         self._column_data_cache.clear()
         self.emitDataChanged()
 
-    def _on_rows_inserted(self, parent, first, last):
-        if parent == self._item.index():
-            self._emit_data_changed()
-
-    def _on_rows_moved(self, parent, start, end, destination, row):
-        if parent == self._item.index():
-            self._emit_data_changed()
-        if destination == self._item.index():
-            self._emit_data_changed()
-
-    def _on_rows_removed(self, parent, first, last):
-        if parent == self._item.index():
-            self._emit_data_changed()
-
-    def _on_columns_inserted(self, parent, first, last):
-        if parent == self._item.index():
-            self._emit_data_changed()
-
-    def _on_columns_moved(self, parent, start, end, destination, col):
-        if parent == self._item.index():
-            self._emit_data_changed()
-        if destination == self._item.index():
-            self._emit_data_changed()
-
-    def _on_columns_removed(self, parent, first, last):
-        if parent == self._item.index():
-            self._emit_data_changed()
-
     def __lt__(self, other):
         if other is None:
             return True
@@ -301,8 +278,8 @@ class AnnexedDirectoryFieldItem(QtGui.QStandardItem):
             return True
 
         elif isinstance(other, AnnexedDirectoryFieldItem):
-            lhs = self.data(role=Qt.Qt.UserRole)
-            rhs = other.data(role=Qt.Qt.UserRole)
+            lhs = self.data(role=QtCore.Qt.UserRole)
+            rhs = other.data(role=QtCore.Qt.UserRole)
             if len(lhs) == 0:
                 return False
             elif len(rhs) == 0:
@@ -331,18 +308,43 @@ class AnnexedDirectoryFieldItem(QtGui.QStandardItem):
 
 
 class AnnexedFileMetadataModel(QtGui.QStandardItemModel):
+    progress_changed = QtCore.pyqtSignal(str, int, int)
+    progress_finished = QtCore.pyqtSignal(str)
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self._treeish = None
-        self._pending_files = collections.defaultdict(list)
+        self._file_items = {}
+        self.setItemPrototype(AnnexedFileFieldItem())
+
+        # Directory cells summarize their children, and are refreshed
+        # from here rather than each listening to every change. Refreshes
+        # are coalesced so a batch of changes redraws each one once
+        self._dirty_directories = {}
+        self._refresh_timer = QtCore.QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.setInterval(0)
+        self._refresh_timer.timeout.connect(self._flush_directories)
+
+        self.dataChanged.connect(self._on_data_changed)
+        self.layoutChanged.connect(self._refresh_all_directories)
+        self.modelReset.connect(self._refresh_all_directories)
+        self.rowsInserted.connect(self._on_rows_changed)
+        self.rowsRemoved.connect(self._on_rows_changed)
+        self.rowsMoved.connect(self._on_rows_moved)
+        self.columnsInserted.connect(self._on_rows_changed)
+        self.columnsRemoved.connect(self._on_rows_changed)
+        self.columnsMoved.connect(self._on_rows_moved)
 
     def setSourceModel(self, model):
         self._model = model
 
+        model.dataChanged.connect(self._on_source_data_changed)
         model.columnsInserted.connect(self._on_columns_inserted)
         model.headerDataChanged.connect(self._on_header_data_changed)
         model.modelReset.connect(self.setTreeish)
-        model.key_inserted.connect(self._on_key_inserted)
+        model.keys_inserted.connect(self._on_keys_inserted)
+        model.schema_loaded.connect(self._on_schema_loaded)
 
         if self._model.repo:
             self.setTreeish()
@@ -351,6 +353,16 @@ class AnnexedFileMetadataModel(QtGui.QStandardItemModel):
     def fields(self):
         return self._model.fields
 
+    @property
+    def value_index(self):
+        return self._model.value_index
+
+    def key_item(self, key):
+        return self._model.key_items.get(key)
+
+    def contentlocation(self, key):
+        return self._model.content.contentlocation(key)
+
     @QtCore.pyqtSlot(str)
     def insert_field(self, field):
         return self._model.insert_field(field)
@@ -370,97 +382,250 @@ class AnnexedFileMetadataModel(QtGui.QStandardItemModel):
             self._build_tree.stop()
 
         self._treeish = treeish
-        self._pending_files = collections.defaultdict(list)
+        self._file_items = {}
+        self._dirty_directories = {}
+        self._model.paths.clear()
         self.clear()
 
         headers = ['Filename', *self._model.fields[1:]]
-        self.setHorizontalHeaderLabels(headers)
+        set_header_labels(self, headers)
 
-        self._build_tree.start()
+        # Adding columns to a built tree is far slower than building it
+        # with them, so wait for the key model to create them
+        if self._model.has_schema:
+            self._build_tree.start()
 
-    @QtCore.pyqtSlot()
-    @AutoConsumed
+    # Runs ahead of key loading, files show up as placeholders first
+    @AutoConsumed(priority=1)
     def _build_tree(self):
+        started = time.monotonic()
         msg = "Loading tree model..."
         logger.info(msg)
 
-        PendingObject = collections.namedtuple(
-            'PendingObject',
-            ['object', 'name', 'parent'],
-        )
+        # The tree is walked on worker threads, here we only graft the
+        # finished subtrees into the model
+        items = {(): self.invisibleRootItem()}
 
-        pending = collections.deque()
+        walker = TreeWalker(self._model.repo, treeish=self._treeish)
 
-        root = self._model.repo.annex.get_file_tree(self._treeish)
-        root_item = self.invisibleRootItem()
-        for name_, obj_ in root.items():
-            p = PendingObject(obj_, name_, root_item)
-            pending.append(p)
-            yield
+        # Waiting on workers pauses this task, their results resume it
+        walker.results_ready.connect(
+            self._build_tree.resume, QtCore.Qt.QueuedConnection,
+        )
 
-        while pending:
-            obj, name, parent = pending.pop()
-
-            if isinstance(obj, pygit2.Blob):
-                pass
-
-            elif isinstance(obj, AnnexedFileTree):
-                item = AnnexedDirectoryItem(name)
-                field_items = [
-                    AnnexedDirectoryFieldItem(item)
-                    for c in range(1, self._model.columnCount())
-                ]
-                parent.appendRow([item, *field_items])
-
-                for field_item in field_items:
-                    p = PendingObject(field_item, name, parent)
-                    pending.append(p)
-
-                for name_, obj_ in obj.items():
-                    p = PendingObject(obj_, name_, item)
-                    pending.append(p)
-
-            elif isinstance(obj, AnnexedFile):
-                if obj.key in self._model.key_items:
-                    key_item = self._model.key_items[obj.key]
-                    self.insert_file(key_item, name, parent)
-                else:
-                    f = PendingObject(obj, name, parent)
-                    self._pending_files[obj.key].append(f)
+        for batch in walker:
+            if batch is None:
+                self._build_tree.pause()
+                yield
+                continue
+            if not batch:
+                yield
+                continue
+
+            # Rows are built detached and grafted per parent at the end,
+            # so sorted views see one insertion per directory instead of
+            # one per file
+            parents, dir_rows, file_rows = {}, {}, {}
+            for parent_path, name, key in batch:
+                parent = items[parent_path]
+                parents[id(parent)] = parent
+
+                if key is None:
+                    item = AnnexedDirectoryItem(name)
+                    item.setColumnCount(self.columnCount())
+                    field_items = [
+                        AnnexedDirectoryFieldItem(item)
+                        for c in range(1, self.columnCount())
+                    ]
+                    row = [item, *field_items]
+                    dir_rows.setdefault(id(parent), []).append(row)
+                    items[(*parent_path, name)] = item
 
-            elif isinstance(obj, AnnexedDirectoryFieldItem):
-                obj._connect()
+                else:
+                    path = '/'.join((*parent_path, name))
+                    file_item = self._create_file_item(key, path)
+                    file_rows.setdefault(id(parent), []).append(file_item)
+
+                yield
+
+            # Deepest first, so directories come with their contents
+            with trace_span("graft_rows", 'load', records=len(batch)):
+                for parent_id in reversed(list(parents)):
+                    parent = parents[parent_id]
+                    for row in dir_rows.get(parent_id, []):
+                        parent.appendRow(row)
+                    if parent_id in file_rows:
+                        parent.appendRows(file_rows[parent_id])
+
+            done = len(self._file_items)
+            total = estimate_total(
+                done, walker.subtrees_done, walker.subtrees_total,
+            )
+            yield self._report_progress("Files", done, total)
+
+        self.progress_finished.emit("Files")
+        record_phase("Tree build", time.monotonic() - started)
+        msg = "Tree model fully loaded."
+        logger.info(msg)
 
-            yield
+    def _report_progress(self, phase, done, total):
+        self.progress_changed.emit(phase, done, total)
+        return done, total
 
-        if self._pending_files:
-            msg = "Tree model folders loaded, waiting for key model..."
-        else:
-            msg = "Tree model fully loaded."
-        logger.info(msg)
+    def insert_file(self, key, path, parent=None):
+        if parent is None:
+            parent = self.invisibleRootItem()
 
-    def insert_file(self, key_item, name, parent=None):
+        file_item = self._create_file_item(key, path)
+        parent.appendRow(file_item)
+
+    def _create_file_item(self, key, path):
+        _, _, name = path.rpartition('/')
+        file_item = AnnexedFileItem(key, name)
+        self._file_items[path] = file_item
+        self._model.paths.add(key, path)
+        return file_item
+
+    def file_items(self, key):
+        paths = self._model.paths.paths(key)
+        return [self._file_items[path] for path in paths]
+
+    def key_index(self, index):
+        file_item = self.itemFromIndex(index.sibling(index.row(), 0))
+        if not isinstance(file_item, AnnexedFileItem):
+            return None
+
+        key_item = file_item.source()
+        if key_item is None:
+            return None
+        return self._model.index(key_item.row(), index.column())
+
+    def existing_item(self, index):
+        # Only field cells come from the key model, filenames are ours
+        if index.column() > 0:
+            key_index = self.key_index(index)
+            if key_index is not None:
+                return self._model.existing_item(key_index)
+
+        parent = self.itemFromIndex(index.parent())
         if parent is None:
             parent = self.invisibleRootItem()
+        return parent.child(index.row(), index.column())
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if index.column() > 0:
+            key_index = self.key_index(index)
+            if key_index is not None:
+                return key_index.data(role)
+
+        return super().data(index, role)
+
+    def setData(self, index, value, role=QtCore.Qt.EditRole):
+        if index.column() > 0:
+            key_index = self.key_index(index)
+            if key_index is not None:
+                return self._model.setData(key_index, value, role)
+
+        return super().setData(index, value, role)
+
+    def _on_source_data_changed(self, topLeft, bottomRight, roles):
+        first, last = topLeft.column(), bottomRight.column()
+
+        for row in range(topLeft.row(), bottomRight.row() + 1):
+            key = self._model.item(row, 0).key
+            for file_item in self.file_items(key):
+                index = file_item.index()
+                self.dataChanged.emit(
+                    index.sibling(index.row(), first),
+                    index.sibling(index.row(), last),
+                    roles,
+                )
+
+    def _directory_field_items(self, parent, columns=None):
+        if not parent.isValid():
+            return []
+
+        dir_item = self.itemFromIndex(parent.sibling(parent.row(), 0))
+        if not isinstance(dir_item, AnnexedDirectoryItem):
+            return []
+
+        if columns is None:
+            columns = range(1, self.columnCount())
+        row_parent = dir_item.parent() or self.invisibleRootItem()
+        return [
+            row_parent.child(dir_item.row(), col)
+            for col in columns if col > 0
+        ]
 
-        file_item = AnnexedFileItem(key_item, name)
+    def _refresh_directory(self, parent, columns=None):
+        for field_item in self._directory_field_items(parent, columns):
+            if field_item is not None:
+                self._dirty_directories[id(field_item)] = field_item
 
-        def file_field_item(col):
-            field_item = self._model.item(key_item.row(), col)
-            return AnnexedFileFieldItem(field_item, name)
+        if self._dirty_directories and not self._refresh_timer.isActive():
+            self._refresh_timer.start()
 
-        file_field_items = (
-            file_field_item(c)
-            for c in range(1, self._model.columnCount())
-        )
+    def _flush_directories(self):
+        dirty, self._dirty_directories = self._dirty_directories, {}
+        with trace_span("refresh_directories", 'model', cells=len(dirty)):
+            for field_item in dirty.values():
+                field_item._emit_data_changed()
+
+    def _refresh_all_directories(self):
+        pending = [self.invisibleRootItem()]
+        while pending:
+            item = pending.pop()
+            for row in range(item.rowCount()):
+                child = item.child(row)
+                if isinstance(child, AnnexedDirectoryItem):
+                    self._refresh_directory(child.index())
+                    pending.append(child)
+
+    def _on_data_changed(self, topLeft, bottomRight, roles):
+        parent = topLeft.parent()
+        if parent != bottomRight.parent():
+            self._refresh_directory(parent)
+            self._refresh_directory(bottomRight.parent())
+            return
 
-        parent.appendRow([file_item, *file_field_items])
+        columns = range(topLeft.column(), bottomRight.column() + 1)
+        self._refresh_directory(parent, columns)
+
+    def _on_rows_changed(self, parent, first, last):
+        self._refresh_directory(parent)
 
-    def _on_key_inserted(self, key):
-        for (_, name, parent) in self._pending_files[key]:
-            key_item = self._model.key_items[key]
-            self.insert_file(key_item, name, parent)
-        self._pending_files[key].clear()
+    def _on_rows_moved(self, parent, start, end, destination, row):
+        self._refresh_directory(parent)
+        if destination != parent:
+            self._refresh_directory(destination)
+
+    def _on_schema_loaded(self):
+        if not self._build_tree.running():
+            self._build_tree.start()
+
+    def _on_keys_inserted(self, keys):
+        # One update per run of placeholder rows that got their keys
+        parents, rows = {}, collections.defaultdict(list)
+        for key in keys:
+            for file_item in self.file_items(key):
+                parent = file_item.parent() or self.invisibleRootItem()
+                parents[id(parent)] = parent
+                rows[id(parent)].append(file_item.row())
+
+        last = self.columnCount() - 1
+        for parent_id, rows_ in rows.items():
+            parent = parents[parent_id].index()
+            rows_.sort()
+            start = prev = rows_[0]
+            for row in rows_[1:] + [None]:
+                if row is not None and row == prev + 1:
+                    prev = row
+                    continue
+                self.dataChanged.emit(
+                    self.index(start, 0, parent),
+                    self.index(prev, last, parent),
+                )
+                start = prev = row
 
     def _on_columns_inserted(self, parent, first, last):
         columns = range(first, last + 1)
@@ -469,19 +634,16 @@ class AnnexedFileMetadataModel(QtGui.QStandardItemModel):
             return
 
         for col in columns:
-            self._create_column(col)
+            with trace_span("create_column", 'model', column=col):
+                self._create_column(col)
 
     def _create_column(self, col, parent=None):
         if parent is None:
             parent = self.invisibleRootItem()
 
+        # Only directories get items, file cells are left empty
         def _create_field(item):
-            if isinstance(item, AnnexedFileItem):
-                obj = self._model.key_items.get(item.key)
-                field_item = self._model.item(obj.row(), col)
-                return AnnexedFileFieldItem(field_item, item.name)
-
-            elif isinstance(item, AnnexedDirectoryItem):
+            if isinstance(item, AnnexedDirectoryItem):
                 return AnnexedDirectoryFieldItem(item)
 
         field_items = [
@@ -496,9 +658,9 @@ class AnnexedFileMetadataModel(QtGui.QStandardItemModel):
                 self._create_column(col, parent=child)
 
     def _on_header_data_changed(self, orientation, first, last):
-        if orientation == Qt.Qt.Horizontal:
+        if orientation == QtCore.Qt.Horizontal:
             labels = ['Filename', *self._model.fields[1:]]
-            self.setHorizontalHeaderLabels(labels)
+            set_header_labels(self, labels)
 
     def __repr__(self):
         return "{name}.{cls}({args})".format(
@@ -17,14 +17,27 @@
 import logging
 import mimetypes
 
-from PyQt5 import Qt
 from PyQt5 import QtGui
 from PyQt5 import QtCore
 from PyQt5 import QtWidgets
 
+try:
+    from .tracing import trace_span
+except ImportError:
+    from tracing import trace_span
+
 logger = logging.getLogger(__name__)
 
 
+def guess_mimetype(name, path):
+    mime, encoding = None, None
+    if name:
+        mime, encoding = mimetypes.guess_type(name)
+    if not mime:
+        mime, encoding = mimetypes.guess_type(path)
+    return mime, encoding
+
+
 class FilePreview(QtWidgets.QStackedWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -33,6 +46,12 @@ class FilePreview(QtWidgets.QStackedWidget):
         self.text_preview = None
         self.graphics_preview = None
 
+        # Made on the first preview, they load modules and open the
+        # mimetype store that startup doesn't need
+        self._prefetcher = None
+        self._mimetypes = None
+        self._path = None
+
     def addWidget(self, widget):
         super().addWidget(widget)
         if isinstance(widget, QtWidgets.QPlainTextEdit):
@@ -51,6 +70,45 @@ class FilePreview(QtWidgets.QStackedWidget):
                 old_scene.clear()
                 old_scene.deleteLater()
 
+    @property
+    def prefetcher(self):
+        if self._prefetcher is None:
+            try:
+                from .preview_prefetcher import PreviewPrefetcher
+            except ImportError:
+                from preview_prefetcher import PreviewPrefetcher
+            self._prefetcher = PreviewPrefetcher(self)
+        return self._prefetcher
+
+    @property
+    def mime_cache(self):
+        if self._mimetypes is None:
+            try:
+                from .mime_sniffer import MimeTypeCache
+            except ImportError:
+                from mime_sniffer import MimeTypeCache
+            self._mimetypes = MimeTypeCache()
+        return self._mimetypes
+
+    @QtCore.pyqtSlot()
+    def clear_cache(self):
+        if self._prefetcher is not None:
+            self._prefetcher.clear()
+
+    def cache_usage(self):
+        usage = []
+        if self._prefetcher is not None:
+            cache = self._prefetcher.cache
+            usage.append(
+                ('Preview cache', len(cache), cache.memory_usage()),
+            )
+        if self._mimetypes is not None:
+            usage.append(
+                ('MIME type cache', len(self._mimetypes),
+                 self._mimetypes.memory_usage()),
+            )
+        return usage
+
     @QtCore.pyqtSlot(str)
     def preview_text_file(self, path):
         filename = path.split('/')[-1]
@@ -67,14 +125,17 @@ class FilePreview(QtWidgets.QStackedWidget):
 
         self.setCurrentWidget(self.text_preview)
 
-        try:
-            with open(path, 'r') as file:
-                text = file.read()
-        except UnicodeDecodeError:
-            fmt = "File '{}' should be a UTF-8 text file, but isn't."
-            msg = fmt.format(filename)
-            logger.error(msg)
-            return
+        text = self.prefetcher.cache.get(path)
+        if text is None:
+            try:
+                with open(path, 'r') as file:
+                    text = file.read()
+            except UnicodeDecodeError:
+                fmt = "File '{}' should be a UTF-8 text file, but isn't."
+                msg = fmt.format(filename)
+                logger.error(msg)
+                return
+            self.prefetcher.cache.put(path, text)
 
         self.text_preview.setPlainText(text)
 
@@ -103,12 +164,15 @@ class FilePreview(QtWidgets.QStackedWidget):
 
         # Using QImage instead of directly creating the QPixmap
         # prevents a segmentation fault in my container setup
-        image = QtGui.QImage(path)
-        if image.isNull():
-            fmt = "File '{}' should be an image, but isn't."
-            msg = fmt.format(filename)
-            logger.error(msg)
-            return
+        image = self.prefetcher.cache.get(path)
+        if image is None:
+            image = QtGui.QImage(path)
+            if image.isNull():
+                fmt = "File '{}' should be an image, but isn't."
+                msg = fmt.format(filename)
+                logger.error(msg)
+                return
+            self.prefetcher.cache.put(path, image)
 
         pixmap = QtGui.QPixmap.fromImage(image)
         if pixmap.isNull():
@@ -121,7 +185,7 @@ class FilePreview(QtWidgets.QStackedWidget):
         scene.addItem(pixmap_item)
         self.graphics_preview.fitInView(
             pixmap_item,
-            Qt.Qt.KeepAspectRatio,
+            QtCore.Qt.KeepAspectRatio,
         )
 
         fmt = "Previewed file '{}' as an image."
@@ -131,15 +195,11 @@ class FilePreview(QtWidgets.QStackedWidget):
     @QtCore.pyqtSlot(QtGui.QStandardItem)
     def preview_item(self, item):
         self.clear()
+        self._path = None
 
         if not hasattr(item, 'key'):
             return
 
-        try:
-            name = item.name
-        except AttributeError:
-            name = None
-
         try:
             path = item.contentlocation
         except AttributeError:
@@ -154,11 +214,8 @@ class FilePreview(QtWidgets.QStackedWidget):
             logger.error(msg)
             return
 
-        mime, encoding = None, None
-        if name:
-            mime, encoding = mimetypes.guess_type(name)
-        if not mime:
-            mime, encoding = mimetypes.guess_type(path)
+        self._path = path
+        mime, encoding = self._guess_mimetype(item, path)
 
         if encoding:
             fmt = "Can't decode encoding '{}'."
@@ -177,10 +234,12 @@ class FilePreview(QtWidgets.QStackedWidget):
             return
 
         if mime.startswith('text/'):
-            self.preview_text_file(path)
+            with trace_span("preview_text", 'preview', path=path):
+                self.preview_text_file(path)
 
         elif mime.startswith('image/'):
-            self.preview_image_file(path)
+            with trace_span("preview_image", 'preview', path=path):
+                self.preview_image_file(path)
 
         else:
             fmt = "Can't preview mimetype '{}'."
@@ -188,6 +247,42 @@ class FilePreview(QtWidgets.QStackedWidget):
             logger.error(msg)
             return
 
+    @QtCore.pyqtSlot(list)
+    def prefetch_items(self, items):
+        if not self.isVisible():
+            return
+
+        pending = []
+        for item in items:
+            if not hasattr(item, 'key'):
+                continue
+
+            path = item.contentlocation
+            if not path:
+                continue
+
+            mime, encoding = self._guess_mimetype(item, path)
+            if mime and not encoding:
+                pending.append((path, mime))
+
+        if not pending and self._prefetcher is None:
+            return
+
+        paths = [path for path, _ in pending]
+        self.prefetcher.retain([self._path, *paths])
+        for path, mime in pending:
+            self.prefetcher.prefetch(path, mime)
+
+    def _guess_mimetype(self, item, path):
+        name = getattr(item, 'name', None)
+        mime, encoding = guess_mimetype(name, path)
+
+        # Keys without an extension, sniff their content instead
+        if not mime and not encoding:
+            mime = self.mime_cache.get(item.key, path)
+
+        return mime, encoding
+
     def __repr__(self):
         return "{name}.{cls}({args})".format(
             name=__name__,
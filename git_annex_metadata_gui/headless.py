@@ -0,0 +1,126 @@
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import logging
+import time
+import tracemalloc
+
+from PyQt5 import QtCore
+
+from git_annex_adapter.repo import GitAnnexRepo
+from git_annex_adapter.exceptions import NotAGitAnnexRepoError
+
+from .memory_report import MemoryReport
+from .memory_report import peak_rss
+from .scheduler import default_scheduler
+from .workspace import RepoSession
+
+logger = logging.getLogger(__name__)
+
+
+def load_repo(path):
+    # Same models and wiring as in the window, just never shown
+    results = collections.OrderedDict()
+    start = time.perf_counter()
+
+    repo = GitAnnexRepo(path)
+    session = RepoSession(path, repo)
+    results['open'] = time.perf_counter() - start
+
+    def on_schema_loaded():
+        results['schema'] = time.perf_counter() - start
+    session.model_keys.schema_loaded.connect(on_schema_loaded)
+
+    # Phases only finish when they load everything, a task that
+    # raised just stops running
+    finished = set()
+    session.model_keys.progress_finished.connect(finished.add)
+    session.model_head.progress_finished.connect(finished.add)
+
+    session.load()
+    populate = session.model_keys._populate
+    build_tree = session.model_head._build_tree
+
+    # Both run interleaved, as they would with the window open
+    loop = QtCore.QEventLoop()
+
+    def on_task_finished():
+        now = time.perf_counter() - start
+        if 'schema' in results:
+            if not populate.running():
+                results.setdefault('key_load', now)
+            if not build_tree.running():
+                results.setdefault('tree_build', now)
+        if not populate.running() and not build_tree.running():
+            loop.quit()
+
+    # Queued, so the tasks have seen they're finished before we look
+    scheduler = default_scheduler()
+    scheduler.task_finished.connect(
+        on_task_finished, QtCore.Qt.QueuedConnection,
+    )
+    try:
+        if populate.running() or build_tree.running():
+            loop.exec_()
+    finally:
+        scheduler.task_finished.disconnect(on_task_finished)
+
+    results['total'] = time.perf_counter() - start
+    complete = {'Keys', 'Files'} <= finished
+    return session, results, complete
+
+
+def run_headless_benchmark(path):
+    # Returns the report, or None if the repository can't be opened
+    try:
+        session, timings, complete = load_repo(path)
+    except NotAGitAnnexRepoError:
+        fmt = "Path '{}' is not a git-annex repository."
+        msg = fmt.format(path)
+        logger.error(msg)
+        return None
+
+    report = collections.OrderedDict()
+    report['repo'] = session.path
+    report['complete'] = complete
+    report['keys'] = session.model_keys.rowCount()
+    report['files'] = len(session.model_head._file_items)
+    report['fields'] = len(session.model_keys.fields) - 1
+    report['seconds'] = timings
+    report['peak_rss'] = peak_rss()
+
+    for name, seconds in timings.items():
+        print("{:<12} {:>10.3f} s".format(name, seconds))
+    for name in ('keys', 'files', 'fields'):
+        print("{:<12} {:>10}".format(name, report[name]))
+    if report['peak_rss'] is not None:
+        mib = report['peak_rss'] / (1 << 20)
+        print("{:<12} {:>10.1f} MiB".format('peak_rss', mib))
+
+    memory = MemoryReport()
+    memory.add_models(session.model_keys, session.model_head)
+    if tracemalloc.is_tracing():
+        memory.add_tracemalloc(tracemalloc.take_snapshot())
+    for line in memory.lines():
+        logger.info(line)
+
+    if not complete:
+        msg = "Loading didn't finish, timings are incomplete."
+        logger.error(msg)
+
+    session.close()
+    return report
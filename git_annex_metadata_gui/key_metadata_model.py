@@ -15,43 +15,60 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 import bisect
+import collections
 import logging
+import time
 
-from PyQt5 import Qt
 from PyQt5 import QtCore
 from PyQt5 import QtGui
 from PyQt5 import QtWidgets
 
+from .content_index import ContentIndex
+from .key_path_index import KeyPathIndex
+from .metadata_log import MetadataLoader
+from .metadata_log import PreloadedMetadata
+from .metadata_log import SchemaCache
+from .metadata_log import annex_branch_commit
+from .metadata_log import iter_schema
+from .profiling import profile_phase
+from .profiling import record_phase
+from .progress import estimate_total
+from .tracing import trace_begin
+from .tracing import trace_end
+from .tracing import trace_span
 from .utils import parse_as_set
 from .utils import AutoConsumed
+from .utils import ContentPresentRole
+from .utils import file_icon
+from .utils import set_header_labels
+from .utils import system_font
+from .value_index import ValueIndex
 
 logger = logging.getLogger(__name__)
 
 
 class AnnexedKeyItem(QtGui.QStandardItem):
-    def __init__(self, key_obj):
+    def __init__(self, key_obj, metadata=None):
         super().__init__()
         self._obj = key_obj
+        self._metadata = metadata
 
         self.setText(self.key)
         self.setToolTip(self.key)
 
-        font = QtGui.QFontDatabase.FixedFont
-        font = QtGui.QFontDatabase().systemFont(font)
-        self.setFont(font)
-
-        icon = QtWidgets.QFileIconProvider.File
-        icon = QtWidgets.QFileIconProvider().icon(icon)
-        self.setIcon(icon)
+        self.setFont(system_font(QtGui.QFontDatabase.FixedFont))
+        self.setIcon(file_icon(QtWidgets.QFileIconProvider.File))
 
         self.setSelectable(True)
         self.setEditable(False)
         self.setEnabled(True)
-        self.setFlags(self.flags() | Qt.Qt.ItemNeverHasChildren)
+        self.setFlags(self.flags() | QtCore.Qt.ItemNeverHasChildren)
 
     @property
     def metadata(self):
-        return self._obj.metadata
+        if self._metadata is None:
+            return self._obj.metadata
+        return self._metadata
 
     @property
     def key(self):
@@ -59,18 +76,32 @@ class AnnexedKeyItem(QtGui.QStandardItem):
 
     @property
     def contentlocation(self):
-        return self._obj.contentlocation
+        model = self.model()
+        if model is None:
+            return self._obj.contentlocation
+        return model.content.contentlocation(self.key)
 
     def type(self):
         return QtGui.QStandardItem.UserType + 1
 
+    def data(self, role=QtCore.Qt.DisplayRole):
+        if role == ContentPresentRole:
+            return self.contentlocation is not None
+
+        elif role == QtCore.Qt.ForegroundRole:
+            if self.contentlocation is None:
+                palette = QtWidgets.QApplication.palette()
+                return palette.brush(palette.Disabled, palette.Text)
+
+        return super().data(role=role)
+
     def __lt__(self, other):
         if other is None:
             return True
 
         elif isinstance(other, AnnexedKeyItem):
-            lhs = self.data(role=Qt.Qt.DisplayRole)
-            rhs = other.data(role=Qt.Qt.DisplayRole)
+            lhs = self.data(role=QtCore.Qt.DisplayRole)
+            rhs = other.data(role=QtCore.Qt.DisplayRole)
 
             lhs_pre, _, lhs_name = lhs.partition('--')
             lhs_backend, *lhs_fields = lhs_pre.split('-')
@@ -99,7 +130,7 @@ class AnnexedKeyItem(QtGui.QStandardItem):
 
 
 class AnnexedFieldItem(QtGui.QStandardItem):
-    def __init__(self, key_item, field):
+    def __init__(self, key_item=None, field=None):
         super().__init__()
         self._item = key_item
         self._field = field
@@ -107,30 +138,52 @@ class AnnexedFieldItem(QtGui.QStandardItem):
         self.setSelectable(True)
         self.setEditable(True)
         self.setEnabled(True)
-        self.setFlags(self.flags() | Qt.Qt.ItemNeverHasChildren)
+        self.setFlags(self.flags() | QtCore.Qt.ItemNeverHasChildren)
+
+    @property
+    def key_item(self):
+        # Items cloned from the model's prototype are bound on first use
+        if self._item is None:
+            self._item = self.model().item(self.row(), 0)
+        return self._item
 
     @property
     def key(self):
-        return self._item.key
+        return self.key_item.key
+
+    @property
+    def field(self):
+        if self._field is None:
+            self._field = self.model().fields[self.column()]
+        return self._field
 
     @property
     def contentlocation(self):
-        return self._item.contentlocation
+        return self.key_item.contentlocation
 
     @property
     def metadata(self):
-        return self._item.metadata.get(self._field, set())
+        return self.key_item.metadata.get(self.field, set())
 
     @metadata.setter
     def metadata(self, value):
-        self._item.metadata[self._field] = value
+        old_value = self.metadata
+        with profile_phase("Save"):
+            self.key_item.metadata[self.field] = value
+
+        model = self.model()
+        if model is not None:
+            model.value_index.update(self.field, old_value, set(value))
         self.emitDataChanged()
 
+    def clone(self):
+        return self.__class__()
+
     def type(self):
         return QtGui.QStandardItem.UserType + 2
 
-    def data(self, role=Qt.Qt.DisplayRole):
-        if role == Qt.Qt.DisplayRole:
+    def data(self, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole:
             data = self.metadata
 
             if len(data) == 0:
@@ -140,27 +193,27 @@ class AnnexedFieldItem(QtGui.QStandardItem):
             else:
                 return "<{n} values>".format(n=len(data))
 
-        elif role == Qt.Qt.EditRole:
+        elif role == QtCore.Qt.EditRole:
             data = self.metadata
             if data:
                 return str(data)
 
-        elif role == Qt.Qt.ToolTipRole:
+        elif role == QtCore.Qt.ToolTipRole:
             data = self.metadata
             if data:
                 return str(data)
 
-        elif role == Qt.Qt.UserRole:
+        elif role == QtCore.Qt.UserRole:
             return self.metadata
 
         else:
             return super().data(role=role)
 
-    def setData(self, value, role=Qt.Qt.EditRole):
-        if role == Qt.Qt.DisplayRole:
+    def setData(self, value, role=QtCore.Qt.EditRole):
+        if role == QtCore.Qt.DisplayRole:
             return False
 
-        elif role == Qt.Qt.EditRole:
+        elif role == QtCore.Qt.EditRole:
             try:
                 self.metadata = parse_as_set(value)
             except:
@@ -169,7 +222,7 @@ class AnnexedFieldItem(QtGui.QStandardItem):
                 logger.error(msg)
                 return
 
-        elif role == Qt.Qt.UserRole:
+        elif role == QtCore.Qt.UserRole:
             try:
                 self.metadata = value
             except:
@@ -186,8 +239,8 @@ class AnnexedFieldItem(QtGui.QStandardItem):
             return True
 
         elif isinstance(other, AnnexedFieldItem):
-            lhs = self.data(role=Qt.Qt.UserRole)
-            rhs = other.data(role=Qt.Qt.UserRole)
+            lhs = self.data(role=QtCore.Qt.UserRole)
+            rhs = other.data(role=QtCore.Qt.UserRole)
             if len(lhs) == 0:
                 return False
             elif len(rhs) == 0:
@@ -216,11 +269,25 @@ class AnnexedFieldItem(QtGui.QStandardItem):
 
 
 class AnnexedKeyMetadataModel(QtGui.QStandardItemModel):
-    key_inserted = QtCore.pyqtSignal(str)
+    keys_inserted = QtCore.pyqtSignal(list)
+    schema_loaded = QtCore.pyqtSignal()
+    progress_changed = QtCore.pyqtSignal(str, int, int)
+    progress_finished = QtCore.pyqtSignal(str)
 
     def __init__(self, parent=None):
         super().__init__(parent)
         self.repo = None
+        self.fields = ['Git-Annex Key']
+        self.key_items = {}
+        self.value_index = ValueIndex()
+        self.setItemPrototype(AnnexedFieldItem())
+        self._schemas = SchemaCache()
+
+        self.paths = KeyPathIndex()
+        self.has_schema = False
+        self._loader = None
+        self.content = ContentIndex(self)
+        self.content.content_changed.connect(self._on_content_changed)
 
     def setRepo(self, repo):
         if self._populate.running():
@@ -231,56 +298,177 @@ class AnnexedKeyMetadataModel(QtGui.QStandardItemModel):
         self.repo = repo
         self.fields = ['Git-Annex Key']
         self.key_items = {}
-        self._pending = iter(self.repo.annex.values())
+        self.has_schema = False
+        self._loader = None
+        self.value_index = ValueIndex()
+        self._unbound_fields = collections.defaultdict(list)
+        self.content.setRepo(repo)
 
         self.clear()
-        self.setHorizontalHeaderLabels(self.fields)
+        set_header_labels(self, self.fields)
         self._populate.start()
 
-    @QtCore.pyqtSlot()
     @AutoConsumed
     def _populate(self):
+        started = time.monotonic()
+        msg = "Scanning metadata fields..."
+        logger.info(msg)
+
+        # Create every column up front, instead of one at a time as
+        # keys with new fields show up during loading
+        commit = annex_branch_commit(self.repo)
+        if commit is None:
+            # Nothing committed to the git-annex branch yet, there may
+            # still be keys in the journal
+            self._loader = MetadataLoader(self.repo, tree=[])
+            fields = set()
+        else:
+            self._loader = MetadataLoader(self.repo, tree=commit.tree)
+            fields = self._schemas.get(self.repo, commit)
+
+        # Waiting on workers pauses this task, their results resume it
+        self._loader.results_ready.connect(
+            self._populate.resume, QtCore.Qt.QueuedConnection,
+        )
+
+        if fields is None:
+            fields = set()
+            for i, fields_ in enumerate(
+                iter_schema(self.repo, tree=commit.tree), 1,
+            ):
+                fields.update(fields_)
+                if i % 256 == 0:
+                    yield self._report_progress("Fields", i, 0)
+                else:
+                    yield
+            self._schemas.put(self.repo, commit, fields)
+            self.progress_finished.emit("Fields")
+
+        start = time.monotonic()
+        self._set_schema(fields)
+        fmt = "Created {} columns in {:.3f}s."
+        msg = fmt.format(len(self.fields) - 1, time.monotonic() - start)
+        logger.debug(msg)
+
+        self.has_schema = True
+        self.schema_loaded.emit()
+
         msg = "Loading key model..."
         logger.info(msg)
 
-        for obj in self._pending:
-            self.insert_key(obj)
-            yield
+        # Read metadata logs straight from the git-annex branch instead
+        # of asking git-annex for each key
+        for batch_number, batch in enumerate(self._loader):
+            if batch is None:
+                self._populate.pause()
+                yield
+                continue
+            if not batch:
+                yield
+                continue
+
+            ident = "{:x}.{}".format(id(self), batch_number)
+            trace_begin("insert_keys", 'load', ident, keys=len(batch))
+            for key, metadata in batch:
+                key_obj = self.repo.annex[key]
+                metadata = PreloadedMetadata(key_obj, metadata)
+                self.insert_key(key_obj, metadata)
+                yield
+            trace_end("insert_keys", 'load', ident)
+
+            # Announced per batch, listeners redraw rows in bulk
+            with trace_span("keys_inserted", 'model', keys=len(batch)):
+                self.keys_inserted.emit([key for key, _ in batch])
+
+            done = len(self.key_items)
+            total = estimate_total(
+                done,
+                self._loader.subtrees_done,
+                self._loader.subtrees_total,
+            )
+            yield self._report_progress("Keys", done, total)
 
+        self._loader = None
+        self.progress_finished.emit("Keys")
+        record_phase("Key load", time.monotonic() - started)
         msg = "Key model fully loaded."
         logger.info(msg)
 
-    def insert_key(self, key_obj):
-        key_item = AnnexedKeyItem(key_obj)
-        field_items = (
-            AnnexedFieldItem(key_obj, field)
-            for field in self.fields[1:]
-        )
-        self.appendRow([key_item, *field_items])
+    def _report_progress(self, phase, done, total):
+        # Returned as well, so the scheduler also sees it when yielded
+        self.progress_changed.emit(phase, done, total)
+        return done, total
+
+    @QtCore.pyqtSlot(list)
+    def prioritize_keys(self, keys):
+        if self._loader is None:
+            return
+
+        keys = [key for key in keys if key not in self.key_items]
+        if keys:
+            self._loader.prioritize(keys)
+
+    def insert_key(self, key_obj, metadata=None):
+        key_item = AnnexedKeyItem(key_obj, metadata)
+        metadata = key_item.metadata
+
+        # Cells are only created for fields that have values, the rest
+        # stay empty until the item prototype fills them in on edit
+        items = [key_item] + [None] * (len(self.fields) - 1)
+        for field, values in metadata.items():
+            if not values:
+                continue
+            self.value_index.add(field, values, bulk=True)
+
+            col = bisect.bisect_left(self.fields, field, lo=1)
+            if col < len(self.fields) and self.fields[col] == field:
+                items[col] = AnnexedFieldItem(key_item, field)
+            else:
+                self._unbound_fields[field].append(key_item)
+
+        self.appendRow(items)
         self.key_items[key_item.key] = key_item
 
-        new_fields = set(key_item.metadata) - set(self.fields)
+        new_fields = set(metadata) - set(self.fields)
         for field in new_fields:
             QtCore.QMetaObject.invokeMethod(
                 self, 'insert_field',
-                Qt.Qt.QueuedConnection,
+                QtCore.Qt.QueuedConnection,
                 QtCore.Q_ARG(str, field)
             )
 
-        self.key_inserted.emit(key_obj.key)
-
     @QtCore.pyqtSlot(str)
     def insert_field(self, field):
         if field in self.fields:
             return
-        col = bisect.bisect(self.fields, field, lo=1)
-        items = [
-            AnnexedFieldItem(self.item(row, 0), field)
-            for row in range(self.rowCount())
-        ]
-        self.fields.insert(col, field)
-        self.insertColumn(col, items)
-        self.setHorizontalHeaderLabels(self.fields)
+
+        with trace_span("insert_field", 'model', field=field):
+            col = bisect.bisect(self.fields, field, lo=1)
+            items = [None] * self.rowCount()
+            for key_item in self._unbound_fields.pop(field, []):
+                items[key_item.row()] = AnnexedFieldItem(key_item, field)
+
+            self.fields.insert(col, field)
+            self.insertColumn(col, items)
+            set_header_labels(self, self.fields)
+
+    def _set_schema(self, fields):
+        fields = sorted(set(fields).difference(self.fields))
+        if not fields or self.rowCount():
+            return
+
+        self.fields.extend(fields)
+        self.insertColumns(1, len(fields))
+        set_header_labels(self, self.fields)
+
+    def existing_item(self, index):
+        return self.item(index.row(), index.column())
+
+    def _on_content_changed(self, keys):
+        for key in keys:
+            key_item = self.key_items.get(key)
+            if key_item is not None:
+                key_item.emitDataChanged()
 
     def __repr__(self):
         return "{name}.{cls}({args})".format(
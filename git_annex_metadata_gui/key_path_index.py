@@ -0,0 +1,100 @@
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import sys
+
+logger = logging.getLogger(__name__)
+
+
+class KeyPathIndex:
+    def __init__(self):
+        # Most keys are used by a single file, so those map to a plain
+        # string and only the rest to a list of paths
+        self._paths = {}
+        self._keys = {}
+
+    def add(self, key, path):
+        key = sys.intern(key)
+        old_key = self._keys.get(path)
+        if old_key == key:
+            return
+        if old_key is not None:
+            self.remove(path)
+
+        self._keys[path] = key
+        paths = self._paths.get(key)
+        if paths is None:
+            self._paths[key] = path
+        elif isinstance(paths, str):
+            self._paths[key] = [paths, path]
+        else:
+            paths.append(path)
+
+    def remove(self, path):
+        key = self._keys.pop(path, None)
+        if key is None:
+            return
+
+        paths = self._paths[key]
+        if isinstance(paths, str):
+            del self._paths[key]
+            return
+
+        paths.remove(path)
+        if len(paths) == 1:
+            self._paths[key] = paths[0]
+
+    def paths(self, key):
+        paths = self._paths.get(key, ())
+        if isinstance(paths, str):
+            return (paths,)
+        return tuple(paths)
+
+    def key(self, path):
+        return self._keys.get(path)
+
+    def keys(self):
+        return self._paths.keys()
+
+    def clear(self):
+        self._paths.clear()
+        self._keys.clear()
+
+    def memory_usage(self):
+        # Keys are interned and shared, the paths only live here
+        size = sys.getsizeof(self._paths) + sys.getsizeof(self._keys)
+        size += sum(sys.getsizeof(path) for path in self._keys)
+        for paths in self._paths.values():
+            if not isinstance(paths, str):
+                size += sys.getsizeof(paths)
+        return size
+
+    def __contains__(self, key):
+        return key in self._paths
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args={
+                'keys': len(self._paths),
+                'paths': len(self._keys),
+            },
+        )
@@ -0,0 +1,101 @@
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import logging
+
+from PyQt5 import QtCore
+from PyQt5 import QtWidgets
+
+from .progress import ProgressTracker
+
+logger = logging.getLogger(__name__)
+
+
+class LoadingProgress(QtWidgets.QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._trackers = collections.OrderedDict()
+
+        self._label = QtWidgets.QLabel(self)
+        self._bar = QtWidgets.QProgressBar(self)
+        self._bar.setMaximumWidth(160)
+        self._bar.setTextVisible(False)
+
+        layout = QtWidgets.QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self._label)
+        layout.addWidget(self._bar)
+
+        # Finished phases stay on screen for a moment
+        self._hide_timer = QtCore.QTimer(self)
+        self._hide_timer.setSingleShot(True)
+        self._hide_timer.setInterval(5000)
+        self._hide_timer.timeout.connect(self.hide)
+
+        self.hide()
+
+    def trackers(self):
+        return list(self._trackers.values())
+
+    @QtCore.pyqtSlot()
+    def reset(self):
+        self._trackers.clear()
+        self._hide_timer.stop()
+        self.hide()
+
+    @QtCore.pyqtSlot(str, int, int)
+    def update_progress(self, phase, done, total):
+        tracker = self._trackers.get(phase)
+        if tracker is None or tracker.finished is not None:
+            tracker = self._trackers[phase] = ProgressTracker(phase)
+        tracker.update(done, total)
+
+        if total:
+            self._bar.setRange(0, total)
+            self._bar.setValue(done)
+        else:
+            self._bar.setRange(0, 0)
+
+        self._hide_timer.stop()
+        self._refresh()
+        self.show()
+
+    @QtCore.pyqtSlot(str)
+    def finish_progress(self, phase):
+        tracker = self._trackers.get(phase)
+        if tracker is None:
+            return
+
+        tracker.finish()
+        logger.debug(tracker.describe())
+        self._refresh()
+
+        if all(t.finished is not None for t in self._trackers.values()):
+            self._bar.setRange(0, 1)
+            self._bar.setValue(1)
+            self._hide_timer.start()
+
+    def _refresh(self):
+        texts = [tracker.describe() for tracker in self._trackers.values()]
+        self._label.setText(" | ".join(texts))
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args=list(self._trackers),
+        )
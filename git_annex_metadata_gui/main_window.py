@@ -19,19 +19,22 @@
 import bisect
 import functools
 import logging
+import tracemalloc
 
-from PyQt5 import Qt
 from PyQt5 import QtCore
 from PyQt5 import QtGui
 from PyQt5 import QtWidgets
 
-from git_annex_adapter.repo import GitAnnexRepo
-from git_annex_adapter.exceptions import NotAGitAnnexRepoError
-
 from .key_metadata_model import AnnexedKeyMetadataModel
 from .file_metadata_model import AnnexedFileMetadataModel
+from .loading_progress import LoadingProgress
 from .main_window_ui import Ui_MainWindow
+from .memory_dialog import MemoryDialog
+from .memory_report import MemoryReport
 from .metadata_edit import MetadataEdit
+from .profiling import active_profiler
+from .profiling import watch_first_paint
+from .workspace import Workspace
 
 logger = logging.getLogger(__name__)
 
@@ -42,12 +45,34 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         self.setupUi()
 
         self.repo = None
-        self.model_keys = AnnexedKeyMetadataModel(self)
-        self.view_keys.setModel(self.model_keys)
+        self._repo_path = None
+        self._startup_path = None
+        self.model_keys = None
+        self.model_head = None
+        self.workspace = Workspace(self)
+        self.workspace.session_opened.connect(self._on_session_opened)
+        self.workspace.session_closed.connect(self._on_session_closed)
+
+        self.loading_progress = LoadingProgress(self.statusbar)
+        self.statusbar.addPermanentWidget(self.loading_progress)
+
+        # Shown until a repository is opened
+        self._empty_keys = AnnexedKeyMetadataModel(self)
+        self._empty_head = AnnexedFileMetadataModel(self)
+        self._empty_head.setSourceModel(self._empty_keys)
+        self._set_models(self._empty_keys, self._empty_head)
+
+        for view in (self.view_keys, self.view_head):
+            signal = view.neighbors_selected
+            signal.connect(self.stack_preview.prefetch_items)
+            watch_first_paint(view)
 
-        self.model_head = AnnexedFileMetadataModel(self.view_head)
-        self.model_head.setSourceModel(self.model_keys)
-        self.view_head.setModel(self.model_head)
+        # Only the tree has rows for keys that haven't loaded yet
+        signal = self.view_head.visible_keys_changed
+        signal.connect(self._prioritize_keys)
+
+        self._setup_repo_menu()
+        self._setup_memory_actions()
 
     def setupUi(self, window=None):
         if window is None:
@@ -68,18 +93,83 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             logger.info('No path chosen to open.')
             return
 
+        if path in self.workspace:
+            self.switch_repo(path)
+            return
+
         fmt = "Opening path '{}'."
         msg = fmt.format(path)
         logger.info(msg)
 
+        # Imported here rather than on startup, along with pygit2 it
+        # takes longer to load than the window takes to show
+        from git_annex_adapter.repo import GitAnnexRepo
+        from git_annex_adapter.exceptions import NotAGitAnnexRepoError
+
         try:
-            self.repo = GitAnnexRepo(path)
+            repo = GitAnnexRepo(path)
         except NotAGitAnnexRepoError:
             fmt = "Path '{}' is not a git-annex repository."
             msg = fmt.format(path)
             logger.error(msg)
         else:
-            self.refresh_repo()
+            self.workspace.open(path, repo)
+            self.switch_repo(path)
+
+    def open_repo_when_shown(self, path):
+        # Opening imports and reads a lot, the window is shown first
+        self._startup_path = path
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+
+        profiler = active_profiler()
+        if profiler is not None:
+            profiler.mark("Window painted")
+
+        if self._startup_path is not None:
+            path, self._startup_path = self._startup_path, None
+            # Queued so that the children get painted as well
+            open_repo = functools.partial(self.open_repo, path)
+            QtCore.QTimer.singleShot(0, open_repo)
+
+    @QtCore.pyqtSlot(str)
+    def switch_repo(self, path):
+        session = self.workspace.session(path)
+        if session is None:
+            return
+
+        self.repo = session.repo
+        self._repo_path = session.path
+        self._set_models(session.model_keys, session.model_head)
+        self.stack_preview.clear()
+        self.metadata_edit.clear()
+
+        for action in self._repo_actions.actions():
+            action.setChecked(action.data() == session.path)
+        title = "{} - Git-Annex Metadata Gui".format(session.name)
+        self.setWindowTitle(title)
+
+    @QtCore.pyqtSlot()
+    def close_repo(self):
+        if self.repo is None:
+            return
+
+        path = self._repo_path
+
+        # Views have to let go of the models before they are deleted
+        self.repo = None
+        self._repo_path = None
+        self._set_models(self._empty_keys, self._empty_head)
+        self.stack_preview.clear()
+        self.metadata_edit.clear()
+        self.setWindowTitle("Git-Annex Metadata Gui")
+
+        self.workspace.close(path)
+
+        remaining = self.workspace.sessions()
+        if remaining:
+            self.switch_repo(remaining[-1].path)
 
     @QtCore.pyqtSlot()
     def refresh_repo(self):
@@ -89,8 +179,80 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         if self.repo:
             self.model_keys.setRepo(self.repo)
             self.stack_preview.clear()
+            self.stack_preview.clear_cache()
             self.metadata_edit.clear()
 
+    def _set_models(self, model_keys, model_head):
+        # Progress follows whichever repository is being shown
+        for model in (self.model_keys, self.model_head):
+            if model is None:
+                continue
+            try:
+                model.progress_changed.disconnect(
+                    self.loading_progress.update_progress
+                )
+                model.progress_finished.disconnect(
+                    self.loading_progress.finish_progress
+                )
+            except TypeError:
+                pass
+
+        self.loading_progress.reset()
+        for model in (model_keys, model_head):
+            model.progress_changed.connect(
+                self.loading_progress.update_progress
+            )
+            model.progress_finished.connect(
+                self.loading_progress.finish_progress
+            )
+
+        self.model_keys = model_keys
+        self.model_head = model_head
+        self.view_keys.setModel(model_keys)
+        self.view_head.setModel(model_head)
+
+    def _prioritize_keys(self, keys):
+        self.model_keys.prioritize_keys(keys)
+
+    def _setup_repo_menu(self):
+        self.menu_repos = QtWidgets.QMenu(self.menubar)
+        self.menu_repos.setTitle("Repositories")
+        self.menu_repos.setDisabled(True)
+        self.menubar.insertMenu(
+            self.menu_headers.menuAction(),
+            self.menu_repos,
+        )
+
+        self._repo_actions = QtWidgets.QActionGroup(self)
+        self._repo_actions.setExclusive(True)
+
+        self.action_close_repo = QtWidgets.QAction(self)
+        self.action_close_repo.setText("Close Repository")
+        self.action_close_repo.triggered.connect(self.close_repo)
+        self.menu_repos.addAction(self.action_close_repo)
+        self.menu_repos.addSeparator()
+
+    def _on_session_opened(self, path):
+        session = self.workspace.session(path)
+        action = QtWidgets.QAction(self._repo_actions)
+        action.setText(session.name)
+        action.setToolTip(session.path)
+        action.setData(session.path)
+        action.setCheckable(True)
+        action.triggered.connect(lambda *_: self.switch_repo(path))
+        self.menu_repos.addAction(action)
+        self.menu_repos.setDisabled(False)
+
+    def _on_session_closed(self, path):
+        for action in self._repo_actions.actions():
+            if action.data() == path:
+                self._repo_actions.removeAction(action)
+                self.menu_repos.removeAction(action)
+                action.deleteLater()
+
+        empty = not self._repo_actions.actions()
+        self.menu_repos.setDisabled(empty)
+
     @QtCore.pyqtSlot()
     def clear_header_menu(self):
         self.menu_headers.clear()
@@ -132,6 +294,55 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         empty = len(self.menu_headers.actions()) == 0
         self.menu_headers.setDisabled(empty)
 
+    def _setup_memory_actions(self):
+        self._memory_dialog = None
+        self._memory_snapshot = None
+
+        self.action_memory_usage = QtWidgets.QAction(self)
+        self.action_memory_usage.setText("Memory Usage...")
+        self.action_memory_usage.triggered.connect(self.show_memory_dialog)
+
+        self.action_log_memory = QtWidgets.QAction(self)
+        self.action_log_memory.setText("Log Memory Usage")
+        self.action_log_memory.triggered.connect(self.log_memory_usage)
+
+        self.menu_help.insertAction(
+            self.action_about, self.action_memory_usage,
+        )
+        self.menu_help.insertAction(
+            self.action_about, self.action_log_memory,
+        )
+        self.menu_help.insertSeparator(self.action_about)
+
+    def memory_report(self):
+        report = MemoryReport()
+        for session in self.workspace.sessions():
+            report.add_models(session.model_keys, session.model_head)
+        for name, entries, nbytes in self.stack_preview.cache_usage():
+            report.add_cache(name, entries, nbytes)
+
+        # Each report shows what grew since the one before it
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            report.add_tracemalloc(snapshot, previous=self._memory_snapshot)
+            self._memory_snapshot = snapshot
+
+        return report
+
+    @QtCore.pyqtSlot()
+    def show_memory_dialog(self):
+        if self._memory_dialog is None:
+            self._memory_dialog = MemoryDialog(
+                lambda: self.memory_report().lines(), self,
+            )
+        self._memory_dialog.show()
+        self._memory_dialog.raise_()
+
+    @QtCore.pyqtSlot()
+    def log_memory_usage(self):
+        for line in self.memory_report().lines():
+            logger.info(line)
+
     @QtCore.pyqtSlot()
     def show_about_dialog(self):
         title = "About Git-Annex Metadata Gui"
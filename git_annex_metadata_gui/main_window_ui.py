@@ -82,6 +82,8 @@ class Ui_MainWindow(object):
         self.menu_headers = QtWidgets.QMenu(self.menubar)
         self.menu_headers.setEnabled(False)
         self.menu_headers.setObjectName("menu_headers")
+        self.menu_filter = QtWidgets.QMenu(self.menubar)
+        self.menu_filter.setObjectName("menu_filter")
         self.menu_docks = QtWidgets.QMenu(self.menubar)
         self.menu_docks.setObjectName("menu_docks")
         self.menu_help = QtWidgets.QMenu(self.menubar)
@@ -141,14 +143,19 @@ class Ui_MainWindow(object):
         self.action_dock_metadata.setObjectName("action_dock_metadata")
         self.action_about = QtWidgets.QAction(MainWindow)
         self.action_about.setObjectName("action_about")
+        self.action_only_present = QtWidgets.QAction(MainWindow)
+        self.action_only_present.setCheckable(True)
+        self.action_only_present.setObjectName("action_only_present")
         self.menu_file.addAction(self.action_open)
         self.menu_file.addAction(self.action_refresh)
         self.menu_file.addAction(self.action_exit)
+        self.menu_filter.addAction(self.action_only_present)
         self.menu_docks.addAction(self.action_dock_preview)
         self.menu_docks.addAction(self.action_dock_metadata)
         self.menu_help.addAction(self.action_about)
         self.menubar.addAction(self.menu_file.menuAction())
         self.menubar.addAction(self.menu_headers.menuAction())
+        self.menubar.addAction(self.menu_filter.menuAction())
         self.menubar.addAction(self.menu_docks.menuAction())
         self.menubar.addAction(self.menu_help.menuAction())
         self.label_filter_keys.setBuddy(self.edit_filter_keys)
@@ -177,6 +184,8 @@ class Ui_MainWindow(object):
         self.edit_set_treeish.returnPressed.connect(self.view_head.rebuild_treeish)
         self.button_set_treeish.clicked.connect(self.view_head.rebuild_treeish)
         self.action_about.triggered.connect(MainWindow.show_about_dialog)
+        self.action_only_present.toggled['bool'].connect(self.view_keys.set_content_filter)
+        self.action_only_present.toggled['bool'].connect(self.view_head.set_content_filter)
         QtCore.QMetaObject.connectSlotsByName(MainWindow)
 
     def retranslateUi(self, MainWindow):
@@ -193,6 +202,7 @@ class Ui_MainWindow(object):
         self.widget_tabs.setTabText(self.widget_tabs.indexOf(self.tab_head), _translate("MainWindow", "Work Tree"))
         self.menu_file.setTitle(_translate("MainWindow", "&File"))
         self.menu_headers.setTitle(_translate("MainWindow", "Headers"))
+        self.menu_filter.setTitle(_translate("MainWindow", "Filter"))
         self.menu_docks.setTitle(_translate("MainWindow", "Docks"))
         self.menu_help.setTitle(_translate("MainWindow", "Help"))
         self.dock_preview.setWindowTitle(_translate("MainWindow", "File Preview"))
@@ -206,6 +216,7 @@ class Ui_MainWindow(object):
         self.action_dock_preview.setText(_translate("MainWindow", "File Preview"))
         self.action_dock_metadata.setText(_translate("MainWindow", "Metadata Editor"))
         self.action_about.setText(_translate("MainWindow", "About"))
+        self.action_only_present.setText(_translate("MainWindow", "Only Files With Content"))
 
 from git_annex_metadata_gui.file_preview import FilePreview
 from git_annex_metadata_gui.metadata_edit import MetadataEdit
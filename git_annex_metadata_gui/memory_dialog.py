@@ -0,0 +1,81 @@
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+
+from PyQt5 import QtCore
+from PyQt5 import QtGui
+from PyQt5 import QtWidgets
+
+from .utils import system_font
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryDialog(QtWidgets.QDialog):
+    def __init__(self, report_function, parent=None):
+        super().__init__(parent)
+        self._report_function = report_function
+        self._lines = []
+
+        self.setWindowTitle("Memory Usage")
+        self.resize(640, 480)
+
+        self._text = QtWidgets.QPlainTextEdit(self)
+        self._text.setReadOnly(True)
+        self._text.setLineWrapMode(QtWidgets.QPlainTextEdit.NoWrap)
+        self._text.setFont(system_font(QtGui.QFontDatabase.FixedFont))
+
+        buttons = QtWidgets.QDialogButtonBox(self)
+        refresh = buttons.addButton(
+            "Refresh", QtWidgets.QDialogButtonBox.ActionRole,
+        )
+        refresh.clicked.connect(self.refresh)
+        log = buttons.addButton(
+            "Log", QtWidgets.QDialogButtonBox.ActionRole,
+        )
+        log.clicked.connect(self.log_report)
+        buttons.addButton(QtWidgets.QDialogButtonBox.Close)
+        buttons.rejected.connect(self.reject)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self._text)
+        layout.addWidget(buttons)
+
+    @QtCore.pyqtSlot()
+    def refresh(self):
+        QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+        try:
+            self._lines = list(self._report_function())
+        finally:
+            QtWidgets.QApplication.restoreOverrideCursor()
+        self._text.setPlainText('\n'.join(self._lines))
+
+    @QtCore.pyqtSlot()
+    def log_report(self):
+        for line in self._lines:
+            logger.info(line)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args=len(self._lines),
+        )
@@ -0,0 +1,223 @@
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import itertools
+import logging
+import os
+import sys
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# What Qt keeps for each QStandardItem outside of Python: the private
+# object, its role data vector and the children/parent bookkeeping.
+# Only a rough figure, Qt doesn't expose it.
+QT_ITEM_BYTES = 160
+
+# Items are sized from a sample, measuring each one would take longer
+# than the walk itself
+_SAMPLE_SIZE = 200
+
+
+def python_size(obj):
+    # Shallow, shared things like keys and field names aren't counted
+    size = sys.getsizeof(obj)
+    attrs = getattr(obj, '__dict__', None)
+    if attrs is not None:
+        size += sys.getsizeof(attrs)
+    return size
+
+
+def peak_rss():
+    # In bytes, None where the platform can't tell
+    if resource is None:
+        return None
+
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return usage
+    return usage * 1024
+
+
+def current_rss():
+    # In bytes, only where /proc is available
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE')
+
+
+class ItemTally:
+    def __init__(self):
+        self.count = 0
+        self._sampled = 0
+        self._sample_bytes = 0
+
+    def add(self, item):
+        self.count += 1
+        if self._sampled < _SAMPLE_SIZE:
+            self._sampled += 1
+            self._sample_bytes += python_size(item)
+
+    @property
+    def bytes(self):
+        if not self._sampled:
+            return 0
+        per_item = self._sample_bytes / self._sampled + QT_ITEM_BYTES
+        return round(per_item * self.count)
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args=self.count,
+        )
+
+
+def tally_items(model, tallies=None):
+    # Only cells that exist are visited, empty ones take no memory
+    if tallies is None:
+        tallies = collections.defaultdict(ItemTally)
+
+    pending = [model.invisibleRootItem()]
+    while pending:
+        parent = pending.pop()
+        for row in range(parent.rowCount()):
+            for col in range(parent.columnCount()):
+                item = parent.child(row, col)
+                if item is None:
+                    continue
+                tallies[type(item).__name__].add(item)
+                if col == 0 and item.hasChildren():
+                    pending.append(item)
+
+    return tallies
+
+
+class MemoryReport:
+    def __init__(self):
+        self.items = collections.OrderedDict()
+        self.caches = collections.OrderedDict()
+        self.tracemalloc = []
+        self.rss = current_rss()
+        self.peak_rss = peak_rss()
+
+    def add_models(self, model_keys, model_head):
+        tallies = collections.defaultdict(ItemTally)
+        for model in (model_keys, model_head):
+            if model is not None:
+                tally_items(model, tallies)
+        for name in sorted(tallies):
+            self.add_items(name, tallies[name].count, tallies[name].bytes)
+
+        if model_keys is None:
+            return
+
+        # Sized from a sample like the items, walking every set of
+        # values would take a while
+        key_items = model_keys.key_items.values()
+        sizes = [
+            item.metadata.memory_usage()
+            for item in itertools.islice(key_items, _SAMPLE_SIZE)
+            if hasattr(item.metadata, 'memory_usage')
+        ]
+        if sizes:
+            nbytes = sum(sizes) / len(sizes) * len(key_items)
+            self.add_cache('Key metadata', len(key_items), nbytes)
+
+        self.add_cache(
+            'Key items index', len(model_keys.key_items),
+            sys.getsizeof(model_keys.key_items),
+        )
+        for name, index in (
+            ('Key/path index', model_keys.paths),
+            ('Value index', model_keys.value_index),
+            ('Content index', model_keys.content),
+        ):
+            self.add_cache(name, len(index), index.memory_usage())
+
+    # Both add up, so that several open repositories show as one
+    def add_items(self, name, count, nbytes):
+        old_count, old_bytes = self.items.get(name, (0, 0))
+        self.items[name] = (old_count + count, old_bytes + nbytes)
+
+    def add_cache(self, name, entries, nbytes):
+        old_entries, old_bytes = self.caches.get(name, (0, 0))
+        self.caches[name] = (old_entries + entries, old_bytes + round(nbytes))
+
+    def add_tracemalloc(self, snapshot, previous=None, limit=15):
+        # Grouped by source line, so growth points at the allocating code
+        if previous is not None:
+            stats = snapshot.compare_to(previous, 'lineno')
+        else:
+            stats = snapshot.statistics('lineno')
+        self.tracemalloc = stats[:limit]
+
+    def lines(self):
+        fmt = "{:<28} {:>10} {:>12}"
+        yield fmt.format("Items", "Count", "Approx. MiB")
+        for name, (count, nbytes) in self.items.items():
+            yield fmt.format(name, count, _mib(nbytes))
+
+        yield ""
+        yield fmt.format("Caches", "Entries", "Approx. MiB")
+        for name, (entries, nbytes) in self.caches.items():
+            yield fmt.format(name, entries, _mib(nbytes))
+
+        yield ""
+        fmt = "{:<28} {:>23}"
+        if self.rss is not None:
+            yield fmt.format("Resident set", _mib(self.rss))
+
+            # Mostly Qt and library allocations the counts can't see,
+            # like font and icon caches
+            accounted = sum(nbytes for _, nbytes in self.items.values())
+            accounted += sum(nbytes for _, nbytes in self.caches.values())
+            yield fmt.format("Unaccounted", _mib(self.rss - accounted))
+        if self.peak_rss is not None:
+            yield fmt.format("Peak resident set", _mib(self.peak_rss))
+
+        if not tracemalloc.is_tracing():
+            yield "Start with --trace-memory for allocation sites."
+            return
+
+        traced, _ = tracemalloc.get_traced_memory()
+        yield fmt.format("Traced by Python", _mib(traced))
+        yield ""
+        for stat in self.tracemalloc:
+            yield str(stat)
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args={
+                'items': sum(count for count, _ in self.items.values()),
+                'rss': self.rss,
+            },
+        )
+
+
+def _mib(nbytes):
+    return "{:.1f}".format(nbytes / (1 << 20))
@@ -14,19 +14,16 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-import sip
+import bisect
 import logging
 
-from PyQt5 import Qt
 from PyQt5 import QtGui
 from PyQt5 import QtCore
 from PyQt5 import QtWidgets
 
 try:
-    from .auto_size_line_edit import AutoSizeLineEdit
     from .field_item_edit import FieldItemEdit
 except ImportError:
-    from auto_size_line_edit import AutoSizeLineEdit
     from field_item_edit import FieldItemEdit
 
 logger = logging.getLogger(__name__)
@@ -35,25 +32,67 @@ logger = logging.getLogger(__name__)
 class MetadataEdit(QtWidgets.QGroupBox):
     new_field_requested = QtCore.pyqtSignal(str)
 
+    # Number of rows to bind at once while scrolling down
+    _batch_size = 16
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self._item = None
-        self._fields = []
-        self._new_field_edit = None
+        self._model = None
+        self._rows = []
+        self._shown_fields = []
+        self._added_fields = set()
+        self._bound = 0
+
+        layout = QtWidgets.QVBoxLayout()
+        self.setLayout(layout)
+
+        line_edit = QtWidgets.QLineEdit()
+        line_edit.editingFinished.connect(self._request_new_field)
+        line_edit.setPlaceholderText('Add field...')
+        line_edit.setClearButtonEnabled(True)
+        layout.addWidget(line_edit)
+        self._new_field_edit = line_edit
+
+        completer = QtWidgets.QCompleter(line_edit)
+        completer.setModel(QtCore.QStringListModel(completer))
+        completer.setCaseSensitivity(QtCore.Qt.CaseInsensitive)
+        completer.setFilterMode(QtCore.Qt.MatchContains)
+        line_edit.setCompleter(completer)
+        self._completer = completer
+
+        form = QtWidgets.QWidget()
+        self._form = QtWidgets.QFormLayout(form)
+        self._form.setFieldGrowthPolicy(self._form.FieldsStayAtSizeHint)
+
+        scroll_area = QtWidgets.QScrollArea()
+        scroll_area.setWidgetResizable(True)
+        scroll_area.setFrameShape(QtWidgets.QFrame.NoFrame)
+        scroll_area.setWidget(form)
+        layout.addWidget(scroll_area)
+        self._scroll_area = scroll_area
+
+        scroll_bar = scroll_area.verticalScrollBar()
+        scroll_bar.valueChanged.connect(self._fill_viewport)
+        scroll_bar.rangeChanged.connect(self._fill_viewport)
+
         self.clear()
 
     @QtCore.pyqtSlot(QtGui.QStandardItem)
     def set_item(self, item):
-        self.clear()
-
         if not self.isVisible():
+            self.clear()
             msg = "Metadata editor invisible, not setting file for it."
             logger.info(msg)
             return
 
-        if not hasattr(item, 'key'):
+        if getattr(item, 'metadata', None) is None:
+            self.clear()
             return
 
+        reset = item is not self._item
+        if reset:
+            self._added_fields = set()
         self._item = item
 
         if hasattr(item, 'name'):
@@ -62,20 +101,11 @@ class MetadataEdit(QtWidgets.QGroupBox):
             desc = item.key
         self.setTitle(desc)
 
-        model = self._item.model()
-        model.columnsInserted.connect(self._on_columns_inserted)
-        model.modelReset.connect(self.clear)
-        self.new_field_requested.connect(model.insert_field)
-
-        if self._new_field_edit is None:
-            line_edit = AutoSizeLineEdit()
-            line_edit.editingFinished.connect(self._request_new_field)
-            line_edit.setPlaceholderText('+')
-            line_edit.setAlignment(Qt.Qt.AlignCenter)
-            self.layout().addRow(line_edit, QtWidgets.QWidget())
-            self._new_field_edit = line_edit
-
-        self.update_fields()
+        self._set_model(self._item.model())
+        self._new_field_edit.setEnabled(True)
+        if reset:
+            self._scroll_area.verticalScrollBar().setValue(0)
+        self.update_fields(reset=reset)
 
         fmt = "File '{}' set for metadata editing."
         msg = fmt.format(desc)
@@ -83,50 +113,104 @@ class MetadataEdit(QtWidgets.QGroupBox):
 
     @QtCore.pyqtSlot()
     def clear(self):
-        try:
-            model = self._item.model()
-        except (AttributeError, RuntimeError):
-            pass
-        else:
-            model.columnsInserted.disconnect(self._on_columns_inserted)
-            self.new_field_requested.disconnect(model.insert_field)
-
         self._item = None
-        self._fields = []
-        self._new_field_edit = None
+        self._shown_fields = []
+        self._added_fields = set()
         self.setTitle('')
+        self._bind_rows(0)
 
-        if self.layout() is not None:
-            while self.layout().count():
-                item = self.layout().takeAt(0)
-                if item:
-                    item.widget().deleteLater()
-            sip.delete(self.layout())
+        self._new_field_edit.clear()
+        self._new_field_edit.setEnabled(False)
 
-        layout = QtWidgets.QFormLayout()
-        layout.setFieldGrowthPolicy(layout.FieldsStayAtSizeHint)
-        self.setLayout(layout)
-
-    def update_fields(self):
+    def update_fields(self, reset=False):
         if self._item is None:
             return
 
-        model = self._item.model()
-        parent = self._item.parent()
-        if not parent:
-            parent = model.invisibleRootItem()
-        row = self._item.row()
-
-        for col, field in enumerate(model.fields[1:], 1):
-            if field in self._fields:
-                continue
-            self._fields.append(field)
-            field_item = parent.child(row, col)
-            self.layout().insertRow(
-                self.layout().rowCount() - 1,
-                "{}: ".format(field),
-                FieldItemEdit(field_item, parent=self),
-            )
+        fields = set(self._added_fields)
+        metadata = getattr(self._item, 'metadata', None)
+        if metadata is not None:
+            fields.update(f for f, values in metadata.items() if values)
+        else:
+            fields.update(self._item.model().fields[1:])
+
+        self._shown_fields = sorted(fields)
+        if reset:
+            self._bind_rows(self._batch_size)
+        else:
+            self._bind_rows(max(self._bound, self._batch_size))
+
+    def _bind_rows(self, count):
+        model = self._model
+        count = min(count, len(self._shown_fields))
+
+        if self._item is not None:
+            parent = self._item.parent()
+            if not parent:
+                parent = model.invisibleRootItem()
+            row = self._item.row()
+
+        # Rows are reused across items, only create the missing ones
+        while len(self._rows) < count:
+            field_edit = FieldItemEdit(None, parent=self)
+            self._form.addRow(QtWidgets.QLabel(), field_edit)
+            self._rows.append(field_edit)
+
+        for field_edit, field in zip(self._rows, self._shown_fields[:count]):
+            col = bisect.bisect_left(model.fields, field, lo=1)
+            if col == len(model.fields) or model.fields[col] != field:
+                field_item = None
+            else:
+                index = model.index(row, col, parent.index())
+                field_item = model.itemFromIndex(index)
+
+            label = self._form.labelForField(field_edit)
+            label.setText("{}: ".format(field))
+            field_edit.set_item(field_item)
+            self._set_row_visible(field_edit, field_item is not None)
+
+        for field_edit in self._rows[count:self._bound]:
+            field_edit.set_item(None)
+            self._set_row_visible(field_edit, False)
+
+        self._bound = count
+
+    def _fill_viewport(self):
+        if self._bound >= len(self._shown_fields):
+            return
+
+        scroll_bar = self._scroll_area.verticalScrollBar()
+        if scroll_bar.value() >= scroll_bar.maximum() - scroll_bar.pageStep():
+            self._bind_rows(self._bound + self._batch_size)
+
+    def _set_model(self, model):
+        if model is self._model:
+            return
+
+        if self._model is not None:
+            try:
+                self._model.columnsInserted.disconnect(
+                    self._on_columns_inserted)
+                self._model.modelReset.disconnect(self.clear)
+                self.new_field_requested.disconnect(
+                    self._model.insert_field)
+            except (TypeError, RuntimeError):
+                pass
+
+        model.columnsInserted.connect(self._on_columns_inserted)
+        model.modelReset.connect(self.clear)
+        self.new_field_requested.connect(model.insert_field)
+        self._model = model
+        self._update_completer()
+
+    def _update_completer(self):
+        if self._model is not None:
+            self._completer.model().setStringList(self._model.fields[1:])
+
+    def _set_row_visible(self, field, visible):
+        field.setVisible(visible)
+        label = self._form.labelForField(field)
+        if label:
+            label.setVisible(visible)
 
     def setTitle(self, title):
         if len(title) > 48:
@@ -135,15 +219,31 @@ class MetadataEdit(QtWidgets.QGroupBox):
 
     def _request_new_field(self):
         field = self._new_field_edit.text()
-        if field:
-            fmt = "Requesting to create new metadata field '{}'."
-            msg = fmt.format(field)
-            logger.info(msg)
-
+        if field and self._item is not None:
             self._new_field_edit.clear()
-            self.new_field_requested.emit(field)
+            self._added_fields.add(field)
+
+            if field in self._model.fields:
+                self.update_fields()
+            else:
+                fmt = "Requesting to create new metadata field '{}'."
+                msg = fmt.format(field)
+                logger.info(msg)
+                self.new_field_requested.emit(field)
+
+            if field not in self._shown_fields:
+                return
+
+            idx = self._shown_fields.index(field)
+            if idx >= self._bound:
+                self._bind_rows(idx + 1)
+            field_edit = self._rows[idx]
+            self._scroll_area.ensureWidgetVisible(field_edit)
+            field_edit.edit_new_value()
 
     def _on_columns_inserted(self, parent, first, last):
+        self._update_completer()
+
         if self._item is None:
             return
 
@@ -0,0 +1,448 @@
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import base64
+import binascii
+import collections
+import collections.abc
+import hashlib
+import itertools
+import logging
+import os
+import re
+import sys
+
+from PyQt5 import QtCore
+
+logger = logging.getLogger(__name__)
+
+# pygit2, the worker pool and the schema store are imported where
+# they're used, none of them are needed before a repository is opened
+
+
+def is_internal_field(field):
+    return field == 'lastchanged' or field.endswith('-lastchanged')
+
+
+_KEY_ESCAPES = {'&a': '&', '&s': '%', '&c': ':', '%': '/'}
+_KEY_ESCAPE_RE = re.compile('&[asc]|%')
+
+
+def key_from_log_name(name, suffix='.log'):
+    name = name[:-len(suffix)]
+    if '&' not in name and '%' not in name:
+        return name
+    return _KEY_ESCAPE_RE.sub(lambda m: _KEY_ESCAPES[m.group()], name)
+
+
+def hash_dir_lower(key):
+    # Where git-annex puts a key's logs on its branch, as aaa/bbb
+    digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+    return digest[:3], digest[3:6]
+
+
+def decode_value(value):
+    if value[:1] != '!':
+        return value
+    try:
+        return base64.b64decode(value[1:]).decode('utf-8', 'replace')
+    except binascii.Error:
+        return value
+
+
+def annex_branch_commit(repo):
+    branch = repo.lookup_branch('git-annex')
+    if branch is None:
+        return None
+
+    import pygit2
+    return branch.peel(pygit2.Commit)
+
+
+def annex_branch_tree(repo):
+    # None until git-annex first commits to its branch, read as empty
+    commit = annex_branch_commit(repo)
+    if commit is None:
+        return None
+    return commit.tree
+
+
+def iter_log_blobs(repo, suffix='.log.met', tree=None):
+    # git-annex:aaa/bbb/KEY.log.met
+    if tree is None:
+        tree = annex_branch_tree(repo)
+    if tree is None:
+        return
+
+    for aaa in tree:
+        if aaa.type_str != 'tree':
+            continue
+        for bbb in repo[aaa.id]:
+            if bbb.type_str != 'tree':
+                continue
+            for log in repo[bbb.id]:
+                if log.type_str == 'blob' and log.name.endswith(suffix):
+                    yield log.name, log.id
+
+
+def scan_fields(data):
+    fields = set()
+    for line in data.splitlines():
+        for token in line.split()[1:]:
+            if token[:1] not in (b'+', b'-'):
+                fields.add(token)
+    return fields
+
+
+def parse_metadata_log(data):
+    entries = []
+    for line in data.decode('utf-8', 'replace').splitlines():
+        tokens = line.split()
+        try:
+            timestamp = float(tokens[0].rstrip('s'))
+        except (IndexError, ValueError):
+            continue
+        entries.append((timestamp, tokens))
+
+    # Later lines win, regardless of where union merges put them
+    if len(entries) > 1:
+        entries.sort(key=lambda entry: entry[0])
+
+    metadata = {}
+    for _, tokens in entries:
+        values = None
+        for token in tokens[1:]:
+            op = token[0]
+            if op == '+':
+                if values is not None:
+                    values.add(decode_value(token[1:]))
+            elif op == '-':
+                if values is not None:
+                    values.discard(decode_value(token[1:]))
+            else:
+                values = metadata.setdefault(token, set())
+
+    return {
+        field: values for field, values in metadata.items()
+        if values and not is_internal_field(field)
+    }
+
+
+def read_journal(repo):
+    # Changes git-annex hasn't committed to its branch yet, as files
+    # named after their branch path with '/' as '_' and '_' as '__'
+    journal = os.path.join(repo.path, 'annex', 'journal')
+    try:
+        names = os.listdir(journal)
+    except OSError:
+        names = []
+
+    logs, metadata = set(), {}
+    for name in names:
+        path = name.replace('_', '/').replace('//', '_')
+
+        # Only per-key logs, not uuid.log, remote.log and the like
+        parts = path.split('/')
+        if len(parts) != 3 or len(parts[0]) != 3 or len(parts[1]) != 3:
+            continue
+        name_ = parts[2]
+
+        if name_.endswith('.log'):
+            logs.add(key_from_log_name(name_))
+        elif name_.endswith('.log.met'):
+            key = key_from_log_name(name_, suffix='.log.met')
+            metadata[key] = os.path.join(journal, name)
+    return logs, metadata
+
+
+def _read_file(path):
+    try:
+        with open(path, 'rb') as file:
+            return file.read()
+    except OSError:
+        return b''
+
+
+def read_subtrees(repo, tree_ids):
+    # Strings are interned so pickling a batch stores each once
+    intern = sys.intern
+
+    records = []
+    for tree_id in tree_ids:
+        for bbb in repo[tree_id]:
+            if bbb.type_str != 'tree':
+                continue
+
+            logs = {
+                log.name: log.id for log in repo[bbb.id]
+                if log.type_str == 'blob'
+            }
+            for name, blob_id in logs.items():
+                # Keys can have metadata without a location log
+                if name.endswith('.log'):
+                    blob_id = logs.get(name + '.met')
+                elif name.endswith('.log.met'):
+                    name = name[:-len('.met')]
+                    if name in logs:
+                        continue
+                else:
+                    continue
+
+                if blob_id is None:
+                    metadata = {}
+                else:
+                    metadata = parse_metadata_log(repo[blob_id].data)
+
+                fields = tuple(
+                    (intern(field), tuple(map(intern, values)))
+                    for field, values in metadata.items()
+                )
+                records.append((key_from_log_name(name), fields))
+
+    return records
+
+
+_worker_repo = None
+
+
+def _init_worker(path):
+    global _worker_repo
+    import pygit2
+    _worker_repo = pygit2.Repository(path)
+
+
+def _read_subtrees_in_worker(tree_ids):
+    return read_subtrees(_worker_repo, tree_ids)
+
+
+class MetadataLoader(QtCore.QObject):
+    # Emitted from worker threads when a batch is done, connect it
+    # queued to pick up where waiting left off
+    results_ready = QtCore.pyqtSignal()
+
+    # Below this many hash directories, starting workers isn't worth it
+    _parallel_threshold = 1024
+    _chunk_size = 64
+
+    def __init__(self, repo, tree=None, workers=None, parent=None):
+        super().__init__(parent)
+        if tree is None:
+            tree = annex_branch_tree(repo)
+        if tree is None:
+            tree = []
+
+        self._repo = repo
+        self._tree = tree
+        self._workers = workers or os.cpu_count() or 1
+        self._executor = None
+        self._finished = collections.deque()
+        self._priority = []
+
+        # Hash directories read so far, out of how many
+        self.subtrees_done = 0
+        self.subtrees_total = sum(
+            1 for entry in tree if entry.type_str == 'tree'
+        )
+
+    def prioritize(self, keys):
+        # Replaces earlier hints, only what's wanted now matters
+        self._priority = [hash_dir_lower(key)[0] for key in keys]
+
+    def __iter__(self):
+        # Yields batches of (key, metadata), or None while waiting for
+        # workers until results_ready is emitted
+        journal_logs, journal_metadata = read_journal(self._repo)
+
+        def merge(key, fields):
+            journal_logs.discard(key)
+            path = journal_metadata.pop(key, None)
+            if path is not None:
+                return key, parse_metadata_log(_read_file(path))
+            return key, {sys.intern(f): values for f, values in fields}
+
+        try:
+            for batch in self._batches():
+                if batch is None:
+                    yield None
+                    continue
+                yield [merge(key, fields) for key, fields in batch]
+        finally:
+            self.close()
+
+        # Keys only the journal knows about, with or without a
+        # location log
+        journal_keys = journal_logs | set(journal_metadata)
+        yield [merge(key, ()) for key in journal_keys]
+
+    def _batches(self):
+        trees = {
+            entry.name: str(entry.id) for entry in self._tree
+            if entry.type_str == 'tree'
+        }
+
+        def next_chunk():
+            names = [
+                name for name in dict.fromkeys(self._priority)
+                if name in trees
+            ]
+            self._priority = names[self._chunk_size:]
+            names = names[:self._chunk_size]
+            if not names:
+                names = list(itertools.islice(trees, self._chunk_size))
+            return [trees.pop(name) for name in names]
+
+        if self._workers < 2 or len(trees) < self._parallel_threshold:
+            while trees:
+                chunk = next_chunk()
+                records = read_subtrees(self._repo, chunk)
+                self.subtrees_done += len(chunk)
+                yield records
+            return
+
+        fmt = "Parsing metadata logs with {} worker processes."
+        msg = fmt.format(self._workers)
+        logger.info(msg)
+
+        import concurrent.futures
+        import multiprocessing
+
+        # Forking would copy the Qt state of the GUI process
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self._workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(self._repo.path,),
+        )
+
+        # Chunks are handed out as workers free up, so that priority
+        # hints can still jump ahead of what's left
+        pending = {}
+        while trees or pending:
+            while trees and len(pending) < 2 * self._workers:
+                chunk = next_chunk()
+                future = self._executor.submit(
+                    _read_subtrees_in_worker, chunk,
+                )
+                pending[future] = len(chunk)
+                future.add_done_callback(self._on_future_done)
+
+            if not self._finished:
+                yield None
+                continue
+
+            future = self._finished.popleft()
+            self.subtrees_done += pending.pop(future)
+            yield future.result()
+
+    def _on_future_done(self, future):
+        # On the executor's thread, a deque is safe to append to here
+        self._finished.append(future)
+        self.results_ready.emit()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args=self._repo.path,
+        )
+
+
+def iter_schema(repo, tree=None):
+    for _, blob_id in iter_log_blobs(repo, tree=tree):
+        fields = scan_fields(repo[blob_id].data)
+        yield {
+            field for field in map(bytes.decode, fields)
+            if not is_internal_field(field)
+        }
+
+
+class PreloadedMetadata(collections.abc.MutableMapping):
+    # Reads come from the bulk-loaded log, writes go through git-annex
+    def __init__(self, key_obj, metadata):
+        self._obj = key_obj
+        self._metadata = metadata
+
+    def __getitem__(self, field):
+        return set(self._metadata[field])
+
+    def __setitem__(self, field, value):
+        self._obj.metadata[field] = value
+        if value:
+            self._metadata[field] = set(value)
+        else:
+            self._metadata.pop(field, None)
+
+    def __delitem__(self, field):
+        del self._obj.metadata[field]
+        self._metadata.pop(field, None)
+
+    def __iter__(self):
+        return iter(self._metadata)
+
+    def __len__(self):
+        return len(self._metadata)
+
+    def memory_usage(self):
+        size = sys.getsizeof(self) + sys.getsizeof(self._metadata)
+        for values in self._metadata.values():
+            size += sys.getsizeof(values)
+            size += sum(sys.getsizeof(value) for value in values)
+        return size
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args=self._obj.key,
+        )
+
+
+class SchemaCache:
+    # Only the schema of a repository's latest git-annex commit is
+    # kept, older ones would never be asked for again
+    def __init__(self):
+        self._store = None
+
+    @property
+    def store(self):
+        if self._store is None:
+            from .persistent_store import shared_store
+            self._store = shared_store('schemas')
+        return self._store
+
+    def get(self, repo, commit):
+        entry = self.store.get(repo.path)
+        if entry is None or entry['commit'] != str(commit.id):
+            return None
+        return entry['fields']
+
+    def put(self, repo, commit, fields):
+        self.store[repo.path] = {
+            'commit': str(commit.id),
+            'fields': sorted(fields),
+        }
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args=self._store,
+        )
@@ -20,6 +20,7 @@ from PyQt5 import QtCore
 from PyQt5 import QtGui
 from PyQt5 import QtWidgets
 
+from .profiling import profile_phase
 from .utils import StandardItemProxyModel
 
 logger = logging.getLogger(__name__)
@@ -27,6 +28,7 @@ logger = logging.getLogger(__name__)
 
 class MetadataTableView(QtWidgets.QTableView):
     item_selected = QtCore.pyqtSignal(QtGui.QStandardItem)
+    neighbors_selected = QtCore.pyqtSignal(list)
     header_visibility_changed = QtCore.pyqtSignal(str, bool)
     header_created = QtCore.pyqtSignal(str)
     model_reset = QtCore.pyqtSignal()
@@ -35,12 +37,45 @@ class MetadataTableView(QtWidgets.QTableView):
         super().__init__(parent)
         self._fields = []
         self._filter = ('', 'Fixed')
+        self._neighbor_count = 3
+        self._bare_model = None
+        self._proxies = {}
+        self._content_filter = None
 
     def setModel(self, model):
+        if self._bare_model is not None:
+            signal = self._bare_model.headerDataChanged
+            signal.disconnect(self._on_header_data_changed)
+
+            signal = self._bare_model.modelReset
+            signal.disconnect(self._on_model_reset)
+
+        # Proxies are kept per model, so switching back to a model
+        # doesn't sort it all over again
+        proxy = self._proxies.get(id(model))
+        if proxy is None:
+            proxy = StandardItemProxyModel(model)
+            proxy.setSourceModel(model)
+            model.destroyed.connect(
+                lambda *_, key=id(model): self._proxies.pop(key, None)
+            )
+            self._proxies[id(model)] = proxy
+
         self._bare_model = model
-        self._proxy_model = StandardItemProxyModel(model)
-        self._proxy_model.setSourceModel(model)
+        self._proxy_model = proxy
+        if proxy.contentFilter() != self._content_filter:
+            proxy.setContentFilter(self._content_filter)
+
+        # Qt leaves the old selection model to whoever made it
+        old_selection = self.selectionModel()
         super().setModel(self._proxy_model)
+        if old_selection not in (None, self.selectionModel()):
+            try:
+                signal = old_selection.selectionChanged
+                signal.disconnect(self._on_selection_changed)
+            except TypeError:
+                pass
+            old_selection.deleteLater()
 
         signal = self.selectionModel().selectionChanged
         signal.connect(self._on_selection_changed)
@@ -51,6 +86,12 @@ class MetadataTableView(QtWidgets.QTableView):
         signal = self._bare_model.modelReset
         signal.connect(self._on_model_reset)
 
+        self._on_model_reset()
+        self._on_header_data_changed(QtCore.Qt.Horizontal, 0, 0)
+
+        if self._filter[0]:
+            self.filter()
+
     @QtCore.pyqtSlot(str)
     @QtCore.pyqtSlot(str, bool)
     def show_header(self, title, visible=True):
@@ -90,12 +131,13 @@ class MetadataTableView(QtWidgets.QTableView):
         if not self.model():
             return
 
-        if type_ == 'Fixed':
-            self.model().setFilterFixedString(pattern)
-        elif type_ == 'Regex':
-            self.model().setFilterRegExp(pattern)
-        elif type_ == 'Wildcard':
-            self.model().setFilterWildcard(pattern)
+        with profile_phase("Filter"):
+            if type_ == 'Fixed':
+                self.model().setFilterFixedString(pattern)
+            elif type_ == 'Regex':
+                self.model().setFilterRegExp(pattern)
+            elif type_ == 'Wildcard':
+                self.model().setFilterWildcard(pattern)
 
         if pattern:
             fmt = "Filtered keys with {} pattern '{}'."
@@ -104,6 +146,21 @@ class MetadataTableView(QtWidgets.QTableView):
             msg = "Removed key filter."
         logger.info(msg)
 
+    @QtCore.pyqtSlot(bool)
+    def set_content_filter(self, only_present):
+        if not self.model():
+            return
+
+        if only_present:
+            self._content_filter = True
+            self._proxy_model.setContentFilter(True)
+            msg = "Showing only keys with content present."
+        else:
+            self._content_filter = None
+            self._proxy_model.setContentFilter(None)
+            msg = "Showing keys regardless of content presence."
+        logger.info(msg)
+
     def _on_selection_changed(self, selected, deselected):
         indexes = selected.indexes()
         if not indexes:
@@ -114,6 +171,23 @@ class MetadataTableView(QtWidgets.QTableView):
         item = src_index.model().itemFromIndex(src_index)
 
         self.item_selected.emit(item)
+        self.neighbors_selected.emit(self._neighbor_items(index))
+
+    def _neighbor_items(self, index):
+        model = self.model()
+        rows = (
+            index.row() + offset
+            for distance in range(1, self._neighbor_count + 1)
+            for offset in (distance, -distance)
+        )
+
+        items = []
+        for row in rows:
+            if not (0 <= row < model.rowCount()):
+                continue
+            src_index = model.mapToSource(model.index(row, 0))
+            items.append(self._bare_model.itemFromIndex(src_index))
+        return items
 
     def _on_header_data_changed(self, orientation, first, last):
         fields = self._bare_model.fields[1:]
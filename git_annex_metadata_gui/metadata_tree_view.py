@@ -16,7 +16,6 @@
 
 import logging
 
-from PyQt5 import Qt
 from PyQt5 import QtCore
 from PyQt5 import QtGui
 from PyQt5 import QtWidgets
@@ -27,20 +26,69 @@ from .utils import StandardItemProxyModel
 
 class MetadataTreeView(QtWidgets.QTreeView):
     item_selected = QtCore.pyqtSignal(QtGui.QStandardItem)
+    neighbors_selected = QtCore.pyqtSignal(list)
     header_visibility_changed = QtCore.pyqtSignal(str, bool)
     header_created = QtCore.pyqtSignal(str)
     model_reset = QtCore.pyqtSignal()
+    visible_keys_changed = QtCore.pyqtSignal(list)
 
     def __init__(self, parent=None):
         super().__init__(parent)
         self._treeish = 'HEAD'
-        self.sortByColumn(0, Qt.Qt.AscendingOrder)
+        self._neighbor_count = 3
+        self._bare_model = None
+        self._proxies = {}
+        self._content_filter = None
+
+        # Throttled, scrolling and loading both fire in quick bursts
+        self._visible_keys_timer = QtCore.QTimer(self)
+        self._visible_keys_timer.setSingleShot(True)
+        self._visible_keys_timer.setInterval(100)
+        self._visible_keys_timer.timeout.connect(self._emit_visible_keys)
+
+        signal = self.verticalScrollBar().valueChanged
+        signal.connect(self._schedule_visible_keys)
+
+        signal = self.expanded
+        signal.connect(self._schedule_visible_keys)
+
+        self.sortByColumn(0, QtCore.Qt.AscendingOrder)
 
     def setModel(self, model):
+        if self._bare_model is not None:
+            signal = self._bare_model.headerDataChanged
+            signal.disconnect(self._on_header_data_changed)
+
+            signal = self._bare_model.modelReset
+            signal.disconnect(self._on_model_reset)
+
+        # Proxies are kept per model, so switching back to a model
+        # doesn't sort it all over again
+        proxy = self._proxies.get(id(model))
+        if proxy is None:
+            proxy = StandardItemProxyModel(model)
+            proxy.setSourceModel(model)
+            proxy.rowsInserted.connect(self._schedule_visible_keys)
+            model.destroyed.connect(
+                lambda *_, key=id(model): self._proxies.pop(key, None)
+            )
+            self._proxies[id(model)] = proxy
+
         self._bare_model = model
-        self._proxy_model = StandardItemProxyModel(model)
-        self._proxy_model.setSourceModel(model)
+        self._proxy_model = proxy
+        if proxy.contentFilter() != self._content_filter:
+            proxy.setContentFilter(self._content_filter)
+
+        # Qt leaves the old selection model to whoever made it
+        old_selection = self.selectionModel()
         super().setModel(self._proxy_model)
+        if old_selection not in (None, self.selectionModel()):
+            try:
+                signal = old_selection.selectionChanged
+                signal.disconnect(self._on_selection_changed)
+            except TypeError:
+                pass
+            old_selection.deleteLater()
 
         signal = self.selectionModel().selectionChanged
         signal.connect(self._on_selection_changed)
@@ -51,6 +99,9 @@ class MetadataTreeView(QtWidgets.QTreeView):
         signal = self._bare_model.modelReset
         signal.connect(self._on_model_reset)
 
+        self._on_model_reset()
+        self._on_header_data_changed(QtCore.Qt.Horizontal, 0, 0)
+
     @QtCore.pyqtSlot(str)
     @QtCore.pyqtSlot(str, bool)
     def show_header(self, title, visible=True):
@@ -92,6 +143,21 @@ class MetadataTreeView(QtWidgets.QTreeView):
 
         self._bare_model.setTreeish(self._treeish)
 
+    @QtCore.pyqtSlot(bool)
+    def set_content_filter(self, only_present):
+        if not self.model():
+            return
+
+        if only_present:
+            self._content_filter = True
+            self._proxy_model.setContentFilter(True)
+            msg = "Showing only files with content present."
+        else:
+            self._content_filter = None
+            self._proxy_model.setContentFilter(None)
+            msg = "Showing files regardless of content presence."
+        logger.info(msg)
+
     def _on_selection_changed(self, selected, deselected):
         indexes = selected.indexes()
         if not indexes:
@@ -102,6 +168,49 @@ class MetadataTreeView(QtWidgets.QTreeView):
         item = src_index.model().itemFromIndex(src_index)
 
         self.item_selected.emit(item)
+        self.neighbors_selected.emit(self._neighbor_items(index))
+
+    def _neighbor_items(self, index):
+        def walk(step):
+            index_ = index.sibling(index.row(), 0)
+            found = 0
+            while found < self._neighbor_count:
+                index_ = step(index_)
+                if not index_.isValid():
+                    return
+                src_index = self.model().mapToSource(index_)
+                item = self._bare_model.itemFromIndex(src_index)
+                if hasattr(item, 'key'):
+                    found += 1
+                    yield item
+
+        below = walk(self.indexBelow)
+        above = walk(self.indexAbove)
+        return [*below, *above]
+
+    def _schedule_visible_keys(self, *args):
+        if not self._visible_keys_timer.isActive():
+            self._visible_keys_timer.start()
+
+    def _emit_visible_keys(self):
+        keys = []
+        bottom = self.viewport().height()
+        index = self.indexAt(QtCore.QPoint(0, 0))
+        while index.isValid() and self.visualRect(index).top() < bottom:
+            src_index = self.model().mapToSource(index)
+            item = self._bare_model.itemFromIndex(src_index)
+
+            # Placeholders, files whose key isn't loaded yet
+            if hasattr(item, 'key') and item.source() is None:
+                keys.append(item.key)
+            index = self.indexBelow(index)
+
+        if keys:
+            self.visible_keys_changed.emit(keys)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._schedule_visible_keys()
 
     def _on_header_data_changed(self, orientation, first, last):
         fields = self._bare_model.fields[1:]
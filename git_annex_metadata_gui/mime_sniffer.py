@@ -0,0 +1,141 @@
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import sys
+
+try:
+    from .persistent_store import shared_store
+except ImportError:
+    from persistent_store import shared_store
+
+logger = logging.getLogger(__name__)
+
+SNIFF_SIZE = 4096
+
+MAGIC_NUMBERS = [
+    (0, b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (0, b'\xff\xd8\xff', 'image/jpeg'),
+    (0, b'GIF87a', 'image/gif'),
+    (0, b'GIF89a', 'image/gif'),
+    (0, b'II*\x00', 'image/tiff'),
+    (0, b'MM\x00*', 'image/tiff'),
+    (8, b'WEBP', 'image/webp'),
+    (0, b'\x00\x00\x01\x00', 'image/x-icon'),
+    (0, b'BM', 'image/bmp'),
+    (0, b'%PDF-', 'application/pdf'),
+    (0, b'PK\x03\x04', 'application/zip'),
+    (0, b'\x1f\x8b', 'application/gzip'),
+    (0, b'BZh', 'application/x-bzip2'),
+    (0, b'\xfd7zXZ\x00', 'application/x-xz'),
+    (0, b"7z\xbc\xaf'\x1c", 'application/x-7z-compressed'),
+    (0, b'\x7fELF', 'application/x-executable'),
+    (0, b'OggS', 'audio/ogg'),
+    (0, b'fLaC', 'audio/flac'),
+    (0, b'ID3', 'audio/mpeg'),
+    (8, b'WAVE', 'audio/x-wav'),
+    (8, b'AVI ', 'video/x-msvideo'),
+    (0, b'\x1aE\xdf\xa3', 'video/x-matroska'),
+]
+
+# ISO media files all start with an ftyp box, its major brand tells
+# what they hold
+FTYP_BRANDS = {
+    b'avif': 'image/avif',
+    b'avis': 'image/avif',
+    b'heic': 'image/heic',
+    b'heix': 'image/heic',
+    b'heim': 'image/heic',
+    b'heis': 'image/heic',
+    b'hevc': 'image/heic-sequence',
+    b'hevx': 'image/heic-sequence',
+    b'mif1': 'image/heif',
+    b'msf1': 'image/heif-sequence',
+    b'M4A ': 'audio/mp4',
+    b'M4B ': 'audio/mp4',
+    b'qt  ': 'video/quicktime',
+}
+
+
+def sniff_mimetype(path):
+    try:
+        with open(path, 'rb') as file:
+            head = file.read(SNIFF_SIZE)
+    except OSError as err:
+        fmt = "Can't read '{}' to sniff its mimetype: {}"
+        msg = fmt.format(path, err)
+        logger.debug(msg)
+        return None
+
+    for offset, magic, mime in MAGIC_NUMBERS:
+        if head.startswith(magic, offset):
+            return mime
+
+    if head.startswith(b'ftyp', 4):
+        return FTYP_BRANDS.get(head[8:12], 'video/mp4')
+
+    if b'\x00' in head:
+        return 'application/octet-stream'
+
+    try:
+        text = head.decode('utf-8')
+    except UnicodeDecodeError as err:
+        # We may have cut a multibyte character in half
+        truncated = (err.reason == 'unexpected end of data')
+        if not truncated or err.start < len(head) - 3:
+            return 'application/octet-stream'
+        text = head[:err.start].decode('utf-8')
+
+    start = text.lstrip('\ufeff \t\r\n')[:256]
+    if start.startswith('<svg') or (
+        start.startswith('<?xml') and '<svg' in text
+    ):
+        return 'image/svg+xml'
+
+    return 'text/plain'
+
+
+class MimeTypeCache:
+    def __init__(self):
+        self._mimetypes = {}
+        self._store = shared_store('mimetypes')
+
+    def get(self, key, path):
+        if key in self._mimetypes:
+            return self._mimetypes[key]
+
+        mime = self._store.get(key)
+        if mime is None:
+            mime = sniff_mimetype(path)
+            if mime is None:
+                return None
+            self._store[key] = mime
+
+        self._mimetypes[key] = mime
+        return mime
+
+    def __len__(self):
+        return len(self._mimetypes)
+
+    def memory_usage(self):
+        return sys.getsizeof(self._mimetypes)
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args=self._store,
+        )
@@ -0,0 +1,101 @@
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import atexit
+import dbm
+import json
+import logging
+import os
+
+from PyQt5 import QtCore
+
+logger = logging.getLogger(__name__)
+
+
+def cache_directory():
+    location = QtCore.QStandardPaths.GenericCacheLocation
+    location = QtCore.QStandardPaths.writableLocation(location)
+    return os.path.join(location, 'git-annex-metadata-gui')
+
+
+_stores = {}
+
+
+def shared_store(name):
+    # A dbm file opened twice either fails to lock or loses writes,
+    # so everything in the process goes through one store per name
+    if name not in _stores:
+        _stores[name] = PersistentStore(name)
+    return _stores[name]
+
+
+class PersistentStore:
+    def __init__(self, name):
+        self._name = name
+        self._db = None
+        self._fallback = {}
+
+        path = os.path.join(cache_directory(), name)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._db = dbm.open(path, 'c')
+        except Exception as err:
+            fmt = "Can't open persistent store '{}', not persisting: {}"
+            msg = fmt.format(path, err)
+            logger.warning(msg)
+        else:
+            atexit.register(self.close)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __getitem__(self, key):
+        if self._db is None:
+            return self._fallback[key]
+        return json.loads(self._db[key].decode())
+
+    def __setitem__(self, key, value):
+        if self._db is None:
+            self._fallback[key] = value
+            return
+
+        try:
+            self._db[key] = json.dumps(value)
+        except Exception as err:
+            fmt = "Can't write to persistent store '{}': {}"
+            msg = fmt.format(self._name, err)
+            logger.warning(msg)
+            self._fallback[key] = value
+
+    def __contains__(self, key):
+        if self._db is None:
+            return key in self._fallback
+        return key in self._db
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args=self._name,
+        )
@@ -0,0 +1,196 @@
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import logging
+import os
+
+from PyQt5 import QtCore
+from PyQt5 import QtGui
+
+try:
+    from .tracing import trace_span
+except ImportError:
+    from tracing import trace_span
+
+logger = logging.getLogger(__name__)
+
+
+def load_preview(path, mime):
+    if mime.startswith('text/'):
+        try:
+            with open(path, 'r') as file:
+                return file.read()
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    elif mime.startswith('image/'):
+        # QImage is safe to use outside the GUI thread, QPixmap isn't
+        image = QtGui.QImage(path)
+        if image.isNull():
+            return None
+        return image
+
+
+def preview_size(data):
+    if isinstance(data, QtGui.QImage):
+        return data.byteCount()
+    elif isinstance(data, str):
+        return len(data)
+    else:
+        return 0
+
+
+class PreviewCache:
+    def __init__(self, max_bytes=64 * 2**20, max_entries=32):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+
+    def get(self, path):
+        try:
+            data, _ = self._entries[path]
+        except KeyError:
+            return None
+        self._entries.move_to_end(path)
+        return data
+
+    def put(self, path, data):
+        if data is None:
+            return
+
+        size = preview_size(data)
+        if size > self.max_bytes:
+            return
+
+        self.discard(path)
+        self._entries[path] = (data, size)
+        self._bytes += size
+
+        while self._entries and (
+            self._bytes > self.max_bytes
+            or len(self._entries) > self.max_entries
+        ):
+            _, (_, size_) = self._entries.popitem(last=False)
+            self._bytes -= size_
+
+    def discard(self, path):
+        if path in self._entries:
+            _, size = self._entries.pop(path)
+            self._bytes -= size
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def memory_usage(self):
+        return self._bytes
+
+    def __contains__(self, path):
+        return path in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args={
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            },
+        )
+
+
+class PreviewLoader(QtCore.QRunnable):
+    def __init__(self, prefetcher, path, mime):
+        super().__init__()
+        self._prefetcher = prefetcher
+        self._path = path
+        self._mime = mime
+
+    def run(self):
+        with trace_span("prefetch", 'preview', path=self._path):
+            data = load_preview(self._path, self._mime)
+        self._prefetcher.preview_loaded.emit(self._path, data)
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args=self._path,
+        )
+
+
+class PreviewPrefetcher(QtCore.QObject):
+    preview_loaded = QtCore.pyqtSignal(str, object)
+
+    # Don't read huge text files just because they were nearby
+    _max_text_size = 2**20
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.cache = PreviewCache()
+        self._loading = set()
+        self._wanted = set()
+
+        self._pool = QtCore.QThreadPool(self)
+        self._pool.setMaxThreadCount(2)
+
+        self.preview_loaded.connect(self._on_preview_loaded)
+
+    def prefetch(self, path, mime):
+        self._wanted.add(path)
+
+        if path in self.cache or path in self._loading:
+            return
+
+        if mime.startswith('text/'):
+            try:
+                if os.path.getsize(path) > self._max_text_size:
+                    return
+            except OSError:
+                return
+
+        elif not mime.startswith('image/'):
+            return
+
+        self._loading.add(path)
+        self._pool.start(PreviewLoader(self, path, mime))
+
+    def retain(self, paths):
+        # Loads for paths we have since moved away from are not cached
+        self._wanted = set(paths)
+
+    def clear(self):
+        self._pool.clear()
+        self._loading.clear()
+        self._wanted.clear()
+        self.cache.clear()
+
+    def _on_preview_loaded(self, path, data):
+        self._loading.discard(path)
+        if path in self._wanted:
+            self.cache.put(path, data)
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args=self.cache,
+        )
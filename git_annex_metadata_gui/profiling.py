@@ -0,0 +1,173 @@
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import contextlib
+import io
+import logging
+import time
+
+from PyQt5 import QtCore
+
+from .tracing import trace_span
+
+logger = logging.getLogger(__name__)
+
+
+class Profiler:
+    def __init__(self, path, origin=None):
+        self.path = path
+        self.started = None
+        # What one-off marks are timed from, the process start if
+        # given, otherwise when profiling starts
+        self.origin = origin
+        self.phases = collections.OrderedDict()
+
+        # Imported here, everything imports this module on startup
+        import cProfile
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        self.started = time.monotonic()
+        if self.origin is None:
+            self.origin = self.started
+        # Only the GUI thread is profiled, worker threads and processes
+        # show up as time spent waiting on them
+        self._profile.enable()
+
+    def stop(self):
+        self._profile.disable()
+        self._profile.dump_stats(self.path)
+
+        report_path = self.path + '.txt'
+        with open(report_path, 'w') as report:
+            report.write(self.report())
+
+        for line in self.phase_lines():
+            logger.info(line)
+
+        fmt = "Wrote profile to '{}' and summary to '{}'."
+        msg = fmt.format(self.path, report_path)
+        logger.info(msg)
+
+    def record(self, name, duration):
+        self.phases.setdefault(name, []).append(duration)
+
+    def mark(self, name):
+        if name not in self.phases:
+            self.record(name, time.monotonic() - self.origin)
+
+    def phase_lines(self):
+        fmt = "{:<16} {:>6} {:>10.3f} {:>10.3f} {:>10.3f}"
+        yield "{:<16} {:>6} {:>10} {:>10} {:>10}".format(
+            'Phase', 'Count', 'Total (s)', 'Mean (s)', 'Max (s)',
+        )
+        for name, durations in self.phases.items():
+            yield fmt.format(
+                name, len(durations), sum(durations),
+                sum(durations) / len(durations), max(durations),
+            )
+
+    def report(self):
+        stream = io.StringIO()
+        for line in self.phase_lines():
+            print(line, file=stream)
+        print(file=stream)
+
+        import pstats
+        stats = pstats.Stats(self._profile, stream=stream)
+        stats.sort_stats('cumulative').print_stats(50)
+        return stream.getvalue()
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args=self.path,
+        )
+
+
+class FirstPaintProbe(QtCore.QObject):
+    def __init__(self, name, parent=None):
+        super().__init__(parent)
+        self._name = name
+
+    def eventFilter(self, obj, event):
+        # Only counts once the view has something to show
+        if event.type() == QtCore.QEvent.Paint:
+            view = obj.parent()
+            model = view.model() if view is not None else None
+            if model is not None and model.rowCount():
+                profiler = active_profiler()
+                if profiler is not None:
+                    profiler.mark(self._name)
+                obj.removeEventFilter(self)
+        return False
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args=self._name,
+        )
+
+
+_profiler = None
+
+
+def start_profiler(path, origin=None):
+    global _profiler
+    _profiler = Profiler(path, origin=origin)
+    _profiler.start()
+    return _profiler
+
+
+def stop_profiler():
+    global _profiler
+    if _profiler is not None:
+        _profiler.stop()
+        _profiler = None
+
+
+def active_profiler():
+    return _profiler
+
+
+def watch_first_paint(view, name="First paint"):
+    if _profiler is None:
+        return
+    probe = FirstPaintProbe(name, view)
+    view.viewport().installEventFilter(probe)
+
+
+def record_phase(name, duration):
+    if _profiler is not None:
+        _profiler.record(name, duration)
+
+
+@contextlib.contextmanager
+def profile_phase(name):
+    # Phases show up in traces as well
+    with trace_span(name, 'phase'):
+        if _profiler is None:
+            yield
+            return
+
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            _profiler.record(name, time.monotonic() - start)
@@ -0,0 +1,110 @@
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_total(done, parts_done, parts_total):
+    # Items are spread evenly enough over git's hash directories that
+    # the ones read so far tell how many there are overall
+    if parts_done <= 0 or parts_total <= 0:
+        return 0
+    if parts_done >= parts_total:
+        return done
+    return max(done, round(done * parts_total / parts_done))
+
+
+class ProgressTracker:
+    # Rates are measured over the last few seconds, not the whole run
+    _window = 5.0
+
+    def __init__(self, name):
+        self.name = name
+        self.done = 0
+        self.total = 0
+        self.started = time.monotonic()
+        self.finished = None
+        self._samples = collections.deque()
+
+    def update(self, done, total=0):
+        now = time.monotonic()
+        self.done = done
+        self.total = total
+        self._samples.append((now, done))
+        while now - self._samples[0][0] > self._window:
+            self._samples.popleft()
+
+    def finish(self):
+        self.finished = time.monotonic()
+        if self.total:
+            self.done = self.total
+
+    @property
+    def elapsed(self):
+        end = self.finished or time.monotonic()
+        return end - self.started
+
+    @property
+    def rate(self):
+        if len(self._samples) < 2:
+            if self.elapsed > 0:
+                return self.done / self.elapsed
+            return 0.0
+
+        (t0, done0), (t1, done1) = self._samples[0], self._samples[-1]
+        if t1 <= t0:
+            return 0.0
+        return (done1 - done0) / (t1 - t0)
+
+    @property
+    def eta(self):
+        rate = self.rate
+        if not self.total or rate <= 0:
+            return None
+        return max(0.0, (self.total - self.done) / rate)
+
+    def describe(self):
+        if self.finished is not None:
+            fmt = "{name}: {done:,} in {elapsed:.1f}s"
+            return fmt.format(
+                name=self.name, done=self.done, elapsed=self.elapsed,
+            )
+
+        if self.total:
+            text = "{}: {:,}/{:,}".format(self.name, self.done, self.total)
+        else:
+            text = "{}: {:,}".format(self.name, self.done)
+
+        text += " ({:,.0f}/s".format(self.rate)
+        eta = self.eta
+        if eta is not None:
+            text += ", ETA {:.0f}s".format(eta)
+        return text + ")"
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args={
+                'name': self.name,
+                'done': self.done,
+                'total': self.total,
+            },
+        )
@@ -0,0 +1,199 @@
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import time
+
+from PyQt5 import QtCore
+
+from .tracing import active_tracer
+
+logger = logging.getLogger(__name__)
+
+
+class Task:
+    def __init__(self, name, generator, priority=0):
+        self.name = name
+        self.priority = priority
+        self.paused = False
+        self.progress = None
+        self.waited = 0
+        self._generator = generator
+
+    def step(self):
+        # Tasks may yield (done, total) to report how far along they are
+        value = next(self._generator)
+        if isinstance(value, tuple):
+            self.progress = value
+            return True
+        return False
+
+    def close(self):
+        self._generator.close()
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args={
+                'name': self.name,
+                'priority': self.priority,
+                'paused': self.paused,
+                'waited': self.waited,
+                'progress': self.progress,
+            },
+        )
+
+
+class TaskScheduler(QtCore.QObject):
+    task_started = QtCore.pyqtSignal(object)
+    task_progress = QtCore.pyqtSignal(object)
+    task_finished = QtCore.pyqtSignal(object)
+
+    _min_slice = 0.002
+
+    # Slices a task has to wait to go up one priority level
+    _aging = 4
+
+    def __init__(self, parent=None, target_latency=0.05):
+        super().__init__(parent)
+        # How long input may wait behind background work, in seconds
+        self.target_latency = target_latency
+        self._tasks = []
+        self._latency = 0
+        self._queued_at = None
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self._run_slice)
+
+    def add(self, task):
+        self._tasks.append(task)
+        self.task_started.emit(task)
+        self._schedule()
+        return task
+
+    def remove(self, task):
+        if task in self._tasks:
+            self._tasks.remove(task)
+            try:
+                task.close()
+            except ValueError:
+                # Stopped from within its own step, it'll be dropped
+                # once that step returns
+                pass
+
+    def pause(self, task):
+        task.paused = True
+
+    def resume(self, task):
+        task.paused = False
+        self._schedule()
+
+    def tasks(self):
+        return list(self._tasks)
+
+    def slice_length(self):
+        # Whatever the event loop needed for painting and input last
+        # time around is left free for it, the rest goes to tasks
+        return max(self._min_slice, self.target_latency - self._latency)
+
+    def _schedule(self):
+        if not self._timer.isActive():
+            self._queued_at = time.monotonic()
+            self._timer.start()
+
+    def _next_task(self):
+        runnable = [task for task in self._tasks if not task.paused]
+        if not runnable:
+            return None
+
+        # Waiting raises a task's priority, so lower ones still get
+        # slices while higher ones have work. Equal ones take turns.
+        task = max(
+            runnable,
+            key=lambda task: task.priority + task.waited / self._aging,
+        )
+        for task_ in runnable:
+            task_.waited += 1
+        task.waited = 0
+
+        self._tasks.remove(task)
+        self._tasks.append(task)
+        return task
+
+    def _run_slice(self):
+        start = time.monotonic()
+        if self._queued_at is not None:
+            latency = start - self._queued_at
+            self._latency = 0.8 * self._latency + 0.2 * latency
+
+        task = self._next_task()
+        if task is None:
+            return
+
+        tracer = active_tracer()
+        if tracer is not None:
+            traced_at = tracer.timestamp()
+
+        progressed = False
+        endtime = start + self.slice_length()
+        try:
+            while time.monotonic() < endtime and not task.paused:
+                progressed |= task.step()
+                if task not in self._tasks:
+                    break
+
+        except StopIteration:
+            self._finish(task)
+
+        except Exception:
+            self._finish(task)
+            raise
+
+        finally:
+            if tracer is not None:
+                tracer.complete(
+                    task.name, 'slice', traced_at,
+                    args={'progress': task.progress},
+                )
+            if progressed:
+                self.task_progress.emit(task)
+            if self._tasks:
+                self._schedule()
+
+    def _finish(self, task):
+        if task in self._tasks:
+            self._tasks.remove(task)
+        self.task_finished.emit(task)
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args=[task.name for task in self._tasks],
+        )
+
+
+_scheduler = None
+
+
+def default_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = TaskScheduler(QtCore.QCoreApplication.instance())
+    return _scheduler
@@ -0,0 +1,141 @@
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import bisect
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from PyQt5 import QtCore
+
+from .profiling import record_phase
+
+logger = logging.getLogger(__name__)
+
+
+class StallWatchdog(QtCore.QObject):
+    # Upper bounds of the latency histogram buckets, in seconds
+    buckets = (0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5)
+
+    def __init__(self, threshold=0.2, interval=0.05, parent=None):
+        super().__init__(parent)
+        self.threshold = threshold
+        self.interval = interval
+        self.histogram = [0] * (len(self.buckets) + 1)
+
+        self._lock = threading.Lock()
+        self._sent = None
+        self._reported = False
+        self._stopped = threading.Event()
+        self._thread = None
+        self._gui_ident = None
+
+    def start(self):
+        # Has to be called from the GUI thread, it's the one watched
+        self._gui_ident = threading.get_ident()
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            name='stall-watchdog',
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+
+        self._stopped.set()
+        self._thread.join(timeout=1)
+        self._thread = None
+
+        for line in self.histogram_lines():
+            logger.info(line)
+
+    def histogram_lines(self):
+        total = sum(self.histogram)
+        yield "Event loop latency over {} pings:".format(total)
+
+        lower = 0
+        for upper, count in zip(self.buckets + (None,), self.histogram):
+            if upper is None:
+                label = ">{:g} ms".format(lower * 1000)
+            else:
+                label = "<={:g} ms".format(upper * 1000)
+                lower = upper
+            if count:
+                yield "  {:>10}: {}".format(label, count)
+
+    def _run(self):
+        # Only one ping is in flight at a time, a stall is however long
+        # the current one has gone unanswered
+        while not self._stopped.wait(self.interval):
+            now = time.monotonic()
+            with self._lock:
+                sent = self._sent
+                if sent is None:
+                    self._sent = now
+                elif self._reported or now - sent < self.threshold:
+                    continue
+                else:
+                    self._reported = True
+
+            if sent is None:
+                QtCore.QMetaObject.invokeMethod(
+                    self, '_pong', QtCore.Qt.QueuedConnection,
+                )
+            else:
+                self._report_stall(now - sent)
+
+    def _report_stall(self, duration):
+        frame = sys._current_frames().get(self._gui_ident)
+        if frame is None:
+            return
+
+        stack = ''.join(traceback.format_stack(frame))
+        fmt = "GUI thread stalled for over {:.0f} ms, at:\n{}"
+        msg = fmt.format(duration * 1000, stack.rstrip())
+        logger.warning(msg)
+
+    @QtCore.pyqtSlot()
+    def _pong(self):
+        now = time.monotonic()
+        with self._lock:
+            sent, reported = self._sent, self._reported
+            self._sent, self._reported = None, False
+        if sent is None:
+            return
+
+        latency = now - sent
+        self.histogram[bisect.bisect_left(self.buckets, latency)] += 1
+
+        if reported:
+            record_phase("Stall", latency)
+            fmt = "GUI thread stall ended after {:.0f} ms."
+            msg = fmt.format(latency * 1000)
+            logger.warning(msg)
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args={
+                'threshold': self.threshold,
+                'interval': self.interval,
+            },
+        )
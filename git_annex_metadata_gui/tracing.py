@@ -0,0 +1,165 @@
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Tracer:
+    def __init__(self, path):
+        self.path = path
+        self._pid = os.getpid()
+        self._origin = time.perf_counter()
+        self._events = []
+        self._threads = {}
+
+    def timestamp(self):
+        # Trace viewers expect microseconds
+        return (time.perf_counter() - self._origin) * 1e6
+
+    def complete(self, name, category, start, end=None, args=None):
+        if end is None:
+            end = self.timestamp()
+        event = {
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': start,
+            'dur': end - start,
+            'pid': self._pid,
+            'tid': self._thread_id(),
+        }
+        if args:
+            event['args'] = args
+        # Appending is atomic, worker threads can record directly
+        self._events.append(event)
+
+    def instant(self, name, category, args=None):
+        event = {
+            'name': name,
+            'cat': category,
+            'ph': 'i',
+            's': 't',
+            'ts': self.timestamp(),
+            'pid': self._pid,
+            'tid': self._thread_id(),
+        }
+        if args:
+            event['args'] = args
+        self._events.append(event)
+
+    def async_event(self, phase, name, category, ident, args=None):
+        # For work spread over several scheduler slices
+        event = {
+            'name': name,
+            'cat': category,
+            'ph': phase,
+            'id': ident,
+            'ts': self.timestamp(),
+            'pid': self._pid,
+            'tid': self._thread_id(),
+        }
+        if args:
+            event['args'] = args
+        self._events.append(event)
+
+    def _thread_id(self):
+        ident = threading.get_ident()
+        if ident not in self._threads:
+            self._threads[ident] = threading.current_thread().name
+        return ident
+
+    def events(self):
+        metadata = [
+            {
+                'name': 'thread_name',
+                'ph': 'M',
+                'pid': self._pid,
+                'tid': ident,
+                'args': {'name': name},
+            }
+            for ident, name in list(self._threads.items())
+        ]
+        return metadata + list(self._events)
+
+    def save(self):
+        with open(self.path, 'w') as trace:
+            json.dump({
+                'traceEvents': self.events(),
+                'displayTimeUnit': 'ms',
+            }, trace)
+
+        fmt = "Wrote {} trace events to '{}'."
+        msg = fmt.format(len(self._events), self.path)
+        logger.info(msg)
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args=self.path,
+        )
+
+
+_tracer = None
+
+
+def start_tracer(path):
+    global _tracer
+    _tracer = Tracer(path)
+    return _tracer
+
+
+def stop_tracer():
+    global _tracer
+    if _tracer is not None:
+        _tracer.save()
+        _tracer = None
+
+
+def active_tracer():
+    return _tracer
+
+
+def trace_begin(name, category, ident, **args):
+    if _tracer is not None:
+        _tracer.async_event('b', name, category, ident, args)
+
+
+def trace_end(name, category, ident, **args):
+    if _tracer is not None:
+        _tracer.async_event('e', name, category, ident, args)
+
+
+@contextlib.contextmanager
+def trace_span(name, category, **args):
+    # Checked once per span, the only cost while tracing is off
+    tracer = _tracer
+    if tracer is None:
+        yield
+        return
+
+    start = tracer.timestamp()
+    try:
+        yield
+    finally:
+        tracer.complete(name, category, start, args=args)
@@ -0,0 +1,155 @@
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import logging
+import os
+import sys
+import threading
+
+from PyQt5 import QtCore
+
+logger = logging.getLogger(__name__)
+
+# pygit2 and the thread pool are imported where they're used, they
+# take a while to load and aren't needed before a repository is opened
+
+_local = threading.local()
+
+
+def _thread_repo(path):
+    # Repository objects shouldn't be shared between threads
+    repos = getattr(_local, 'repos', None)
+    if repos is None:
+        repos = _local.repos = {}
+    if path not in repos:
+        import pygit2
+        repos[path] = pygit2.Repository(path)
+    return repos[path]
+
+
+def key_from_link(target):
+    # ../../../.git/annex/objects/aa/bb/*/*
+    target = target.decode('utf-8', 'replace')
+    if target.strip('./').startswith('git/annex/objects/'):
+        _, _, key = target.rpartition('/')
+        return key
+
+
+def walk_tree(repo, tree, path=()):
+    # Records of (parent path, name, key), with None as the key of
+    # directories, parents always before their children
+    import pygit2
+    records = []
+    pending = [(tree, path)]
+
+    while pending:
+        tree, path = pending.pop()
+        for entry in tree:
+            if entry.type_str == 'tree':
+                records.append((path, entry.name, None))
+                pending.append((repo[entry.id], (*path, entry.name)))
+
+            elif entry.filemode == pygit2.GIT_FILEMODE_LINK:
+                key = key_from_link(repo[entry.id].data)
+                if key is not None:
+                    records.append((path, entry.name, sys.intern(key)))
+
+    return records
+
+
+def _walk_subtree(repo_path, tree_id, path):
+    repo = _thread_repo(repo_path)
+    return walk_tree(repo, repo[tree_id], path)
+
+
+class TreeWalker(QtCore.QObject):
+    # Emitted from worker threads when a subtree is done, connect it
+    # queued to pick up where waiting left off
+    results_ready = QtCore.pyqtSignal()
+
+    def __init__(self, repo, treeish='HEAD', workers=None, parent=None):
+        super().__init__(parent)
+        import pygit2
+        self._repo = repo
+        self._tree = repo.revparse_single(treeish).peel(pygit2.Tree)
+        self._workers = workers or os.cpu_count() or 1
+        self._executor = None
+        self._finished = collections.deque()
+
+        # Top level directories walked so far, out of how many
+        self.subtrees_done = 0
+        self.subtrees_total = 0
+
+    def __iter__(self):
+        # Yields batches of records, or None while waiting for workers
+        # until results_ready is emitted
+        import concurrent.futures
+        import pygit2
+        root_records = []
+        subtrees = []
+        for entry in self._tree:
+            if entry.type_str == 'tree':
+                root_records.append(((), entry.name, None))
+                subtrees.append((str(entry.id), (entry.name,)))
+
+            elif entry.filemode == pygit2.GIT_FILEMODE_LINK:
+                key = key_from_link(self._repo[entry.id].data)
+                if key is not None:
+                    root_records.append(((), entry.name, key))
+
+        self.subtrees_total = len(subtrees)
+        yield root_records
+
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self._workers,
+        )
+
+        try:
+            for tree_id, path in subtrees:
+                future = self._executor.submit(
+                    _walk_subtree, self._repo.path, tree_id, path,
+                )
+                future.add_done_callback(self._on_future_done)
+
+            while self.subtrees_done < self.subtrees_total:
+                if not self._finished:
+                    yield None
+                    continue
+
+                future = self._finished.popleft()
+                self.subtrees_done += 1
+                yield future.result()
+
+        finally:
+            self.close()
+
+    def _on_future_done(self, future):
+        # On a worker thread, a deque is safe to append to here
+        self._finished.append(future)
+        self.results_ready.emit()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args=self._tree.id,
+        )
@@ -19,14 +19,19 @@
 import ast
 import functools
 import logging
-import time
 
-from PyQt5 import Qt
 from PyQt5 import QtGui
 from PyQt5 import QtCore
+from PyQt5 import QtWidgets
+
+from .profiling import profile_phase
+from .scheduler import Task
+from .scheduler import default_scheduler
 
 logger = logging.getLogger(__name__)
 
+ContentPresentRole = QtCore.Qt.UserRole + 1
+
 
 def parse_as_set(x):
     if x == '{}':
@@ -43,89 +48,144 @@ def parse_as_set(x):
         raise ValueError(msg) from err
 
 
+def set_header_labels(model, labels):
+    # setHorizontalHeaderLabels would clone missing header items from
+    # the model's item prototype, which is only meant for cells
+    for col, label in enumerate(labels):
+        item = model.horizontalHeaderItem(col)
+        if item is None:
+            model.setHorizontalHeaderItem(col, QtGui.QStandardItem(label))
+        else:
+            item.setText(label)
+
+
+# Icons and fonts are implicitly shared, so every item can hold the
+# same one. Made on first use, they need the application to exist.
+@functools.lru_cache(maxsize=None)
+def file_icon(kind):
+    # Each provider loads its own copy of the icon theme's pixmaps
+    return QtWidgets.QFileIconProvider().icon(kind)
+
+
+@functools.lru_cache(maxsize=None)
+def system_font(kind):
+    return QtGui.QFontDatabase.systemFont(kind)
+
+
 class AutoConsumed:
-    _timeout = 0.05
+    # Runs the decorated generator method as a task of the scheduler,
+    # in slices between Qt events
+    def __init__(self, function=None, priority=0):
+        self._function = function
+        self._priority = priority
+        if function is not None:
+            functools.update_wrapper(self, function)
+
+    def __call__(self, function):
+        return self.__class__(function, priority=self._priority)
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        # Each instance gets its own task state, cached on the instance
+        # so that it shadows this descriptor from then on
+        bound = BoundAutoConsumed(self._function, instance, self._priority)
+        instance.__dict__[self._function.__name__] = bound
+        return bound
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args=self._function.__name__,
+        )
 
-    def __init__(self, function):
+
+class BoundAutoConsumed:
+    def __init__(self, function, instance, priority=0):
         self._function = function
-        self._generator = None
-        self._instance = None
-        functools.update_wrapper(self, function)
+        self._instance = instance
+        self._priority = priority
+        self._task = None
+        self._connected = False
 
     def start(self, *args):
-        self._generator = self._function(self._instance, *args)
-        self()
+        self.stop()
+        generator = self._function(self._instance, *args)
+        self._task = Task(
+            self._function.__qualname__, generator,
+            priority=self._priority,
+        )
+
+        scheduler = default_scheduler()
+        if not self._connected:
+            scheduler.task_finished.connect(self._on_task_finished)
+            self._connected = True
+        scheduler.add(self._task)
 
     def running(self):
-        return self._generator is not None
+        return self._task is not None
 
     def stop(self):
-        self._generator = None
-
-    def __call__(self, instance=None):
-        if instance is not None and instance is not self._instance:
-            fmt = "Instance mismatch on autoconsumer {}, ({} vs {})."
-            msg = fmt.format(
-                self._function.__name__,
-                instance, self._instance,
-            )
-            logger.critical(msg)
-
-        if self._generator is None:
-            return
+        if self._task is not None:
+            default_scheduler().remove(self._task)
+            self._task = None
 
-        try:
-            endtime = time.monotonic() + self._timeout
-            while time.monotonic() < endtime:
-                next(self._generator)
+    def pause(self):
+        if self._task is not None:
+            default_scheduler().pause(self._task)
 
-        except StopIteration:
-            self._generator = None
+    def resume(self):
+        if self._task is not None:
+            default_scheduler().resume(self._task)
 
-        else:
-            QtCore.QMetaObject.invokeMethod(
-                self._instance, self._function.__name__,
-                Qt.Qt.QueuedConnection,
-            )
+    def progress(self):
+        if self._task is not None:
+            return self._task.progress
 
-    def __get__(self, instance, owner):
-        self._instance = instance
-        return self
+    def _on_task_finished(self, task):
+        if task is self._task:
+            self._task = None
 
     def __repr__(self):
         return "{name}.{cls}({args})".format(
             name=__name__,
             cls=self.__class__.__name__,
-            args=self._function.__name__,
+            args={
+                'function': self._function.__name__,
+                'instance': self._instance,
+            },
         )
 
 
 class DataProxyItem(QtGui.QStandardItem):
-    def __init__(self, item):
+    def __init__(self, item=None):
         super().__init__()
         self._item = item
 
-        model = self._item.model()
-        model.dataChanged.connect(self._propagate_changes)
+    def source(self):
+        return self._item
 
     def type(self):
         return QtGui.QStandardItem.UserType + 3
 
-    def data(self, role=Qt.Qt.DisplayRole):
-        return self._item.data(role=role)
+    def data(self, role=QtCore.Qt.DisplayRole):
+        source = self.source()
+        if source is None:
+            return super().data(role=role)
+        return source.data(role=role)
 
-    def setData(self, value, role=Qt.Qt.EditRole):
-        return self._item.setData(value, role=role)
+    def setData(self, value, role=QtCore.Qt.EditRole):
+        source = self.source()
+        if source is not None:
+            source.setData(value, role=role)
 
     def flags(self):
-        return self._item.flags()
-
-    def _propagate_changes(self, topLeft, bottomRight, roles):
-        rows = range(topLeft.row(), bottomRight.row() + 1)
-        columns = range(topLeft.column(), bottomRight.column() + 1)
-
-        if self._item.row() in rows and self._item.column() in columns:
-            self.emitDataChanged()
+        source = self.source()
+        if source is None:
+            return super().flags()
+        return source.flags()
 
     def __repr__(self):
         return "{name}.{cls}({args})".format(
@@ -143,7 +203,17 @@ class StatusBarLogHandler(logging.Handler):
     def emit(self, record):
         msg = self.format(record)
         line = msg.split('\n')[0]
-        self._statusbar.showMessage(line, msecs=5000)
+
+        # Widgets may only be touched from the GUI thread
+        if QtCore.QThread.currentThread() is self._statusbar.thread():
+            self._statusbar.showMessage(line, msecs=5000)
+        else:
+            QtCore.QMetaObject.invokeMethod(
+                self._statusbar, 'showMessage',
+                QtCore.Qt.QueuedConnection,
+                QtCore.Q_ARG(str, line),
+                QtCore.Q_ARG(int, 5000),
+            )
 
     def __repr__(self):
         return "{name}.{cls}({args})".format(
@@ -154,23 +224,53 @@ class StatusBarLogHandler(logging.Handler):
 
 
 class StandardItemProxyModel(QtCore.QSortFilterProxyModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._content_filter = None
+
+    def contentFilter(self):
+        return self._content_filter
+
+    def setContentFilter(self, present=None):
+        self._content_filter = present
+        self.setRecursiveFilteringEnabled(present is not None)
+        with profile_phase("Filter"):
+            self.invalidateFilter()
+
+    def sort(self, column, order=QtCore.Qt.AscendingOrder):
+        with profile_phase("Sort"):
+            super().sort(column, order)
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if self._content_filter is not None:
+            model = self.sourceModel()
+            index = model.index(source_row, 0, source_parent)
+            if index.data(ContentPresentRole) != self._content_filter:
+                return False
+
+        return super().filterAcceptsRow(source_row, source_parent)
+
     def lessThan(self, source_left, source_right):
-        descending = (self.sortOrder() == Qt.Qt.DescendingOrder)
+        descending = (self.sortOrder() == QtCore.Qt.DescendingOrder)
 
         lhs_flags = source_left.sibling(source_left.row(), 0).flags()
-        lhs_is_dir = not bool(lhs_flags & Qt.Qt.ItemNeverHasChildren)
+        lhs_is_dir = not bool(lhs_flags & QtCore.Qt.ItemNeverHasChildren)
 
         rhs_flags = source_right.sibling(source_right.row(), 0).flags()
-        rhs_is_dir = not bool(rhs_flags & Qt.Qt.ItemNeverHasChildren)
+        rhs_is_dir = not bool(rhs_flags & QtCore.Qt.ItemNeverHasChildren)
 
         if lhs_is_dir and (not rhs_is_dir):
             return not descending
         elif (not lhs_is_dir) and rhs_is_dir:
             return descending
 
+        # itemFromIndex would create items for every empty cell
         model = self.sourceModel()
-        lhs = model.itemFromIndex(source_left)
-        rhs = model.itemFromIndex(source_right)
+        lhs = model.existing_item(source_left)
+        rhs = model.existing_item(source_right)
+
+        if lhs is None:
+            return False
 
         try:
             return (lhs < rhs)
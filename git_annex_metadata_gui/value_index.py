@@ -0,0 +1,125 @@
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import bisect
+import heapq
+import logging
+import sys
+
+logger = logging.getLogger(__name__)
+
+
+class ValueIndex:
+    # Past this many prefix matches, don't rank them by usage
+    _rank_limit = 10000
+
+    def __init__(self):
+        self._counts = {}
+        self._sorted = {}
+
+    def add(self, field, values, bulk=False):
+        counts = self._counts.setdefault(field, {})
+        if bulk:
+            self._sorted.pop(field, None)
+            for value in values:
+                counts[value] = counts.get(value, 0) + 1
+            return
+
+        for value in values:
+            if value in counts:
+                counts[value] += 1
+                continue
+
+            counts[value] = 1
+            if field in self._sorted:
+                folded, sorted_values = self._sorted[field]
+                idx = bisect.bisect(folded, value.casefold())
+                folded.insert(idx, value.casefold())
+                sorted_values.insert(idx, value)
+
+    def remove(self, field, values):
+        counts = self._counts.get(field, {})
+        for value in values:
+            if value not in counts:
+                continue
+
+            counts[value] -= 1
+            if counts[value] > 0:
+                continue
+
+            del counts[value]
+            if field in self._sorted:
+                folded, sorted_values = self._sorted[field]
+                lo = bisect.bisect_left(folded, value.casefold())
+                hi = bisect.bisect_right(folded, value.casefold(), lo=lo)
+                idx = sorted_values.index(value, lo, hi)
+                del folded[idx]
+                del sorted_values[idx]
+
+    def update(self, field, old_values, new_values):
+        self.remove(field, old_values - new_values)
+        self.add(field, new_values - old_values)
+
+    def count(self, field, value):
+        return self._counts.get(field, {}).get(value, 0)
+
+    def complete(self, field, prefix, limit=50):
+        folded, sorted_values = self._entries(field)
+        prefix = prefix.casefold()
+
+        lo = bisect.bisect_left(folded, prefix)
+        hi = bisect.bisect_left(folded, prefix + '\U0010ffff', lo=lo)
+
+        if hi - lo > self._rank_limit:
+            return sorted_values[lo:lo + limit]
+
+        counts = self._counts[field]
+        return heapq.nlargest(limit, sorted_values[lo:hi], key=counts.get)
+
+    def clear(self):
+        self._counts.clear()
+        self._sorted.clear()
+
+    def memory_usage(self):
+        size = sys.getsizeof(self._counts) + sys.getsizeof(self._sorted)
+        for counts in self._counts.values():
+            size += sys.getsizeof(counts)
+            size += sum(sys.getsizeof(value) for value in counts)
+        for folded, sorted_values in self._sorted.values():
+            size += sys.getsizeof(folded) + sys.getsizeof(sorted_values)
+        return size
+
+    def _entries(self, field):
+        # Sorting is deferred until the first query after a bulk load
+        if field not in self._sorted:
+            counts = self._counts.setdefault(field, {})
+            sorted_values = sorted(counts, key=str.casefold)
+            folded = [value.casefold() for value in sorted_values]
+            self._sorted[field] = (folded, sorted_values)
+        return self._sorted[field]
+
+    def __len__(self):
+        return sum(len(counts) for counts in self._counts.values())
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args={
+                field: len(counts)
+                for field, counts in self._counts.items()
+            },
+        )
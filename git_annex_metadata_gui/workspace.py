@@ -0,0 +1,116 @@
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import logging
+import os
+
+from PyQt5 import QtCore
+
+from .file_metadata_model import AnnexedFileMetadataModel
+from .key_metadata_model import AnnexedKeyMetadataModel
+
+logger = logging.getLogger(__name__)
+
+
+class RepoSession:
+    def __init__(self, path, repo, parent=None):
+        self.path = path
+        self.repo = repo
+
+        self.model_keys = AnnexedKeyMetadataModel(parent)
+        self.model_head = AnnexedFileMetadataModel(parent)
+        self.model_head.setSourceModel(self.model_keys)
+
+    @property
+    def name(self):
+        return os.path.basename(self.path) or self.path
+
+    def load(self):
+        self.model_keys.setRepo(self.repo)
+
+    def close(self):
+        self.model_head._build_tree.stop()
+        self.model_keys._populate.stop()
+        self.model_keys.content._scan.stop()
+        self.model_head.deleteLater()
+        self.model_keys.deleteLater()
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args=self.path,
+        )
+
+
+class Workspace(QtCore.QObject):
+    session_opened = QtCore.pyqtSignal(str)
+    session_closed = QtCore.pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Every open repository keeps its models, and keeps loading in
+        # the background, so switching between them is instant
+        self._sessions = collections.OrderedDict()
+
+    @staticmethod
+    def normalize(path):
+        return os.path.realpath(path)
+
+    def open(self, path, repo):
+        path = self.normalize(path)
+        if path in self._sessions:
+            return self._sessions[path]
+
+        session = RepoSession(path, repo, parent=self)
+        self._sessions[path] = session
+        session.load()
+
+        fmt = "Opened repository '{}' ({} open)."
+        msg = fmt.format(path, len(self._sessions))
+        logger.info(msg)
+
+        self.session_opened.emit(path)
+        return session
+
+    def close(self, path):
+        path = self.normalize(path)
+        session = self._sessions.pop(path, None)
+        if session is None:
+            return
+
+        session.close()
+        self.session_closed.emit(path)
+
+    def session(self, path):
+        return self._sessions.get(self.normalize(path))
+
+    def sessions(self):
+        return list(self._sessions.values())
+
+    def __contains__(self, path):
+        return self.normalize(path) in self._sessions
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __repr__(self):
+        return "{name}.{cls}({args})".format(
+            name=__name__,
+            cls=self.__class__.__name__,
+            args=list(self._sessions),
+        )
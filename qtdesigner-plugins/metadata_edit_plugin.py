@@ -103,6 +103,11 @@ class MockKeyItem(QtGui.QStandardItem):
     def key(self):
         return self.text()
 
+    @property
+    def metadata(self):
+        # The editor only shows fields that have values
+        return {'baz': {'foo', 'bar'}, 'diz': {'foo', 'bar'}}
+
 
 class MockFieldItem(QtGui.QStandardItem):
     def __init__(self):
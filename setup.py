@@ -40,7 +40,10 @@ setuptools.setup(
         'Topic :: Utilities',
         'License :: OSI Approved :: GNU General Public License v3 or later (GPLv3+)',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.5',
+        'Programming Language :: Python :: 3 :: Only',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
     ],
     entry_points={
         'gui_scripts': [
@@ -49,5 +52,6 @@ setuptools.setup(
     },
     keywords='git-annex metadata',
     packages=['git_annex_metadata_gui'],
-    install_requires=['PyQt5', 'git-annex-adapter>=0.2.0'],
+    python_requires='>=3.9',
+    install_requires=['PyQt5>=5.10', 'git-annex-adapter>=0.2.0'],
 )
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+
+import os
+import tempfile
+import time
+import types
+import unittest
+
+from PyQt5 import QtWidgets
+
+from git_annex_metadata_gui.content_index import ContentIndex
+from git_annex_metadata_gui.content_index import hash_dir_mixed
+
+app = None
+
+
+def setUpModule():
+    global app
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    app = QtWidgets.QApplication.instance()
+    if app is None:
+        app = QtWidgets.QApplication([])
+
+
+class TestHashDirMixed(unittest.TestCase):
+    def test_hash_dir_mixed(self):
+        key = (
+            'SHA256E-s0--e3b0c44298fc1c149afbf4c8996fb924'
+            '27ae41e4649b934ca495991b7852b855'
+        )
+        self.assertEqual(hash_dir_mixed(key), ('pX', 'ZJ'))
+
+
+class TestContentIndex(unittest.TestCase):
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.repo = types.SimpleNamespace(path=tempdir.name)
+        self.root = os.path.join(tempdir.name, 'annex', 'objects')
+
+        self.index = ContentIndex()
+        self.changed = []
+        self.index.content_changed.connect(self.changed.extend)
+
+    def add_content(self, key):
+        path = os.path.join(self.root, *hash_dir_mixed(key), key)
+        os.makedirs(path, exist_ok=True)
+        content = os.path.join(path, key)
+        with open(content, 'w') as file:
+            file.write(key)
+        return content
+
+    def scan(self):
+        deadline = time.monotonic() + 10
+        while self.index._scan.running():
+            self.assertLess(time.monotonic(), deadline)
+            app.processEvents()
+
+    def test_scan(self):
+        content = self.add_content('KEY-a')
+        self.index.setRepo(self.repo)
+        self.scan()
+
+        self.assertEqual(self.index.contentlocation('KEY-a'), content)
+        self.assertIsNone(self.index.contentlocation('KEY-b'))
+        self.assertEqual(self.changed, ['KEY-a'])
+
+    def test_location_before_scan(self):
+        content = self.add_content('KEY-a')
+        self.index.setRepo(self.repo)
+
+        self.assertTrue(self.index._scan.running())
+        self.assertEqual(self.index.contentlocation('KEY-a'), content)
+        self.assertIsNone(self.index.contentlocation('KEY-b'))
+
+    def test_content_added_to_hash_dir(self):
+        self.add_content('KEY-a')
+        self.index.setRepo(self.repo)
+        self.scan()
+
+        # Another key in the same aa/bb, which only that one sees
+        hash_dir = os.path.join(self.root, *hash_dir_mixed('KEY-a'))
+        self.assertIn(hash_dir, self.index._watched)
+
+        key = 'KEY-a2'
+        os.makedirs(os.path.join(hash_dir, key))
+        content = os.path.join(hash_dir, key, key)
+        with open(content, 'w') as file:
+            file.write(key)
+
+        self.index._on_directory_changed(hash_dir)
+        self.index._rescan()
+        self.assertEqual(self.index.contentlocation(key), content)
+        self.assertIn(key, self.changed)
+
+    def test_unwatched_are_polled(self):
+        self.add_content('KEY-a')
+        self.index.setRepo(self.repo)
+        self.scan()
+
+        # As if inotify had run out of watches for it
+        hash_dir = os.path.join(self.root, *hash_dir_mixed('KEY-a'))
+        self.index._unwatch(hash_dir)
+        self.index._unwatched.add(hash_dir)
+
+        key = 'KEY-a2'
+        os.makedirs(os.path.join(hash_dir, key))
+        content = os.path.join(hash_dir, key, key)
+        with open(content, 'w') as file:
+            file.write(key)
+
+        self.index._poll()
+        self.assertEqual(self.index.contentlocation(key), content)
+
+
+if __name__ == '__main__':
+    unittest.main()
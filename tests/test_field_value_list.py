@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+
+import unittest
+
+from PyQt5 import QtCore
+
+from git_annex_metadata_gui.field_value_list import FieldValueModel
+
+
+class TestFieldValueModel(unittest.TestCase):
+    def setUp(self):
+        self.model = FieldValueModel()
+        self.edits = []
+        self.model.values_edited.connect(lambda: self.edits.append(True))
+
+    def rows(self):
+        return [
+            self.model.index(row).data()
+            for row in range(self.model.rowCount())
+        ]
+
+    def test_values_are_sorted(self):
+        self.model.set_values({'c', 'a', 'b'})
+        self.assertEqual(self.rows(), ['a', 'b', 'c'])
+        self.assertEqual(self.model.values(), {'a', 'b', 'c'})
+
+        self.model.set_values({'b', 'd'})
+        self.assertEqual(self.rows(), ['b', 'd'])
+        self.assertEqual(self.edits, [])
+
+    def test_small_changes_update_rows(self):
+        self.model.set_values({'a', 'c'})
+        inserted, resets = [], []
+        self.model.rowsInserted.connect(
+            lambda parent, first, last: inserted.append(first))
+        self.model.modelReset.connect(lambda: resets.append(True))
+
+        self.model.set_values({'a', 'b', 'c'})
+        self.assertEqual(inserted, [1])
+        self.assertEqual(resets, [])
+
+    def test_large_changes_reset(self):
+        resets = []
+        self.model.modelReset.connect(lambda: resets.append(True))
+
+        values = {str(n) for n in range(FieldValueModel._reset_threshold + 1)}
+        self.model.set_values(values)
+        self.assertEqual(resets, [True])
+        self.assertEqual(self.rows(), sorted(values))
+
+    def test_set_data_renames(self):
+        self.model.set_values({'a', 'b'})
+        index = self.model.index(0)
+
+        self.assertTrue(self.model.setData(index, 'z'))
+        self.assertEqual(self.rows(), ['b', 'z'])
+        self.assertEqual(len(self.edits), 1)
+
+        self.assertFalse(self.model.setData(self.model.index(0), 'b'))
+        self.assertEqual(len(self.edits), 1)
+
+    def test_set_data_empty_removes(self):
+        self.model.set_values({'a', 'b'})
+        self.assertTrue(self.model.setData(self.model.index(0), ''))
+        self.assertEqual(self.rows(), ['b'])
+
+    def test_set_data_existing_merges(self):
+        self.model.set_values({'a', 'b'})
+        self.assertTrue(self.model.setData(self.model.index(0), 'b'))
+        self.assertEqual(self.rows(), ['b'])
+
+    def test_add_and_remove(self):
+        self.model.add_value('b')
+        self.model.add_value('a')
+        self.model.add_value('a')
+        self.model.add_value('')
+        self.assertEqual(self.rows(), ['a', 'b'])
+        self.assertEqual(len(self.edits), 2)
+
+        self.model.remove_rows([0, 1])
+        self.assertEqual(self.rows(), [])
+        self.assertEqual(len(self.edits), 3)
+
+    def test_flags(self):
+        self.model.set_values({'a'})
+        flags = self.model.flags(self.model.index(0))
+        self.assertTrue(flags & QtCore.Qt.ItemIsEditable)
+        self.assertEqual(self.model.rowCount(self.model.index(0)), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
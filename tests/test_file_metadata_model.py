@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+
+import os
+import types
+import unittest
+
+from PyQt5 import QtCore
+from PyQt5 import QtWidgets
+
+from git_annex_metadata_gui.file_metadata_model import AnnexedDirectoryItem
+from git_annex_metadata_gui.file_metadata_model import AnnexedFileMetadataModel
+from git_annex_metadata_gui.key_metadata_model import AnnexedKeyMetadataModel
+from git_annex_metadata_gui.metadata_log import PreloadedMetadata
+from git_annex_metadata_gui.utils import StandardItemProxyModel
+
+app = None
+
+
+def setUpModule():
+    global app
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    app = QtWidgets.QApplication.instance()
+    if app is None:
+        app = QtWidgets.QApplication([])
+
+
+def mock_key(key):
+    return types.SimpleNamespace(key=key, metadata={}, contentlocation=None)
+
+
+class TestTreeSorting(unittest.TestCase):
+    # Key order differs from filename order on purpose
+    files = {
+        'b.txt': 'SHA256E-s1--b',
+        'a.txt': 'SHA256E-s2--c',
+        'c.txt': 'SHA256E-s3--a',
+    }
+
+    def setUp(self):
+        self.model_keys = AnnexedKeyMetadataModel()
+        self.model_keys._set_schema(['year'])
+        self.model_head = AnnexedFileMetadataModel()
+        self.model_head.setSourceModel(self.model_keys)
+        self.model_head.setColumnCount(len(self.model_keys.fields))
+
+        years = {'a.txt': '2001', 'b.txt': '2003', 'c.txt': '2002'}
+        for name, key in self.files.items():
+            metadata = {'year': {years[name]}}
+            self.model_keys.insert_key(
+                mock_key(key), PreloadedMetadata(mock_key(key), metadata),
+            )
+            self.model_head.insert_file(key, name)
+
+        directory = AnnexedDirectoryItem('z')
+        self.model_head.invisibleRootItem().appendRow(directory)
+
+        self.proxy = StandardItemProxyModel()
+        self.proxy.setSourceModel(self.model_head)
+
+    def names(self):
+        return [
+            self.proxy.index(row, 0).data()
+            for row in range(self.proxy.rowCount())
+        ]
+
+    def test_sort_by_filename(self):
+        self.proxy.sort(0, QtCore.Qt.AscendingOrder)
+        self.assertEqual(self.names(), ['z', 'a.txt', 'b.txt', 'c.txt'])
+
+        self.proxy.sort(0, QtCore.Qt.DescendingOrder)
+        self.assertEqual(self.names(), ['z', 'c.txt', 'b.txt', 'a.txt'])
+
+    def test_sort_by_field(self):
+        # Field items put numbers largest first when sorted ascending
+        self.proxy.sort(1, QtCore.Qt.AscendingOrder)
+        self.assertEqual(self.names(), ['z', 'b.txt', 'c.txt', 'a.txt'])
+
+        self.proxy.sort(1, QtCore.Qt.DescendingOrder)
+        self.assertEqual(self.names(), ['z', 'a.txt', 'c.txt', 'b.txt'])
+
+
+if __name__ == '__main__':
+    unittest.main()
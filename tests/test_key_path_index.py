@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+
+import unittest
+
+from git_annex_metadata_gui.key_path_index import KeyPathIndex
+
+
+class TestKeyPathIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = KeyPathIndex()
+
+    def test_single_path(self):
+        self.index.add('KEY1', 'a/one.txt')
+        self.assertEqual(self.index.paths('KEY1'), ('a/one.txt',))
+        self.assertEqual(self.index.key('a/one.txt'), 'KEY1')
+        self.assertIn('KEY1', self.index)
+        self.assertEqual(len(self.index), 1)
+
+    def test_many_paths(self):
+        self.index.add('KEY1', 'one.txt')
+        self.index.add('KEY1', 'copy.txt')
+        self.index.add('KEY1', 'b/copy.txt')
+        self.assertEqual(
+            self.index.paths('KEY1'),
+            ('one.txt', 'copy.txt', 'b/copy.txt'),
+        )
+        self.assertEqual(list(self.index.keys()), ['KEY1'])
+        self.assertEqual(len(self.index), 3)
+
+    def test_unknown(self):
+        self.assertEqual(self.index.paths('KEY1'), ())
+        self.assertIsNone(self.index.key('one.txt'))
+        self.assertNotIn('KEY1', self.index)
+        self.index.remove('one.txt')
+
+    def test_remove(self):
+        self.index.add('KEY1', 'one.txt')
+        self.index.add('KEY1', 'two.txt')
+        self.index.add('KEY1', 'three.txt')
+
+        self.index.remove('two.txt')
+        self.assertEqual(self.index.paths('KEY1'), ('one.txt', 'three.txt'))
+
+        self.index.remove('one.txt')
+        self.assertEqual(self.index.paths('KEY1'), ('three.txt',))
+        self.assertIsInstance(self.index._paths['KEY1'], str)
+
+        self.index.remove('three.txt')
+        self.assertNotIn('KEY1', self.index)
+        self.assertEqual(len(self.index), 0)
+
+    def test_readd_moves_path(self):
+        self.index.add('KEY1', 'one.txt')
+        self.index.add('KEY1', 'one.txt')
+        self.assertEqual(self.index.paths('KEY1'), ('one.txt',))
+
+        self.index.add('KEY2', 'one.txt')
+        self.assertNotIn('KEY1', self.index)
+        self.assertEqual(self.index.paths('KEY2'), ('one.txt',))
+        self.assertEqual(self.index.key('one.txt'), 'KEY2')
+
+    def test_clear(self):
+        self.index.add('KEY1', 'one.txt')
+        self.index.clear()
+        self.assertEqual(len(self.index), 0)
+        self.assertNotIn('KEY1', self.index)
+
+
+if __name__ == '__main__':
+    unittest.main()
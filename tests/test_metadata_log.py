@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+
+import base64
+import os
+import tempfile
+import threading
+import types
+import unittest
+
+from PyQt5 import QtCore
+
+from git_annex_metadata_gui.metadata_log import MetadataLoader
+from git_annex_metadata_gui.metadata_log import decode_value
+from git_annex_metadata_gui.metadata_log import hash_dir_lower
+from git_annex_metadata_gui.metadata_log import iter_schema
+from git_annex_metadata_gui.metadata_log import key_from_log_name
+from git_annex_metadata_gui.metadata_log import parse_metadata_log
+from git_annex_metadata_gui.metadata_log import read_journal
+from git_annex_metadata_gui.metadata_log import read_subtrees
+from git_annex_metadata_gui.metadata_log import scan_fields
+
+
+def b64(value):
+    return '!' + base64.b64encode(value.encode()).decode()
+
+
+class TestParseMetadataLog(unittest.TestCase):
+    def test_values(self):
+        data = b'1500000000.0s tag +a +b author +me\n'
+        self.assertEqual(
+            parse_metadata_log(data),
+            {'tag': {'a', 'b'}, 'author': {'me'}},
+        )
+
+    def test_base64_values(self):
+        data = '1s tag +{} +{}\n'.format(b64('a b'), b64('ü')).encode()
+        self.assertEqual(parse_metadata_log(data), {'tag': {'a b', 'ü'}})
+
+    def test_later_lines_win(self):
+        data = b'2s tag -a +c\n1s tag +a +b\n'
+        self.assertEqual(parse_metadata_log(data), {'tag': {'b', 'c'}})
+
+    def test_removed_base64_value(self):
+        data = '1s tag +{}\n2s tag -{}\n'.format(b64('x y'), b64('x y'))
+        self.assertEqual(parse_metadata_log(data.encode()), {})
+
+    def test_same_line_order(self):
+        data = b'1s tag +a -a +b\n'
+        self.assertEqual(parse_metadata_log(data), {'tag': {'b'}})
+
+    def test_internal_and_empty_fields(self):
+        data = b'1s tag +a lastchanged +1s tag-lastchanged +1s year\n'
+        self.assertEqual(parse_metadata_log(data), {'tag': {'a'}})
+
+    def test_malformed_lines(self):
+        data = b'\ngarbage tag +a\n1s tag +b\n+c\n'
+        self.assertEqual(parse_metadata_log(data), {'tag': {'b'}})
+
+    def test_scan_fields(self):
+        data = b'1s tag +a -b author +me\n2s year -1999\n'
+        self.assertEqual(scan_fields(data), {b'tag', b'author', b'year'})
+
+    def test_decode_value(self):
+        self.assertEqual(decode_value(b64('a b')), 'a b')
+        self.assertEqual(decode_value('plain'), 'plain')
+        self.assertEqual(decode_value('!not base64'), '!not base64')
+
+
+class TestLogNames(unittest.TestCase):
+    def test_plain(self):
+        self.assertEqual(
+            key_from_log_name('SHA256E-s1--abc.txt.log'),
+            'SHA256E-s1--abc.txt',
+        )
+        self.assertEqual(
+            key_from_log_name('SHA256E-s1--abc.log.met', suffix='.log.met'),
+            'SHA256E-s1--abc',
+        )
+
+    def test_escapes(self):
+        self.assertEqual(
+            key_from_log_name('URL--http&c%%a&ab&s20.log'),
+            'URL--http://a&b%20',
+        )
+
+    def test_hash_dir_lower(self):
+        # The first 6 hex digits of the key's md5, split in two
+        self.assertEqual(hash_dir_lower('SHA256E-s0--e3b0'), ('012', 'ed8'))
+
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.repo = types.SimpleNamespace(
+            path=tempdir.name,
+            lookup_branch=lambda name: None,
+        )
+        self.journal = os.path.join(tempdir.name, 'annex', 'journal')
+        os.makedirs(self.journal)
+
+    def write(self, name, data=b''):
+        with open(os.path.join(self.journal, name), 'wb') as file:
+            file.write(data)
+
+    def test_read_journal(self):
+        self.write('aaa_bbb_SHA256E-s1--a.log')
+        self.write('aaa_bbb_SHA256E-s1--a.log.met')
+        self.write('aaa_bbb_WORM-s2-m3--x&ay__z.log.met')
+        self.write('aaa_bbb_SHA256E-s3--c.log.web')
+        self.write('uuid.log')
+        self.write('remote.log')
+        self.write('trust.log')
+
+        logs, metadata = read_journal(self.repo)
+        self.assertEqual(logs, {'SHA256E-s1--a'})
+        self.assertEqual(
+            set(metadata), {'SHA256E-s1--a', 'WORM-s2-m3--x&y_z'},
+        )
+        self.assertEqual(
+            metadata['WORM-s2-m3--x&y_z'],
+            os.path.join(self.journal, 'aaa_bbb_WORM-s2-m3--x&ay__z.log.met'),
+        )
+
+    def test_read_journal_underscores(self):
+        self.write('aaa_bbb_URL--http&c%%example.com%a__b__c.log')
+        logs, _ = read_journal(self.repo)
+        self.assertEqual(logs, {'URL--http://example.com/a_b_c'})
+
+    def test_no_journal(self):
+        os.rmdir(self.journal)
+        self.assertEqual(read_journal(self.repo), (set(), {}))
+
+    def test_loader_without_annex_branch(self):
+        self.write('aaa_bbb_SHA256E-s1--a.log')
+        self.write('aaa_bbb_SHA256E-s2--b.log.met', b'1s tag +x\n')
+
+        loader = MetadataLoader(self.repo)
+        self.assertEqual(loader.subtrees_total, 0)
+        records = dict(record for batch in loader for record in batch)
+        self.assertEqual(records, {
+            'SHA256E-s1--a': {},
+            'SHA256E-s2--b': {'tag': {'x'}},
+        })
+
+    def test_schema_without_annex_branch(self):
+        self.assertEqual(list(iter_schema(self.repo)), [])
+
+
+class TestReadSubtrees(unittest.TestCase):
+    def setUp(self):
+        import pygit2
+
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.repo = pygit2.init_repository(tempdir.name, bare=True)
+
+        logs = {
+            'SHA256E-s1--a.log': b'1s 1 uuid\n',
+            'SHA256E-s1--a.log.met': b'1s tag +x\n',
+            'SHA256E-s2--b.log': b'1s 1 uuid\n',
+            'SHA256E-s3--c.log.met': b'1s tag +y\n',
+        }
+        bbb = self.repo.TreeBuilder()
+        for name, data in logs.items():
+            blob_id = self.repo.create_blob(data)
+            bbb.insert(name, blob_id, pygit2.GIT_FILEMODE_BLOB)
+        aaa = self.repo.TreeBuilder()
+        aaa.insert('bbb', bbb.write(), pygit2.GIT_FILEMODE_TREE)
+        self.tree_id = aaa.write()
+
+        root = self.repo.TreeBuilder()
+        root.insert('aaa', self.tree_id, pygit2.GIT_FILEMODE_TREE)
+        self.root = self.repo[root.write()]
+
+    def test_read_subtrees(self):
+        records = dict(read_subtrees(self.repo, [self.tree_id]))
+        self.assertEqual(records, {
+            'SHA256E-s1--a': (('tag', ('x',)),),
+            'SHA256E-s2--b': (),
+            'SHA256E-s3--c': (('tag', ('y',)),),
+        })
+
+    def test_loader_workers(self):
+        loader = MetadataLoader(self.repo, tree=self.root, workers=2)
+        loader._parallel_threshold = 0
+
+        # Waits are only over once a worker says so
+        ready = threading.Semaphore(0)
+        loader.results_ready.connect(
+            ready.release, QtCore.Qt.DirectConnection,
+        )
+
+        records = {}
+        for batch in loader:
+            if batch is None:
+                self.assertTrue(ready.acquire(timeout=30))
+                continue
+            records.update(batch)
+
+        self.assertEqual(records, {
+            'SHA256E-s1--a': {'tag': ('x',)},
+            'SHA256E-s2--b': {},
+            'SHA256E-s3--c': {'tag': ('y',)},
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
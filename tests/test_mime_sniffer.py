@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+from git_annex_metadata_gui import persistent_store
+from git_annex_metadata_gui.mime_sniffer import sniff_mimetype
+
+
+class TestSniffMimetype(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+    def sniff(self, data):
+        path = os.path.join(self.tempdir.name, 'KEY')
+        with open(path, 'wb') as file:
+            file.write(data)
+        return sniff_mimetype(path)
+
+    def test_magic_numbers(self):
+        self.assertEqual(self.sniff(b'\x89PNG\r\n\x1a\n...'), 'image/png')
+        self.assertEqual(self.sniff(b'%PDF-1.4\n'), 'application/pdf')
+        self.assertEqual(self.sniff(b'RIFF\0\0\0\0WEBPVP8 '), 'image/webp')
+
+    def test_ftyp_brands(self):
+        def ftyp(brand):
+            return b'\x00\x00\x00\x18ftyp' + brand + b'\x00\x00\x00\x00'
+
+        self.assertEqual(self.sniff(ftyp(b'isom')), 'video/mp4')
+        self.assertEqual(self.sniff(ftyp(b'heic')), 'image/heic')
+        self.assertEqual(self.sniff(ftyp(b'avif')), 'image/avif')
+        self.assertEqual(self.sniff(ftyp(b'mif1')), 'image/heif')
+        self.assertEqual(self.sniff(ftyp(b'M4A ')), 'audio/mp4')
+
+    def test_text(self):
+        self.assertEqual(self.sniff(b'hello\n'), 'text/plain')
+        self.assertEqual(self.sniff(b'<svg xmlns="">'), 'image/svg+xml')
+
+        # A multibyte character cut off at the end of what's read
+        self.assertEqual(self.sniff(b'a' + 'ş'.encode() * 2048), 'text/plain')
+
+    def test_binary(self):
+        self.assertEqual(
+            self.sniff(b'abc\x00def'),
+            'application/octet-stream',
+        )
+        self.assertEqual(
+            self.sniff(b'\xff\xfe\xfd'),
+            'application/octet-stream',
+        )
+
+    def test_unreadable(self):
+        path = os.path.join(self.tempdir.name, 'missing')
+        self.assertIsNone(sniff_mimetype(path))
+
+
+class TestSharedStore(unittest.TestCase):
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+
+        patcher = unittest.mock.patch.object(
+            persistent_store, 'cache_directory',
+            return_value=tempdir.name,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = unittest.mock.patch.object(persistent_store, '_stores', {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_one_store_per_name(self):
+        store = persistent_store.shared_store('test')
+        self.addCleanup(store.close)
+
+        self.assertIs(persistent_store.shared_store('test'), store)
+        store['key'] = 'image/png'
+        self.assertEqual(
+            persistent_store.shared_store('test')['key'], 'image/png',
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
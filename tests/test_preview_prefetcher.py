@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+from git_annex_metadata_gui.preview_prefetcher import PreviewCache
+from git_annex_metadata_gui.preview_prefetcher import PreviewPrefetcher
+
+
+class TestPreviewCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = PreviewCache(max_bytes=10, max_entries=2)
+        cache.put('a', 'aaa')
+        cache.put('b', 'bbb')
+        cache.get('a')
+        cache.put('c', 'ccc')
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertEqual(cache.memory_usage(), 6)
+
+    def test_too_large(self):
+        cache = PreviewCache(max_bytes=2)
+        cache.put('a', 'aaa')
+        self.assertEqual(len(cache), 0)
+
+
+class TestPreviewPrefetcher(unittest.TestCase):
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.path = os.path.join(tempdir.name, 'a.txt')
+        with open(self.path, 'w') as file:
+            file.write('text')
+
+        self.prefetcher = PreviewPrefetcher()
+        self.prefetcher._pool = unittest.mock.Mock()
+
+    def test_loads_once(self):
+        self.prefetcher.prefetch(self.path, 'text/plain')
+        self.prefetcher.prefetch(self.path, 'text/plain')
+        self.assertEqual(self.prefetcher._pool.start.call_count, 1)
+
+        self.prefetcher.preview_loaded.emit(self.path, 'text')
+        self.assertEqual(self.prefetcher.cache.get(self.path), 'text')
+
+    def test_prefetch_after_clear(self):
+        # The queued load is cancelled, it has to be started again
+        self.prefetcher.prefetch(self.path, 'text/plain')
+        self.prefetcher.clear()
+        self.prefetcher.prefetch(self.path, 'text/plain')
+        self.assertEqual(self.prefetcher._pool.start.call_count, 2)
+
+    def test_unwanted_not_cached(self):
+        self.prefetcher.prefetch(self.path, 'text/plain')
+        self.prefetcher.retain([])
+        self.prefetcher.preview_loaded.emit(self.path, 'text')
+        self.assertNotIn(self.path, self.prefetcher.cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
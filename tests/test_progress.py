@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+
+import types
+import unittest
+import unittest.mock
+
+from git_annex_metadata_gui import progress
+from git_annex_metadata_gui.progress import ProgressTracker
+from git_annex_metadata_gui.progress import estimate_total
+
+
+class TestEstimateTotal(unittest.TestCase):
+    def test_extrapolates(self):
+        self.assertEqual(estimate_total(100, 1, 4), 400)
+        self.assertEqual(estimate_total(10, 3, 4), 13)
+
+    def test_done(self):
+        self.assertEqual(estimate_total(123, 4, 4), 123)
+
+    def test_unknown(self):
+        self.assertEqual(estimate_total(10, 0, 4), 0)
+        self.assertEqual(estimate_total(10, 2, 0), 0)
+
+    def test_never_below_done(self):
+        self.assertEqual(estimate_total(0, 1, 4), 0)
+        self.assertEqual(estimate_total(5, 3, 4), 7)
+
+
+class TestProgressTracker(unittest.TestCase):
+    def setUp(self):
+        self.now = 100.0
+        clock = types.SimpleNamespace(monotonic=lambda: self.now)
+        patcher = unittest.mock.patch.object(progress, 'time', clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.tracker = ProgressTracker("Keys")
+
+    def advance(self, seconds, done, total=0):
+        self.now += seconds
+        self.tracker.update(done, total)
+
+    def test_rate_and_eta(self):
+        self.advance(1, 100, 1000)
+        self.advance(1, 300, 1000)
+        self.assertAlmostEqual(self.tracker.rate, 200)
+        self.assertAlmostEqual(self.tracker.eta, 3.5)
+        self.assertEqual(
+            self.tracker.describe(), "Keys: 300/1,000 (200/s, ETA 4s)",
+        )
+
+    def test_rate_uses_recent_samples(self):
+        self.advance(1, 1000)
+        for _ in range(10):
+            self.advance(1, self.tracker.done + 10)
+        self.assertAlmostEqual(self.tracker.rate, 10)
+
+    def test_rate_from_start(self):
+        self.assertEqual(self.tracker.rate, 0.0)
+        self.advance(2, 50)
+        self.assertAlmostEqual(self.tracker.rate, 25)
+
+    def test_unknown_total(self):
+        self.advance(1, 10)
+        self.advance(1, 20)
+        self.assertIsNone(self.tracker.eta)
+        self.assertEqual(self.tracker.describe(), "Keys: 20 (10/s)")
+
+    def test_finish(self):
+        self.advance(1, 90, 100)
+        self.now += 1
+        self.tracker.finish()
+        self.now += 10
+
+        self.assertEqual(self.tracker.done, 100)
+        self.assertAlmostEqual(self.tracker.elapsed, 2)
+        self.assertEqual(self.tracker.describe(), "Keys: 100 in 2.0s")
+
+
+if __name__ == '__main__':
+    unittest.main()
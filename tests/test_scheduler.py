@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+
+import collections
+import itertools
+import os
+import unittest
+
+from PyQt5 import QtWidgets
+
+from git_annex_metadata_gui.scheduler import Task
+from git_annex_metadata_gui.scheduler import TaskScheduler
+
+app = None
+
+
+def setUpModule():
+    global app
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    app = QtWidgets.QApplication.instance()
+    if app is None:
+        app = QtWidgets.QApplication([])
+
+
+def endless():
+    for _ in itertools.count():
+        yield
+
+
+class TestTaskScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = TaskScheduler()
+
+    def picks(self, count):
+        return collections.Counter(
+            self.scheduler._next_task().name for _ in range(count)
+        )
+
+    def test_equal_priorities_take_turns(self):
+        self.scheduler.add(Task('a', endless()))
+        self.scheduler.add(Task('b', endless()))
+        self.assertEqual(self.picks(10), {'a': 5, 'b': 5})
+
+    def test_lower_priority_still_runs(self):
+        self.scheduler.add(Task('high', endless(), priority=1))
+        self.scheduler.add(Task('low', endless(), priority=0))
+
+        # With one level between them, the lower gets every fifth slice
+        self.assertEqual(self.picks(50), {'high': 40, 'low': 10})
+
+    def test_paused_not_picked(self):
+        high = self.scheduler.add(Task('high', endless(), priority=1))
+        self.scheduler.add(Task('low', endless(), priority=0))
+        self.scheduler.pause(high)
+        self.assertEqual(self.picks(5), {'low': 5})
+
+
+if __name__ == '__main__':
+    unittest.main()
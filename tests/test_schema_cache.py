@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+
+import tempfile
+import types
+import unittest
+import unittest.mock
+
+from git_annex_metadata_gui import persistent_store
+from git_annex_metadata_gui.metadata_log import SchemaCache
+
+
+class TestSchemaCache(unittest.TestCase):
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+
+        patcher = unittest.mock.patch.object(
+            persistent_store, 'cache_directory',
+            return_value=tempdir.name,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = unittest.mock.patch.object(persistent_store, '_stores', {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.close_stores)
+
+        self.repo = types.SimpleNamespace(path='/repo/.git')
+        self.other_repo = types.SimpleNamespace(path='/other/.git')
+
+    def close_stores(self):
+        for store in persistent_store._stores.values():
+            store.close()
+        persistent_store._stores.clear()
+
+    def commit(self, ident):
+        return types.SimpleNamespace(id=ident)
+
+    def test_concurrent_instances(self):
+        # Like the empty placeholder model and an open repository's
+        first, second = SchemaCache(), SchemaCache()
+        first.put(self.repo, self.commit('a'), {'tag', 'author'})
+        second.put(self.other_repo, self.commit('b'), {'year'})
+
+        self.assertEqual(
+            second.get(self.repo, self.commit('a')), ['author', 'tag'],
+        )
+        self.assertEqual(
+            first.get(self.other_repo, self.commit('b')), ['year'],
+        )
+
+    def test_persists(self):
+        SchemaCache().put(self.repo, self.commit('a'), {'tag'})
+        self.close_stores()
+        fields = SchemaCache().get(self.repo, self.commit('a'))
+        self.assertEqual(fields, ['tag'])
+
+    def test_keeps_latest_commit(self):
+        cache = SchemaCache()
+        cache.put(self.repo, self.commit('a'), {'tag'})
+        cache.put(self.repo, self.commit('b'), {'tag', 'year'})
+
+        self.assertIsNone(cache.get(self.repo, self.commit('a')))
+        self.assertEqual(
+            cache.get(self.repo, self.commit('b')), ['tag', 'year'],
+        )
+        self.assertEqual(len(list(cache._store._db.keys())), 1)
+
+    def test_unknown(self):
+        cache = SchemaCache()
+        self.assertIsNone(cache.get(self.repo, self.commit('a')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+
+import tempfile
+import threading
+import unittest
+
+from PyQt5 import QtCore
+
+from git_annex_metadata_gui.tree_walker import TreeWalker
+from git_annex_metadata_gui.tree_walker import key_from_link
+
+
+class TestTreeWalker(unittest.TestCase):
+    def setUp(self):
+        import pygit2
+
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.repo = pygit2.init_repository(tempdir.name, bare=True)
+
+        def link(key):
+            target = '../.git/annex/objects/Xx/Yy/{0}/{0}'.format(key)
+            return self.repo.create_blob(target.encode())
+
+        sub = self.repo.TreeBuilder()
+        sub.insert('b.txt', link('KEY-b'), pygit2.GIT_FILEMODE_LINK)
+        sub.insert('c.txt', link('KEY-c'), pygit2.GIT_FILEMODE_LINK)
+        sub.insert(
+            'plain.txt', self.repo.create_blob(b'not annexed'),
+            pygit2.GIT_FILEMODE_BLOB,
+        )
+
+        root = self.repo.TreeBuilder()
+        root.insert('a.txt', link('KEY-a'), pygit2.GIT_FILEMODE_LINK)
+        root.insert('dir', sub.write(), pygit2.GIT_FILEMODE_TREE)
+        root.insert('other', sub.write(), pygit2.GIT_FILEMODE_TREE)
+
+        signature = pygit2.Signature('test', 'test@example.com')
+        self.repo.create_commit(
+            'HEAD', signature, signature, 'test', root.write(), [],
+        )
+
+    def test_walk(self):
+        walker = TreeWalker(self.repo, workers=2)
+
+        # Waits are only over once a worker says so
+        ready = threading.Semaphore(0)
+        walker.results_ready.connect(
+            ready.release, QtCore.Qt.DirectConnection,
+        )
+
+        records = []
+        for batch in walker:
+            if batch is None:
+                self.assertTrue(ready.acquire(timeout=30))
+                continue
+            records.extend(batch)
+
+        self.assertEqual(sorted(records, key=repr), sorted([
+            ((), 'a.txt', 'KEY-a'),
+            ((), 'dir', None),
+            ((), 'other', None),
+            (('dir',), 'b.txt', 'KEY-b'),
+            (('dir',), 'c.txt', 'KEY-c'),
+            (('other',), 'b.txt', 'KEY-b'),
+            (('other',), 'c.txt', 'KEY-c'),
+        ], key=repr))
+        self.assertEqual(walker.subtrees_done, 2)
+
+
+class TestKeyFromLink(unittest.TestCase):
+    def test_annexed(self):
+        target = b'../../.git/annex/objects/Xx/Yy/KEY/KEY'
+        self.assertEqual(key_from_link(target), 'KEY')
+
+    def test_not_annexed(self):
+        self.assertIsNone(key_from_link(b'../elsewhere/file'))
+
+
+if __name__ == '__main__':
+    unittest.main()
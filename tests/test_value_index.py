@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+# Git-Annex-Metadata-Gui
+# Copyright (C) 2017 Alper Nebi Yasak
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+
+import unittest
+import unittest.mock
+
+from git_annex_metadata_gui.value_index import ValueIndex
+
+
+class TestValueIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = ValueIndex()
+
+    def test_complete_prefix(self):
+        self.index.add('tag', {'apple', 'Apricot', 'banana'})
+        self.assertEqual(
+            sorted(self.index.complete('tag', 'ap')),
+            ['Apricot', 'apple'],
+        )
+        self.assertEqual(
+            sorted(self.index.complete('tag', 'AP')),
+            ['Apricot', 'apple'],
+        )
+        self.assertEqual(self.index.complete('tag', 'c'), [])
+        self.assertEqual(self.index.complete('author', 'a'), [])
+
+    def test_complete_ranks_by_count(self):
+        self.index.add('tag', {'aa', 'ab', 'ac'})
+        self.index.add('tag', {'ac'})
+        self.index.add('tag', {'ac', 'ab'})
+        self.assertEqual(self.index.complete('tag', 'a'), ['ac', 'ab', 'aa'])
+        self.assertEqual(self.index.complete('tag', 'a', limit=1), ['ac'])
+
+    def test_complete_many_matches_alphabetically(self):
+        values = {'v{:03}'.format(n) for n in range(20)}
+        self.index.add('tag', values)
+        self.index.add('tag', {'v019'})
+
+        with unittest.mock.patch.object(ValueIndex, '_rank_limit', 10):
+            completions = self.index.complete('tag', 'v', limit=3)
+        self.assertEqual(completions, ['v000', 'v001', 'v002'])
+
+    def test_remove(self):
+        self.index.add('tag', {'a', 'b'})
+        self.index.add('tag', {'a'})
+        self.index.complete('tag', '')
+
+        self.index.remove('tag', {'a', 'b', 'missing'})
+        self.assertEqual(self.index.count('tag', 'a'), 1)
+        self.assertEqual(self.index.count('tag', 'b'), 0)
+        self.assertEqual(self.index.complete('tag', ''), ['a'])
+
+        self.index.remove('tag', {'a'})
+        self.assertEqual(self.index.complete('tag', ''), [])
+        self.assertEqual(len(self.index), 0)
+
+    def test_remove_keeps_casefold_duplicates(self):
+        self.index.add('tag', {'Foo', 'foo', 'FOO'})
+        self.index.complete('tag', '')
+
+        self.index.remove('tag', {'foo'})
+        self.assertEqual(
+            sorted(self.index.complete('tag', 'f')),
+            ['FOO', 'Foo'],
+        )
+
+    def test_update(self):
+        self.index.add('tag', {'a', 'b'})
+        self.index.update('tag', {'a', 'b'}, {'b', 'c'})
+        self.assertEqual(self.index.count('tag', 'a'), 0)
+        self.assertEqual(self.index.count('tag', 'b'), 1)
+        self.assertEqual(self.index.count('tag', 'c'), 1)
+
+    def test_add_after_query_stays_sorted(self):
+        self.index.add('tag', {'b', 'd'})
+        self.index.complete('tag', '')
+        self.index.add('tag', {'c', 'A'})
+        self.index.add('tag', {'b'})
+        self.assertEqual(self.index._entries('tag')[1], ['A', 'b', 'c', 'd'])
+
+    def test_bulk(self):
+        self.index.add('tag', {'b'})
+        self.index.complete('tag', '')
+        self.index.add('tag', ['a', 'b', 'b'], bulk=True)
+        self.assertEqual(self.index.count('tag', 'b'), 3)
+        self.assertEqual(self.index.complete('tag', ''), ['b', 'a'])
+
+    def test_clear(self):
+        self.index.add('tag', {'a'})
+        self.index.add('author', {'b'})
+        self.assertEqual(len(self.index), 2)
+        self.index.clear()
+        self.assertEqual(len(self.index), 0)
+        self.assertEqual(self.index.complete('tag', ''), [])
+
+
+if __name__ == '__main__':
+    unittest.main()